@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import unicodedata
+
+from dict_store import make_answer_keys, to_romaji
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_answer(user_input):
+    """把用户输入规范化为答案键的形式（全角→半角、去空白、转罗马音），带 LRU 缓存"""
+    # NFKC: 全角英数/半角片假名/全角空格统一为标准形式
+    text = unicodedata.normalize('NFKC', user_input)
+    # 移除所有空白
+    text = ''.join(text.split())
+    if not text:
+        return ''
+    return to_romaji(text)
+
+
+@functools.lru_cache(maxsize=4096)
+def _fallback_keys(kanji, reading, romaji):
+    """词典未提供预计算答案键时（例如浏览器缓存的词典）按需计算"""
+    return make_answer_keys(to_romaji(kanji), reading, romaji)
+
+
+def answer_keys_for(kanji, correct_answer, answer_keys=None):
+    """单词的全部可接受答案（优先使用词典预计算的答案键）"""
+    keys = answer_keys.get(kanji) if answer_keys is not None else None
+    if keys is None:
+        keys = _fallback_keys(kanji, correct_answer[0], correct_answer[2])
+    return keys
+
+
+def is_correct(kanji, user_input, correct_answer, answer_keys=None, keys=None):
+    """判断用户输入是否与正确答案匹配，每次提交至多一次转换；keys 为已取得的该单词答案键"""
+    if keys is None:
+        keys = answer_keys_for(kanji, correct_answer, answer_keys)
+    return normalize_answer(user_input) in keys
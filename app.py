@@ -2,221 +2,140 @@
 
 from pywebio.input import *
 from pywebio.output import *
-from pywebio.session import run_js, eval_js, set_env
-from pywebio.platform.flask import start_server
-from pywebio.pin import put_select, pin, pin_wait_change, put_checkbox
-import random
-import json
+from pywebio.session import run_js, eval_js, set_env, chose_impl, get_session_implement, run_asyncio_coroutine
+from pywebio.session.coroutinebased import CoroutineBasedSession
+from pywebio.pin import put_select, pin, put_checkbox
+import html
+import asyncio
+import atexit
+import hashlib
+import signal
+import threading
+import time
 import pywebio
 import urllib.parse
 import sys
 import argparse
 from pywebio.session import info as session_info
-from pywebio.session import run_async, run_js
-import threading
-import time
-import pykakasi
+from pywebio.session import local as session_local
+from pywebio.session import run_async, run_js, defer_call
 import os
+from dict_store import current_dictionary, peek_dictionary, warm_up_kakasi
+from dict_registry import dictionary_registry
+from answer import is_correct
+from convert_pool import conversion
+from ruby import create_ruby_html, warm_ruby_cache
+from presence import presence
+from client_assets import asset_url
+from web import start_server
+from prefork import start_prefork_server
+from scheduler import QuestionScheduler, DUE_WEIGHT
+from prefetch import QuestionPipeline
+from search import get_index
+from logs import get_logger, setup_logging
+from metrics import (ACTIVE_SESSIONS, ANSWER_CHECK_SECONDS, EVAL_JS_SECONDS, QUESTION_LATENCY_SECONDS,
+                     SESSIONS_TOTAL, threads as session_threads)
+from progress import ProgressStore
 
 # pywebio 基础配置
 pywebio.config(
     title='言葉',
     theme="sketchy",    # 可用主题有： dark, sketchy, minty, yeti 
-    description='単語学習ツール'
+    description='単語学習ツール',
+    # 浏览器端脚本和样式（带版本号，浏览器缓存），会话中只调用其中的具名函数
+    js_file=[asset_url('kotoba.js')],
+    css_file=[asset_url('kotoba.css')]
 )
 
-# 加载配置文件
-def load_config():
-    try:
-        with open('config.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            return config
-    except FileNotFoundError:
-        print("配置文件不存在，使用默认配置")
-        return {
-            "dictionaries": [
-                {
-                    "path": "dictionaries/base.json",
-                    "name": "基础词库"
-                }
-            ],
-            "default_dictionary": "dictionaries/base.json"
-        }
-
-# 获取配置
-config = load_config()
-DICTIONARIES = [d["path"] for d in config["dictionaries"]]
-DEFAULT_DICTIONARY = config["default_dictionary"]
-
-# 添加全局变量来跟踪在线用户
-online_users = {}
-users_lock = threading.Lock()
-kks = pykakasi.Kakasi()
-
-# 从 JSON 文件加载单词库
-def get_cache_key(dictionary_file):
-    """生成缓存键名"""
-    # 移除 dictionaries/ 前缀
-    filename = os.path.basename(dictionary_file)
-    return f'cached_dict_{filename}'
-
-def load_words(dictionary_file='dictionaries/base.json'):
-    try:
-        # 如果传入的是相对路径，确保它在dictionaries目录下
-        if not dictionary_file.startswith('dictionaries/'):
-            dictionary_file = os.path.join('dictionaries', dictionary_file)
-        
-        # 尝试从缓存加载
-        js_code = '''
-            (function() {
-                const dict_key = \'''' + get_cache_key(dictionary_file) + '''\';
-                const saved = localStorage.getItem(dict_key);
-                if (saved) {
-                    try {
-                        const data = JSON.parse(saved);
-                        console.log('Loading dictionary from cache:', dict_key);
-                        return data;
-                    } catch (e) {
-                        console.error('Failed to load from cache:', e);
-                        return null;
-                    }
-                }
-                return null;
-            })();
-        '''
-        cached_data = eval_js(js_code)
-        
-        if cached_data:
-            print(f"词典 {dictionary_file} 从缓存加载完成，包含 {len(cached_data)} 个单词")
-            return cached_data
-            
-        # 如果没有缓存，从文件加载
-        with open(dictionary_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            word_dict = {}
-            
-            for kanji, meaning in data.items():
-                # 使用 pykakasi 获取读音
-                result = kks.convert(kanji)
-                
-                # 分别获取每个词的假名和罗马音
-                reading_parts = []
-                romaji_parts = []
-                
-                # 逐个处理每个词
-                for item in result:
-                    # 获取假名
-                    reading_parts.append(item['hira'])
-                    # 获取罗马音
-                    romaji_parts.append(item['hepburn'])
-                
-                # 用空格连接所有部分
-                reading = ' '.join(reading_parts)  # 例如: かくてい しんこく の きげん を おしえ てください
-                romaji = ' '.join(romaji_parts)   # 例如: kakutei shinkoku no kigen wo oshie tekudasai
-                
-                # 如果有括号中的注音,提取括号后的实际含义
-                if '(' in meaning and ')' in meaning:
-                    meaning = meaning[meaning.find(')')+1:].strip()
-                    
-                # 存储格式: [假名, 中文含义, 罗马音]
-                word_dict[kanji] = [reading, meaning, romaji]
-                
-            print(f"词典 {dictionary_file} 从文件加载完成，包含 {len(word_dict)} 个单词")
-            
-            return word_dict
-    except FileNotFoundError:
-        print(f"文件 {dictionary_file} 不存在，返回基本词库")
-        return {
-            '私': ['わたし', '我', 'watashi'],
-            '猫': ['ねこ', '猫', 'neko']
-        }
-
-def check_answer(kanji, user_input, correct_answer):
-    # 移除所有空格后再比较
-    user_input = user_input.replace(" ", "").strip()
-    
-    # 将用户输入转换为罗马音
-    user_input_result = kks.convert(user_input)
-    user_input_romaji = ''.join([item['hepburn'] for item in user_input_result]).lower()
-    
-    # 将正确答案转换为罗马音
-    kanji_result = kks.convert(kanji)
-    kanji_romaji = ''.join([item['hepburn'] for item in kanji_result]).lower()
-    
-    hiragana_result = kks.convert(correct_answer[0])
-    hiragana_romaji = ''.join([item['hepburn'] for item in hiragana_result]).lower()
-    
-    romaji_no_space = correct_answer[2].replace(" ", "").lower()
-    
-    # 检查用户输入是否匹配
-    answer = user_input.strip()
-    
-    # 将答案转换为罗马音
-    answer_result = kks.convert(answer)
-    answer_romaji = ''.join([item['hepburn'] for item in answer_result]).lower()
+logger = get_logger('kotoba')
+
+# 学习模式每页显示的单词数
+STUDY_PAGE_SIZE = 20
+
+def in_worker(func, *args):
+    """线程会话中直接调用；协程会话中放到线程池执行，避免阻塞事件循环（需配合 yield 使用）"""
+    if get_session_implement() == CoroutineBasedSession:
+        return run_asyncio_coroutine(asyncio.to_thread(func, *args))
+    return func(*args)
+
+# 服务端学习进度（进程退出时写入剩余数据）
+progress = ProgressStore(dictionary_registry.current.config.get("progress_db", "progress.db"))
+atexit.register(progress.close)
+
+def check_answer(kanji, user_input, correct_answer, answer_keys=None, keys=None):
+    """检查用户输入是否与正确答案匹配（答案键已预计算，用户输入经 LRU 缓存规范化）
+
+    缓存未命中时要做 pykakasi 转换（或等待转换锁），协程会话中应通过 in_worker 调用。
+    """
+    with ANSWER_CHECK_SECONDS.time():
+        return is_correct(kanji, user_input, correct_answer, answer_keys, keys)
+
+# 会话启动脚本：一次往返返回服务端需要的全部客户端状态（浏览器端的初始化由 static/kotoba.js 在页面加载时完成）
+BOOTSTRAP_JS = 'kotoba.bootstrap()'
+
+def parse_url_params(raw):
+    """把浏览器返回的原始参数转换为设置"""
+    params = {}
     
-    # 检查用户输入是否与正确答案匹配
-    if answer_romaji in [kanji_romaji, hiragana_romaji, romaji_no_space]:
-        toast('👏 正解です！', color='#65e49b')
-        run_js('localStorage.correct = parseInt(localStorage.correct || 0) + 1')
-        return True
-    else:
-        run_js('localStorage.wrong = parseInt(localStorage.wrong || 0) + 1')
-        return False
+    # 检查 dict 参数（名称或文件名，找不到时使用默认词典）
+    params['dict'] = dictionary_registry.current.resolve(raw.get('dict'))
+        
+    # 检查显示选项参数（默认都显示）
+    params['show_reading'] = raw.get('hide_reading') is None      # 如果参数不存在则显示
+    params['show_romaji'] = raw.get('hide_romaji') is None       # 如果参数不存在则显示
+    params['show_placeholder'] = raw.get('hide_placeholder') is None  # 如果参数不存在则显示
+    params['show_katakana_reading'] = raw.get('show_katakana_reading') == '1'  # 默认不显示片假名振り仮名
+    params['study'] = raw.get('study') is not None
+    params['base_url'] = raw.get('base_url') or '/'
+    return params
 
-def get_url_params():
-    """获取 URL 参数"""
+def default_params():
+    """读取 URL 参数失败时使用的设置（默认词典随配置热重载）"""
+    return {'dict': dictionary_registry.current.default, 'show_reading': True, 'show_romaji': True, 'show_placeholder': True, 'show_katakana_reading': False, 'study': False, 'base_url': '/'}
+
+@chose_impl
+def browser_eval(call, expression, **args):
+    """eval_js，同时统计浏览器往返次数和耗时（call 为统计用的调用名）"""
+    start = time.perf_counter()
     try:
-        params = {}
-        
-        # 使用 URLSearchParams 来正确解析 URL 参数
-        search_params = eval_js("new URLSearchParams(window.location.search)")
-        current_dict = eval_js("new URLSearchParams(window.location.search).get('dict')")
-        hide_reading = eval_js("new URLSearchParams(window.location.search).get('hide_reading')")
-        hide_romaji = eval_js("new URLSearchParams(window.location.search).get('hide_romaji')")
-        hide_placeholder = eval_js("new URLSearchParams(window.location.search).get('hide_placeholder')")
-        show_katakana_reading = eval_js("new URLSearchParams(window.location.search).get('show_katakana_reading')")
-        
-        # 检查 dict 参数
-        if current_dict:
-            # 首先尝试通过名称查找
-            found = False
-            for dict_info in config["dictionaries"]:
-                if dict_info["name"] == current_dict or os.path.basename(dict_info["path"]) == current_dict:
-                    params['dict'] = dict_info["path"]
-                    found = True
-                    break
-            if not found:
-                params['dict'] = DEFAULT_DICTIONARY
-        else:
-            params['dict'] = DEFAULT_DICTIONARY
-            
-        # 检查显示选项参数（默认都显示）
-        params['show_reading'] = hide_reading is None      # 如果参数不存在则显示
-        params['show_romaji'] = hide_romaji is None       # 如果参数不存在则显示
-        params['show_placeholder'] = hide_placeholder is None  # 如果参数不存在则显示
-        params['show_katakana_reading'] = show_katakana_reading == '1'  # 默认不显示片假名振り仮名
-        
-        print(f"URL params: {params}")  # 添加调试信息
-        return params
+        return (yield eval_js(expression, **args))
+    finally:
+        EVAL_JS_SECONDS.observe(time.perf_counter() - start, call=call)
+
+@chose_impl
+def bootstrap():
+    """会话启动：一次往返完成浏览器端初始化并读取全部客户端状态（URL 参数、UA、旧计数）"""
+    try:
+        client = (yield browser_eval('bootstrap', BOOTSTRAP_JS)) or {}
     except Exception as e:
-        print(f"Error in get_url_params: {e}")
-        return {'dict': DEFAULT_DICTIONARY, 'show_reading': True, 'show_romaji': True, 'show_placeholder': True, 'show_katakana_reading': False}  # 出错时返回默认值
+        logger.warning("Error in bootstrap: %s", e)
+        client = {}
+    try:
+        params = parse_url_params(client.get('params') or {})
+    except Exception as e:
+        logger.warning("Error in parse_url_params: %s", e)
+        params = default_params()  # 出错时使用默认值
+    logger.debug("URL params: %s", params)
+    session_local.url_params = params
+    session_local.client = client
+    return client
 
-def get_unique_session_id():
+def session_params():
+    """当前会话已读取的 URL 参数"""
+    return getattr(session_local, 'url_params', None) or default_params()
+
+def get_unique_session_id(user_agent):
     # 获取用户 IP
     ip = session_info.user_ip
-    # 获取用户代理信息
-    user_agent = eval_js('navigator.userAgent')
-    # 获取浏览器指纹（使用用户代理的哈希值）
-    browser_fingerprint = hash(user_agent)
+    # 获取浏览器指纹（使用用户代理的哈希值，需跨进程稳定以便保存学习进度）
+    browser_fingerprint = hashlib.sha1(str(user_agent).encode('utf-8')).hexdigest()[:16]
     # 组合成唯一标识（不再使用时间戳）
     return f"{ip}-{browser_fingerprint}"
 
 def show_settings():
     with popup('設定'):
         # 从 URL 获取当前的参数状态
-        params = get_url_params()
+        params = session_params()
         show_reading = params.get('show_reading', True)
         show_romaji = params.get('show_romaji', True)
         show_placeholder = params.get('show_placeholder', True)
@@ -228,19 +147,20 @@ def show_settings():
         put_checkbox('placeholder_mode', options=[{'label': '入力ヒントを表示する', 'value': 'show', 'selected': show_placeholder}])
         put_checkbox('katakana_reading_mode', options=[{'label': 'カタカナにも振り仮名を表示する', 'value': 'show', 'selected': show_katakana_reading}])
         
+        @chose_impl
         def on_confirm():
             # 获取当前复选框状态
-            show_reading = 'show' in pin.reading_mode
-            show_romaji = 'show' in pin.romaji_mode
-            show_placeholder = 'show' in pin.placeholder_mode
-            show_katakana_reading = 'show' in pin.katakana_reading_mode
+            show_reading = 'show' in (yield pin.reading_mode)
+            show_romaji = 'show' in (yield pin.romaji_mode)
+            show_placeholder = 'show' in (yield pin.placeholder_mode)
+            show_katakana_reading = 'show' in (yield pin.katakana_reading_mode)
             
             # 获取当前词典
-            params = get_url_params()
-            current_dict = os.path.basename(params.get('dict', DEFAULT_DICTIONARY))
+            params = session_params()
+            current_dict = os.path.basename(params['dict'])
             
             # 构建新的 URL
-            base_url = eval_js("window.location.origin + window.location.pathname")
+            base_url = params['base_url']
             new_url = f"{base_url}?dict={current_dict}"
             
             # 添加隐藏参数（如果需要隐藏则添加参数）
@@ -257,55 +177,40 @@ def show_settings():
             close_popup()
             run_js(f'window.location.href = "{new_url}"')
             
-        # 添加确认按钮
+        # 添加确认按钮（不要立即应用更改，等待用户点击确认按钮）
         put_buttons(['確認'], onclick=[on_confirm])
-        
-        # 等待用户操作
-        while True:
-            changed = pin_wait_change(['reading_mode', 'romaji_mode', 'placeholder_mode', 'katakana_reading_mode'])
-            # 不要立即应用更改，等待用户点击确认按钮
 
 def show_dictionary_selector():
     with popup('辞書選択'):
         # 从 URL 获取当前词典
-        params = get_url_params()
-        current_dict = os.path.basename(params.get('dict', DEFAULT_DICTIONARY))
+        params = session_params()
+        catalog = dictionary_registry.current
         
         # 使用配置中的词典信息，但这次使用名称作为值
-        options = [(d["name"], d["name"]) for d in config["dictionaries"]]
+        options = [(name, name) for name in catalog.names.values()]
         
-        # 找到当前词典的名称
-        current_name = None
-        for d in config["dictionaries"]:
-            if os.path.basename(d["path"]) == current_dict:
-                current_name = d["name"]
-                break
+        # 当前词典的名称
+        current_name = catalog.names.get(os.path.basename(params['dict']))
         
         # 创建下拉选择框
         put_select('dictionary', 
                   options=options,
                   value=current_name or options[0][0])
         
+        @chose_impl
         def on_confirm():
             # 获取选择的词典名称
-            selected_name = pin.dictionary
-            print(f"Selected dictionary name: {selected_name}")  # 添加调试信息
+            selected_name = yield pin.dictionary
+            logger.debug("Selected dictionary name: %s", selected_name)
             
-            # 查找对应的文件名
-            selected_file = None
-            for d in config["dictionaries"]:
-                if d["name"] == selected_name:
-                    selected_file = os.path.basename(d["path"])
-                    break
+            # 查找对应的文件名（找不到时使用默认词典）
+            selected_file = os.path.basename(dictionary_registry.current.resolve(selected_name))
             
-            if not selected_file:
-                selected_file = os.path.basename(DEFAULT_DICTIONARY)
-            
-            print(f"Selected file: {selected_file}")  # 添加调试信息
+            logger.debug("Selected file: %s", selected_file)
             
             # 获取当前参数
-            params = get_url_params()
-            base_url = eval_js("window.location.origin + window.location.pathname")
+            params = session_params()
+            base_url = params['base_url']
             
             # 构建新的 URL，使用文件名
             new_url = f"{base_url}?dict={selected_file}"
@@ -319,117 +224,59 @@ def show_dictionary_selector():
                 new_url += "&hide_placeholder=1"
             if params.get('show_katakana_reading'):
                 new_url += "&show_katakana_reading=1"
+            if params.get('study'):
+                new_url += "&study=1"
             
-            print(f"Redirecting to: {new_url}")  # 添加调试信息
+            logger.debug("Redirecting to: %s", new_url)
             
             # 关闭弹窗并跳转
             close_popup()
             run_js(f'window.location.href = "{new_url}"')
         
-        # 添加确认按钮
+        # 添加确认按钮（不要立即应用更改，等待用户点击确认按钮）
         put_buttons(['確認'], onclick=[on_confirm])
-        
-        # 等待用户操作
-        while True:
-            changed = pin_wait_change('dictionary')
-            # 不要立即应用更改，等待用户点击确认按钮
-
-def is_kanji(char):
-    """判断字符是否是汉字"""
-    # 汉字的 Unicode 范围
-    return 0x4E00 <= ord(char) <= 0x9FFF
-
-def create_ruby_html(text, reading):
-    """创建带有振り仮名的 HTML"""
-    # 使用 pykakasi 重新获取每个字符的信息
-    result = kks.convert(text)
-    html_parts = []
-    
-    # 获取片假名显示设置
-    params = get_url_params()
-    show_katakana_reading = params.get('show_katakana_reading', False)
-    
-    for item in result:
-        # 如果是汉字，或者（启用了片假名显示且是片假名），则添加振り仮名
-        if any(is_kanji(char) for char in item['orig']) or (show_katakana_reading and any(0x30A0 <= ord(char) <= 0x30FF for char in item['orig'])):
-            html_parts.append(f'<ruby>{item["orig"]}<rt style="color: #666;">{item["hira"]}</rt></ruby>')
-        else:
-            # 如果不是汉字或片假名，直接添加原文
-            html_parts.append(item['orig'])
-    
-    # 返回完整的 HTML
-    return ''.join(html_parts)
 
-def update_header(study_mode):
+def online_text():
+    """在线人数文本"""
+    return f'現在 {presence.count()}人が勉強中'
+
+def stats_text():
+    """统计信息文本（计数来自服务端学习进度）"""
+    correct, wrong = progress.totals(session_local.user_id)
+    return f'正解: {correct} | 不正解: {wrong} | 総単語: {len(session_local.words)} | 辞書: {session_local.dict_label}'
+
+def show_result(correct, answer, kanji, correct_answer):
+    """一次作答的全部反馈合并为一条消息（kotoba.answered）：答对时提示并只更新页头中的计数文本，
+    答错时在提示区域显示对比；随后清空输入框、回到页面顶部"""
+    if correct:
+        feedback = {'correct': True, 'online': online_text(), 'stats': stats_text()}
+    else:
+        feedback = {'correct': False,
+                    'answer': f'❎ {answer.replace(" ", "")}',
+                    'expected': f'✅ {kanji}/{correct_answer[0].replace(" ", "")}/{correct_answer[2].replace(" ", "")}'}
+    run_js('kotoba.answered(feedback)', feedback=feedback)
+
+def render_header(study_mode):
+    """渲染页头（每个会话只渲染一次），计数部分之后由 show_result 增量更新"""
     with use_scope('stats', clear=True):
-        correct = eval_js('parseInt(localStorage.correct || 0)')
-        wrong = eval_js('parseInt(localStorage.wrong || 0)')
-        
-        # 获取在线用户数
-        def get_online_users():
-            global online_users
-            with users_lock:
-                current_time = time.time()
-                online_users = {k: v for k, v in online_users.items() if current_time - v < 60}
-                return len(online_users)
-        
-        # 创建固定的头部
-        online_users = get_online_users()
-        
         # 获取当前词典信息
-        params = get_url_params()
-        current_dict = params.get('dict', DEFAULT_DICTIONARY)
-        current_name = None
-        for d in config["dictionaries"]:
-            if os.path.basename(d["path"]) == os.path.basename(current_dict):
-                current_name = d["name"]
-                break
-        current_name = current_name or os.path.basename(current_dict)
-        
-        # 检查词典是否已缓存
-        js_code = '''
-            (function() {
-                try {
-                    const dict_key = \'''' + get_cache_key(current_dict) + '''\';
-                    console.log('Checking cache for:', dict_key);
-                    const saved = localStorage.getItem(dict_key);
-                    console.log('Cache value:', saved ? 'exists' : 'not found');
-                    if (saved) {
-                        const data = JSON.parse(saved);
-                        console.log('Cache parsed successfully');
-                        return true;
-                    }
-                    console.log('No cache found');
-                    return false;
-                } catch (e) {
-                    console.error('Error checking cache:', e);
-                    return false;
-                }
-            })();
-        '''
-        is_cached = eval_js(js_code)
-        print(f"Cache status for {current_dict}: {is_cached}")  # 添加调试信息
-        
-        cache_icon = '🔋' if is_cached else ''
-        print(f"Cache icon: {cache_icon}")  # 添加调试信息
+        params = session_params()
+        current_dict = params['dict']
+        session_local.dict_label = dictionary_registry.current.label(current_dict)
         
         with use_scope('header'):
             put_row([
                 # 添加 logo
-                put_html('''
-                    <div style="margin-top: 0; position:relative; ">
-                        <svg width="42px" height="42px" viewBox="0 0 36 36" xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" aria-hidden="true" role="img" class="iconify iconify--twemoji" preserveAspectRatio="xMidYMid meet" fill="#000000"><g id="SVGRepo_bgCarrier" stroke-width="0"></g><g id="SVGRepo_tracerCarrier" stroke-linecap="round" stroke-linejoin="round"></g><g id="SVGRepo_iconCarrier"><path fill="#A6D388" d="M6.401 28.55c5.006 5.006 16.502 11.969 29.533-.07c-7.366-1.417-8.662-10.789-13.669-15.794c-5.006-5.007-11.991-6.139-16.998-1.133c-5.006 5.006-3.873 11.99 1.134 16.997z"></path><path fill="#77B255" d="M24.684 29.81c6.128 1.634 10.658-.738 11.076-1.156c0 0-3.786 1.751-10.359-1.476c.952-1.212 3.854-2.909 3.854-2.909c-.553-.346-4.078-.225-6.485 1.429a37.028 37.028 0 0 1-3.673-2.675l.84-.871c3.25-3.384 6.944-2.584 6.944-2.584c-.638-.613-5.599-3.441-9.583.7l-.613.638a54.727 54.727 0 0 1-1.294-1.25l-1.85-1.85l1.064-1.065c3.321-3.32 8.226-3.451 8.226-3.451c-.626-.627-6.863-2.649-10.924 1.412l-.736.735l-8.292-8.294c-.626-.627-1.692-.575-2.317.05c-.626.626-.677 1.691-.051 2.317l8.293 8.293l-.059.059C4.684 21.924 6.37 28.496 6.997 29.123c0 0 .468-5.242 3.789-8.562l.387-.388l3.501 3.502c.057.057.113.106.17.163c-2.425 4.797 1.229 10.34 1.958 10.784c0 0-1.465-4.723.48-8.635c1.526 1.195 3.02 2.095 4.457 2.755c.083 2.993 2.707 5.7 3.344 5.931c0 0-.911-3.003-.534-4.487l.135-.376z"></path><path d="M22.083 10a1.001 1.001 0 0 1-.375-1.927c.166-.068 4.016-1.698 4.416-6.163a1 1 0 1 1 1.992.178c-.512 5.711-5.451 7.755-5.661 7.839a.978.978 0 0 1-.372.073zm5 4a1 1 0 0 1-.334-1.942c.188-.068 4.525-1.711 5.38-8.188a.99.99 0 0 1 1.122-.86a.998.998 0 0 1 .86 1.122c-1.021 7.75-6.468 9.733-6.699 9.813c-.109.037-.22.055-.329.055zm3.001 6a1.001 1.001 0 0 1-.483-1.876c.027-.015 2.751-1.536 3.601-3.518a1 1 0 0 1 1.837.788c-1.123 2.62-4.339 4.408-4.475 4.483a1.003 1.003 0 0 1-.48.123z" fill="#5DADEC"></path></g></svg>   
-                        <a href='/' title='' style='position:absolute; bottom:15px;color: #000;'>言葉</a>
-                    </div>
-                '''),
+                put_html(f'<div class="kotoba-logo"><img src="{asset_url("logo.svg")}" width="42" height="42" alt="">'
+                         f'<a href="/">言葉</a></div>'),
                 put_grid([
-                    [put_text(f'現在 {online_users}人が勉強中').style('color: #666; font-size: 0.8em;')],
+                    [put_html(f'<span id="kotoba-online">{html.escape(online_text())}</span>').style('color: #666; font-size: 0.8em;')],
                     [put_buttons(
-                        ['📘 辞書', '⚙️ 設定', '⚡ キャッシュ'],
+                        ['📘 辞書', '✏️ 練習' if study_mode else '🔍 学習', '⚙️ 設定'],
                         onclick=[
                             lambda: show_dictionary_selector(),
-                            lambda: show_settings(),
-                            lambda: cache_dictionary()
+                            lambda: toggle_study_mode(study_mode),
+                            lambda: show_settings()
                         ],
                         small=True,
                         link_style=True
@@ -437,35 +284,18 @@ def update_header(study_mode):
                 ]).style('text-align: right;font-weight: normal;')
             ], size='50% 50%')
             
-            put_text(f'正解: {correct} | 不正解: {wrong} | 総単語: {len(words)} | 辞書: {current_name} {cache_icon}').style(
-                '''
-                white-space: pre-wrap;
-                font-size: 0.8em;
-                font-weight: normal;
-                margin: 0 0 10px 0;
-                color: #666;
-                text-align: center;
-                border-top: 1px solid #eee;
-                padding-top: 20px;
-                '''
-            )
+            put_html(f'<p id="kotoba-stats">{html.escape(stats_text())}</p>')
 
 def switch_dictionary(dictionary_file):
     # 在配置中查找完整路径
-    full_path = None
-    for dict_info in config["dictionaries"]:
-        if os.path.basename(dict_info["path"]) == dictionary_file:
-            full_path = dict_info["path"]
-            break
-    
-    if not full_path:
-        full_path = DEFAULT_DICTIONARY
+    catalog = dictionary_registry.current
+    full_path = catalog.files.get(dictionary_file, catalog.default)
     
-    print(f"Switching to dictionary: {full_path}")  # 添加调试信息
+    logger.debug("Switching to dictionary: %s", full_path)
     
     # 获取当前参数
-    params = get_url_params()
-    base_url = eval_js("window.location.origin + window.location.pathname")
+    params = session_params()
+    base_url = params['base_url']
     
     # 构建新的 URL，使用文件名而不是完整路径
     new_url = f"{base_url}?dict={os.path.basename(full_path)}"
@@ -479,176 +309,164 @@ def switch_dictionary(dictionary_file):
         new_url += "&hide_placeholder=1"
     if params.get('show_katakana_reading'):
         new_url += "&show_katakana_reading=1"
+    if params.get('study'):
+        new_url += "&study=1"
     
-    print(f"Redirecting to: {new_url}")  # 添加调试信息
+    logger.debug("Redirecting to: %s", new_url)
     
     # 跳转到新的 URL
     run_js(f'window.location.href = "{new_url}"')
 
-def cache_dictionary():
-    """缓存当前词典到localStorage"""
-    params = get_url_params()
-    current_dict = params.get('dict', DEFAULT_DICTIONARY)
-    
-    with popup('辞書をキャッシュ中...', closable=False) as s:
-        # 显示进度
-        put_row([
-            put_loading().style('width: 1.5em; height: 1.5em;'),
-            put_text('キャッシュを準備中...').style('margin-left: 10px;')
-        ])
-        
-        # 计算总词数
-        total_words = len(words)
-        put_processbar('cache-progress')
-        
-        # 将词典转换为JSON字符串
-        word_dict = {}
-        for i, (kanji, value) in enumerate(words.items(), 1):
-            word_dict[kanji] = value
-            # 更新进度
-            set_processbar('cache-progress', i/total_words)
-            if i % 100 == 0:  # 每处理100个词更新一次提示
-                put_text(f'処理中: {i}/{total_words}').style('color: #666; font-size: 0.8em;')
-        
-        # 将词典转换为JSON字符串
-        dict_json = json.dumps(word_dict, ensure_ascii=False)
-        
-        # 保存到localStorage
-        js_code = '''
-            (async function() {
-                try {
-                    // 缓存词典
-                    const dict_key = \'''' + get_cache_key(current_dict) + '''\';
-                    const dict_data = ''' + json.dumps(dict_json) + ''';
-                    localStorage.setItem(dict_key, dict_data);
-                    console.log('Dictionary cached:', dict_key);
-                    console.log('Dictionary size:', dict_data.length, 'bytes');
-                    
-                    // 验证词典数据是否正确保存
-                    const saved = localStorage.getItem(dict_key);
-                    if (saved) {
-                        try {
-                            JSON.parse(saved);
-                            // 记录缓存时间
-                            localStorage.setItem('cache_time_''' + get_cache_key(current_dict) + '''', new Date().toISOString());
-                            return true;
-                        } catch (e) {
-                            console.error('Cache validation failed:', e);
-                            return false;
-                        }
-                    }
-                    return false;
-                } catch(e) {
-                    console.error('Error saving cache:', e);
-                    return false;
-                }
-            })();
-        '''
+def toggle_study_mode(study_mode):
+    """在学习模式和练习模式之间切换（保留其它 URL 参数）"""
+    run_js('kotoba.toggleStudy(study)', study=not study_mode)
+
+def get_search_index():
+    """全部配置词典的搜索索引（首次调用或词典变化后会构建，协程会话中应放到工作线程）"""
+    return get_index(dictionary_registry.current.paths)
+
+def put_word_list(rows, show_katakana_reading):
+    """学习模式的单词表，rows 为 [(词典, 单词)]"""
+    table = []
+    for dictionary, word in rows:
+        reading, meaning, romaji = dictionary.words[word]
+        ruby_html = create_ruby_html(word, show_katakana_reading, dictionary.ruby_segments.get(word))
+        name = dictionary_registry.current.label(dictionary.path)
+        table.append([put_html(ruby_html), reading, meaning, romaji, name])
+    put_table(table, header=['単語', '読み', '意味', 'ローマ字', '辞書'])
+
+@chose_impl
+def study(dictionary, show_katakana_reading):
+    """学习模式：分页浏览当前词典，或跨全部词典搜索（漢字・かな・ローマ字・中国語）"""
+    query, page = '', 0
+    while True:
+        offset = page * STUDY_PAGE_SIZE
+        if query:
+            index = yield in_worker(get_search_index)
+            hits, more = index.search(query, STUDY_PAGE_SIZE, offset)
+            rows = [(hit_dictionary, word) for hit_dictionary, word, _ in hits]
+        else:
+            # 使用最新发布的版本（流式加载的快照或热重载后的新版本）
+            dictionary = peek_dictionary(dictionary.path) or dictionary
+            keys = dictionary.packed.keys
+            rows = [(dictionary, word) for word in keys[offset:offset + STUDY_PAGE_SIZE]]
+            more = offset + STUDY_PAGE_SIZE < len(keys)
         
-        success = eval_js(js_code)
+        with use_scope('question', clear=True):
+            if rows:
+                put_word_list(rows, show_katakana_reading)
+            else:
+                put_text('見つかりませんでした').style('color: #999;')
         
-        # 显示完成提示
-        clear(s)
-        if success:
-            put_text('✅ キャッシュが完了しました！').style('color: green;')
-            put_text(f'総単語数: {total_words}').style('color: #666; font-size: 0.8em;')
-            
-            # 3秒后刷新页面
-            run_js('''
-                setTimeout(() => {
-                    window.location.reload();  // 刷新页面以显示缓存状态
-                }, 3000);
-            ''')
-            toast('✅ 辞書をキャッシュしました')
+        form = yield input_group('', [
+            input(name='query', value=query, placeholder='漢字・かな・ローマ字・中国語で検索', autocomplete='off'),
+            actions(name='action', buttons=[
+                {'label': '🔍 検索', 'value': 'search', 'type': 'submit'},
+                {'label': '◀ 前へ', 'value': 'prev', 'type': 'submit', 'disabled': page == 0},
+                {'label': '次へ ▶', 'value': 'next', 'type': 'submit', 'disabled': not more},
+            ]),
+        ])
+        submitted = form['query'].strip()
+        if form['action'] == 'prev' and submitted == query:
+            page = max(0, page - 1)
+        elif form['action'] == 'next' and submitted == query:
+            page += 1
         else:
-            put_text('❌ キャッシュの保存に失敗しました').style('color: red;')
-            put_text('ブラウザのストレージ容量が不足している可能性があります。').style('color: #666; font-size: 0.8em;')
+            # 新的查询（或清空查询回到浏览）从第一页开始
+            query, page = submitted, 0
 
-def main():
-    # 在函数开始时声明所有全局变量
-    global online_users
-    global words
-    
-    # 获取 URL 参数
-    params = get_url_params()
-    
-    # 从 URL 参数获取词典，如果没有则使用默认词典
-    current_dict = params.get('dict', DEFAULT_DICTIONARY)
-    print(f"Loading dictionary: {current_dict}")  # 添加调试信息
-    words = load_words(current_dict)
+@chose_impl
+def quiz():
+    """答题主流程（同一份代码同时用于线程会话和协程会话）"""
+    started = time.perf_counter()
+    SESSIONS_TOTAL.inc()
+    ACTIVE_SESSIONS.inc()
+    defer_call(ACTIVE_SESSIONS.dec)
+    if get_session_implement() != CoroutineBasedSession:
+        # 线程会话：会话关闭后线程应随之结束，否则计为泄漏
+        session_thread = threading.current_thread()
+        defer_call(lambda: session_threads.session_closed(session_thread))
     
     # 设置环境，禁用固定输入面板
     set_env(input_panel_fixed=False, auto_scroll_bottom=False, output_animation=False)
     
-    # 使用 JavaScript 初始化设置（如果未设置）
-    run_js('''
-        if (localStorage.getItem('helpMode') === null) {
-            localStorage.setItem('helpMode', 'true');
-        }
-        if (localStorage.getItem('hideRomaji') === null) {
-            localStorage.setItem('hideRomaji', 'false');
-        }
-    ''')
+    # 第一个会话开始时在后台初始化 pykakasi，学习者看题期间完成，首次答题检查无需等待
+    warm_up_kakasi()
     
-    # footer
-    run_js('''
-        var footer = document.querySelector('footer');
-        if (footer) {
-            footer.innerHTML = '© <a href="https://iamcheyan.com/">Cheyan</a> All Rights Reserved';
-            footer.innerHTML += `
-                <div style="display: inline-block; padding-left: 10px; zoom: 0.8; position: relative; top: -2px;">
-                    <a href="https://github.com/iamcheyan/kotoba" target="_blank" title="GitHubでソースコードを見る">
-                        <svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24"><path d="M12 0c-6.626 0-12 5.373-12 12 0 5.302 3.438 9.8 8.207 11.387.599.111.793-.261.793-.577v-2.234c-3.338.726-4.033-1.416-4.033-1.416-.546-1.387-1.333-1.756-1.333-1.756-1.089-.745.083-.729.083-.729 1.205.084 1.839 1.237 1.839 1.237 1.07 1.834 2.807 1.304 3.492.997.107-.775.418-1.305.762-1.604-2.665-.305-5.467-1.334-5.467-5.931 0-1.311.469-2.381 1.236-3.221-.124-.303-.535-1.524.117-3.176 0 0 1.008-.322 3.301 1.23.957-.266 1.983-.399 3.003-.404 1.02.005 2.047.138 3.006.404 2.291-1.552 3.297-1.23 3.297-1.23.653 1.653.242 2.874.118 3.176.77.84 1.235 1.911 1.235 3.221 0 4.609-2.807 5.624-5.479 5.921.43.372.823 1.102.823 2.222v3.293c0 .319.192.694.801.576 4.765-1.589 8.199-6.086 8.199-11.386 0-6.627-5.373-12-12-12z"/></svg>
-                    </a>
-                </div>
-            `;
-        }
-    ''')
+    # 一次往返完成浏览器端初始化并读取客户端状态
+    client = yield bootstrap()
+    params = session_params()
     
-    # 使用新的方法获取唯一会话 ID
-    user_id = get_unique_session_id()
+    # 从 URL 参数获取词典，如果没有则使用默认词典
+    current_dict = params['dict']
+    logger.debug("Loading dictionary: %s", current_dict)
+    # 每个会话单独保存当前词典（词典数据本身是所有会话共享的只读对象）
+    dictionary = session_local.dictionary = yield in_worker(current_dictionary, current_dict)
+    session_local.words = dictionary.words
+    show_katakana_reading = params.get('show_katakana_reading', False)
+    yield in_worker(warm_ruby_cache, dictionary, show_katakana_reading)
     
-    # 打印调试信息
-    print(f"New user connected: {user_id}")
+    # 使用新的方法获取唯一会话 ID
+    user_id = get_unique_session_id(client.get('user_agent'))
     
     # 注册用户
-    with users_lock:
-        online_users[user_id] = time.time()
-        print(f"Current online users: {len(online_users)}")  # 调试信息
-    
-    # 定期更新用户活跃时间
-    def keep_alive():
-        while True:
-            with users_lock:
-                online_users[user_id] = time.time()
-            time.sleep(60)  # 每分钟更新一次
+    logger.debug("New user connected: %s, online users: %d", user_id, presence.register(user_id))
     
-    # 启动保活线程
-    threading.Thread(target=keep_alive, daemon=True).start()
+    # 会话结束时注销（由 pywebio 在会话关闭时调用，无需保活线程）
+    defer_call(lambda: presence.unregister(user_id))
     
-    # 注册会话结束回调
-    def on_close():
-        with users_lock:
-            if user_id in online_users:
-                del online_users[user_id]
-    
-    pywebio.session.register_thread(on_close)
+    # 读取服务端学习进度
+    session_local.user_id = user_id
+    user_progress = yield in_worker(progress.load_user, user_id, current_dict)
+    defer_call(lambda: progress.release(user_id))
+    if not user_progress.known:
+        # 新用户沿用浏览器中旧版本保存的计数
+        counts = client.get('counts') or {}
+        if counts.get('correct') or counts.get('wrong'):
+            progress.seed_totals(user_id, counts.get('correct') or 0, counts.get('wrong') or 0)
     
     # 获取 URL 参数
-    study_mode = 'study' in params
+    study_mode = params.get('study', False)
     
     # 创建统计信息区域
     put_scope('stats')
-    update_header(study_mode)
+    render_header(study_mode)
     
     # 创建问题区域的 scope
     put_scope('question').style('margin: 0 20px; text-align: center;')
     put_scope('alerts')  # 添加一个专门的 scope 用于显示提示信息
     
+    if study_mode:
+        # 学习模式：浏览和搜索单词，不出题
+        yield study(dictionary, show_katakana_reading)
+        return
+    
+    def new_pipeline(dictionary, previous=None):
+        # 出题调度：答错的单词和到期需要复习的单词会更常出现
+        scheduler = QuestionScheduler.for_dictionary(dictionary)
+        for word in progress.due_words(user_id, current_dict):
+            scheduler.set_weight(word, DUE_WEIGHT)
+        if previous is not None:
+            # 换用词典的新版本时沿用本会话中已调整的权重
+            scheduler.inherit(previous.scheduler)
+        # 学习者作答期间在后台准备后续题目
+        return QuestionPipeline(scheduler, dictionary, show_katakana_reading)
+    
+    pipeline = new_pipeline(dictionary)
+    answered_at = None
+    
     while True:
-        # 随机选择一个单词
-        kanji = random.choice(list(words.keys()))
-        correct_answer = words[kanji]  # [hiragana, meaning, romaji]
+        # 后台发布了新版本（流式加载的更大快照，或文件变化后重新构建的词典）时换用，不等待构建
+        latest = peek_dictionary(current_dict)
+        if latest is not None and latest is not dictionary:
+            dictionary = session_local.dictionary = latest
+            session_local.words = latest.words
+            pipeline = new_pipeline(dictionary, pipeline)
+        
+        # 取出下一道已准备好的题目
+        question, prefetched = pipeline.next()
+        kanji = question.kanji
+        correct_answer = question.answer  # [hiragana, meaning, romaji]
         
         # 继续尝试直到答对
         while True:
@@ -657,14 +475,12 @@ def main():
                 
                 # 单词位置
                 # 显示带振り仮名的汉字（如果是汉字的话）
-                ruby_html = create_ruby_html(kanji, correct_answer[0])
-                put_html(f'<h2 style="border:none; margin: 20px 0;">{ruby_html}</h2>')
+                put_html(f'<h2 class="kotoba-word">{question.ruby_html}</h2>')
                 
                 # 显示中文含义
                 put_text(f'{correct_answer[1]}')
                 
-                # 获取显示设置
-                params = get_url_params()
+                # 获取显示设置（会话开始时已读取）
                 show_reading = params.get('show_reading', True)
                 show_romaji = params.get('show_romaji', True)
                 show_placeholder = params.get('show_placeholder', True)
@@ -675,52 +491,43 @@ def main():
                 if show_romaji:
                     put_text(f'{correct_answer[2]}').style('color: #999;')
                 
+                if started is not None:
+                    # 从会话开始到第一题显示的服务端耗时（包含与浏览器的往返）
+                    QUESTION_LATENCY_SECONDS.observe(time.perf_counter() - started, kind='first')
+                    started = None
+                elif answered_at is not None:
+                    # 从答对到下一题显示的服务端耗时
+                    QUESTION_LATENCY_SECONDS.observe(time.perf_counter() - answered_at,
+                                                     kind='prefetched' if prefetched else 'cold')
+                    answered_at = None
+                pipeline.prefetch()
+                
                 # 获取用户输入（根据设置显示或隐藏提示文字）
-                answer = input(f'{kanji}', placeholder=correct_answer[0] if show_placeholder else '', autocomplete="off")   # 输入框
+                answer = yield input(f'{kanji}', placeholder=correct_answer[0] if show_placeholder else '', autocomplete="off")   # 输入框
                 
                 # 如果用户没有输入直接提交,跳过当前题目
                 if not answer.strip():
                     break
                 
-            # 处理iOS软键盘收起时的页面滚动问题
-            run_js('''
-                // 判断是否是iOS设备
-                const isIOS = /iPad|iPhone|iPod/.test(navigator.userAgent) && !window.MSStream;
-                if(isIOS) {
-                    // 记录当前滚动位置
-                    const scrollTop = document.documentElement.scrollTop || document.body.scrollTop;
-                    // 设置页面固定
-                    document.body.style.position = 'fixed';
-                    document.body.style.width = '100%';
-                    document.body.style.top = -scrollTop + 'px';
-                    // 延迟执行滚动到顶部
-                    setTimeout(() => {
-                        // 恢复页面定位
-                        document.body.style.position = '';
-                        document.body.style.width = '';
-                        document.body.style.top = '';
-                        // 滚动到顶部
-                        window.scrollTo(0, 0);
-                    }, 300);
-                } else {
-                    // 非iOS设备直接滚动到顶部
-                    window.scrollTo(0, 0);
-                }
-            ''')
-            
-            # 检查答案（在专门的提示区域显示结果）
-            with use_scope('alerts', clear=True):
-                if check_answer(kanji, answer, correct_answer):
-                    # 答对了，更新统计信息并进入下一题
-                    update_header(study_mode)
-                    run_js('document.querySelector("form").reset()')
-                    break  # 跳出内层循环，进入下一个单词
-                else:
-                    # 答错了，显示错误对比
-                    put_text(f'❎ {answer.replace(" ", "")}').style('color: red;')
-                    put_text(f'✅ {kanji}/{correct_answer[0].replace(" ", "")}/{correct_answer[2].replace(" ", "")}').style('color: green;')
-                    run_js('document.querySelector("form").reset()')
-                    continue  # 继续内层循环，重新输入
+            # 检查答案：输入的转换（本进程或转换进程池）在协程会话中放到线程里，不阻塞事件循环
+            correct = yield in_worker(check_answer, kanji, answer, correct_answer, None, question.answer_keys)
+            # 只写入内存缓冲区，由后台线程批量写盘
+            progress.record(user_id, current_dict, kanji, correct)
+            pipeline.record(kanji, correct)
+            show_result(correct, answer, kanji, correct_answer)
+            if correct:
+                # 答对了，进入下一题
+                answered_at = time.perf_counter()
+                break
+            # 答错了，继续内层循环，重新输入
+
+def main():
+    """线程会话入口"""
+    quiz()
+
+async def main_async():
+    """协程会话入口：会话挂起时不占用线程，适合大量同时在线的学习者"""
+    await quiz()
 
 if __name__ == '__main__':
     # 创建命令行参数解析器
@@ -728,11 +535,40 @@ if __name__ == '__main__':
     parser.add_argument('port', nargs='?', type=int, default=5000,
                       help='服务器端口号 (默认: 5000)')
     
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                      help='使用协程会话，适合大量同时在线的学习者')
+    
+    parser.add_argument('--workers', type=int, default=1,
+                      help='工作进程数；大于 1 时以多进程（WebSocket）模式运行，0 表示 CPU 核数 (默认: 1)')
+    
+    parser.add_argument('--convert-workers', type=int, default=0,
+                      help='pykakasi 转换进程池的进程数（词典冷构建、答案检查缓存未命中），0 表示不启用 (默认: 0)')
+    
+    parser.add_argument('--trust-proxy', action='store_true',
+                      help='部署在反向代理之后时使用，采用 X-Forwarded-For 中的客户端地址（直接对外服务时不要开启，该头可被伪造）')
+    
+    parser.add_argument('--reload', action='store_true',
+                      help='代码修改后自动重启（开发用；服务在子进程中重新导入全部模块，启动更慢）')
+    
     # 解析命令行参数
     args = parser.parse_args()
     
+    # docker stop 等发送 SIGTERM 时正常退出，确保 atexit 写入剩余学习进度
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     # 启动服务器
-    print(f"Starting server on port {args.port}")
-    start_server(main, port=args.port, debug=True)
+    setup_logging()
+    conversion.configure(args.convert_workers)
+    logger.info("Starting server on port %d", args.port)
+    if args.workers != 1:
+        start_prefork_server(main_async if args.use_async else main, dictionary_registry,
+                             port=args.port, workers=args.workers or None, trust_proxy=args.trust_proxy)
+    elif args.use_async:
+        # 协程会话依赖在服务进程中启动的事件循环线程，自动重载的子进程中不会启动，因此关闭重载
+        start_server(main_async, dictionary_registry, port=args.port, debug=True, use_reloader=False,
+                     trust_proxy=args.trust_proxy)
+    else:
+        start_server(main, dictionary_registry, port=args.port, debug=True, use_reloader=args.reload,
+                     trust_proxy=args.trust_proxy)
 
 
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""答案检查微基准：旧实现（每次提交 4 次 pykakasi 转换） vs 预计算答案键 + LRU 规范化"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer import is_correct, normalize_answer
+from dict_store import get_dictionary, get_kakasi
+
+kks = get_kakasi()
+
+
+def legacy_check(kanji, user_input, correct_answer):
+    """原 check_answer 的匹配逻辑（不含 UI 调用）"""
+    user_input = user_input.replace(" ", "").strip()
+    kks.convert(user_input)
+    kanji_romaji = ''.join([item['hepburn'] for item in kks.convert(kanji)]).lower()
+    hiragana_romaji = ''.join([item['hepburn'] for item in kks.convert(correct_answer[0])]).lower()
+    romaji_no_space = correct_answer[2].replace(" ", "").lower()
+    answer_romaji = ''.join([item['hepburn'] for item in kks.convert(user_input.strip())]).lower()
+    return answer_romaji in [kanji_romaji, hiragana_romaji, romaji_no_space]
+
+
+def measure(fn, samples):
+    start = time.perf_counter()
+    results = [fn(kanji, user_input, answer) for kanji, user_input, answer in samples]
+    return (time.perf_counter() - start) / len(samples), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dict', default='dictionaries/base.json', help='词典文件')
+    parser.add_argument('-n', type=int, default=2000, help='提交次数')
+    args = parser.parse_args()
+
+    dictionary = get_dictionary(args.dict)
+    rng = random.Random(0)
+    keys = list(dictionary.words.keys())
+    samples = []
+    for _ in range(args.n):
+        kanji = rng.choice(keys)
+        answer = dictionary.words[kanji]
+        # 一半输入假名、一半输入罗马音，模拟真实提交
+        user_input = answer[0] if rng.random() < 0.5 else answer[2]
+        samples.append((kanji, user_input, answer))
+
+    legacy, legacy_results = measure(legacy_check, samples)
+    normalize_answer.cache_clear()
+    cold, new_results = measure(lambda k, u, a: is_correct(k, u, a, dictionary.answer_keys), samples)
+    warm, _ = measure(lambda k, u, a: is_correct(k, u, a, dictionary.answer_keys), samples)
+
+    agree = sum(a == b for a, b in zip(legacy_results, new_results))
+    print(f"词典: {args.dict} ({len(dictionary)} 个单词), 提交次数: {args.n}")
+    print(f"旧实现:          {legacy * 1e6:8.1f} µs/次")
+    print(f"新实现(冷缓存):  {cold * 1e6:8.1f} µs/次  ({legacy / cold:.1f}x)")
+    print(f"新实现(热缓存):  {warm * 1e6:8.1f} µs/次  ({legacy / warm:.1f}x)")
+    print(f"结果一致: {agree}/{args.n}")
+
+
+if __name__ == '__main__':
+    main()
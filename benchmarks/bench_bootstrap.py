@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""首题时间基准：从打开会话到第一题输入框出现的耗时和 eval_js 往返次数
+
+默认在子进程中启动当前代码的 app.py；--url 可指向已运行的服务（例如旧版本）做前后对比。
+--rtt 模拟浏览器与服务器之间的网络往返延迟，往返次数越多首题越慢。
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from webio_client import WebIOClient, start_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=20, help='会话数')
+    parser.add_argument('--rtt', type=float, default=50, help='模拟往返延迟（毫秒）')
+    parser.add_argument('--url', help='已运行的服务地址（不指定时自动启动 app.py）')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='使用协程会话启动 app.py')
+    args = parser.parse_args()
+
+    proc = None
+    if args.url is None:
+        proc = start_app(args.port, *(['--async'] if args.use_async else []))
+        args.url = f'http://127.0.0.1:{args.port}'
+    try:
+        timings, trips = [], []
+        for _ in range(args.n):
+            client = WebIOClient(args.url, rtt=args.rtt / 1000)
+            start = time.perf_counter()
+            client.next_input()
+            timings.append((time.perf_counter() - start) * 1000)
+            trips.append(client.round_trips)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    timings.sort()
+    print(f'sessions: {args.n}, simulated rtt: {args.rtt:.0f} ms')
+    print(f'eval_js round trips before first question: {statistics.mean(trips):.1f}')
+    print(f'time to first question: median {statistics.median(timings):.1f} ms, '
+          f'max {timings[-1]:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
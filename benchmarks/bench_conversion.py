@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""转换进程池基准：后台冷构建一个大词典的同时，测量答案检查（规范化缓存未命中）的延迟
+
+分别在服务进程内转换（默认）和启用转换进程池（--workers）两种情况下运行，
+报告构建耗时和答案检查延迟的 p50/p99。
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from answer import normalize_answer
+from convert_pool import conversion
+from dict_store import convert_items
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def synthetic_items(size):
+    """由 base.json 复制出 size 个互不相同的词条"""
+    with open('dictionaries/base.json', 'r', encoding='utf-8') as f:
+        base = list(json.load(f).items())
+    return [(f'{kanji}{i}', meaning) for i, (kanji, meaning) in
+            ((i, base[i % len(base)]) for i in range(size))]
+
+
+def run(workers, items, inputs, interval):
+    conversion.configure(workers)
+    if workers:
+        conversion.start()
+    normalize_answer.cache_clear()
+
+    build = {}
+
+    def builder():
+        start = time.perf_counter()
+        build['count'] = sum(1 for _ in convert_items(items))
+        build['seconds'] = time.perf_counter() - start
+
+    thread = threading.Thread(target=builder)
+    thread.start()
+    latencies = []
+    for text in inputs:
+        if not thread.is_alive():
+            break
+        start = time.perf_counter()
+        normalize_answer(text)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    thread.join()
+    return build, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=20000, help='冷构建的词条数')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='转换进程池的进程数')
+    parser.add_argument('--interval', type=float, default=5, help='两次答案检查之间的间隔（毫秒）')
+    args = parser.parse_args()
+
+    items = synthetic_items(args.size)
+    # 每次都是新的输入，模拟规范化缓存未命中
+    inputs = [f'{kanji}を' for kanji, _ in items]
+    print(f"冷构建 {args.size} 个词条，期间每 {args.interval:.0f} ms 检查一次答案")
+    for label, workers in (('进程内转换', 0), (f'进程池 ({args.workers})', args.workers)):
+        build, latencies = run(workers, items, inputs, args.interval / 1000)
+        print(f"{label:<12} 构建 {build['seconds']:6.2f} s   答案检查 {len(latencies):5d} 次  "
+              f"p50 {percentile(latencies, 50) * 1e3:7.2f} ms   p99 {percentile(latencies, 99) * 1e3:7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""按词典的微基准：词典加载、答案检查、振り仮名渲染
+
+默认测试 config.json 中的全部词典。
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from answer import is_correct, normalize_answer
+from dict_store import Dictionary, build_dictionary, compile_entries, get_dictionary, source_digest
+from ruby import create_ruby_html
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def per_op(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(*item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def config_dictionaries():
+    with open('config.json', 'r', encoding='utf-8') as f:
+        return [d['path'] for d in json.load(f)['dictionaries']]
+
+
+def bench_load(path, compile_source):
+    """词典加载：源文件完整转换 / 预编译产物 / 进程缓存命中"""
+    mtime = os.stat(path).st_mtime_ns
+    results = {}
+    if compile_source:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        results['源文件转换'], _ = timed(
+            lambda: Dictionary(path, mtime, compile_entries(json.loads(raw.decode('utf-8'))), source_digest(raw)))
+    results['预编译产物'], dictionary = timed(build_dictionary, path, mtime)
+    get_dictionary(path)
+    results['缓存命中'], _ = timed(get_dictionary, path)
+    return dictionary, results
+
+
+def bench_check(dictionary, samples):
+    """答案检查：规范化缓存为空 / 已缓存"""
+    normalize_answer.cache_clear()
+    cold = per_op(lambda k, u, a: is_correct(k, u, a, dictionary.answer_keys), samples)
+    warm = per_op(lambda k, u, a: is_correct(k, u, a, dictionary.answer_keys), samples)
+    return cold, warm
+
+
+def bench_ruby(dictionary, kanji_samples, convert_samples):
+    """振り仮名渲染：现场转换 / 预计算分段 / 渲染缓存命中"""
+    create_ruby_html.cache_clear()
+    convert = per_op(lambda k: create_ruby_html(k), convert_samples)
+    create_ruby_html.cache_clear()
+    items = [(k, False, dictionary.ruby_segments.get(k)) for k in kanji_samples]
+    segments = per_op(create_ruby_html, items)
+    cached = per_op(create_ruby_html, items)
+    return convert, segments, cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('files', nargs='*', help='词典文件（默认为 config.json 中的全部词典）')
+    parser.add_argument('-n', type=int, default=2000, help='答案检查/渲染次数')
+    parser.add_argument('--no-compile', action='store_true', help='跳过源文件完整转换（大词典较慢）')
+    args = parser.parse_args()
+
+    for path in args.files or config_dictionaries():
+        dictionary, loads = bench_load(path, not args.no_compile)
+        rng = random.Random(0)
+        keys = list(dictionary.words)
+        picked = [rng.choice(keys) for _ in range(args.n)]
+        samples = []
+        for kanji in picked:
+            answer = dictionary.words[kanji]
+            # 一半输入假名、一半输入罗马音，模拟真实提交
+            samples.append((kanji, answer[0] if rng.random() < 0.5 else answer[2], answer))
+        check_cold, check_warm = bench_check(dictionary, samples)
+        # 现场转换较慢，只取一小部分样本
+        ruby_convert, ruby_segments, ruby_cached = bench_ruby(
+            dictionary, picked, [(k,) for k in picked[:max(1, args.n // 10)]])
+
+        print(f"{path} ({len(dictionary)} 词):")
+        for label, seconds in loads.items():
+            print(f"  load_words {label:<8} {seconds * 1e3:10.2f} ms")
+        print(f"  check_answer 冷缓存     {check_cold * 1e6:10.2f} µs/次")
+        print(f"  check_answer 热缓存     {check_warm * 1e6:10.2f} µs/次")
+        print(f"  create_ruby_html 现场转换 {ruby_convert * 1e6:8.2f} µs/次")
+        print(f"  create_ruby_html 预计算   {ruby_segments * 1e6:8.2f} µs/次")
+        print(f"  create_ruby_html 缓存命中 {ruby_cached * 1e6:8.2f} µs/次")
+
+
+if __name__ == '__main__':
+    main()
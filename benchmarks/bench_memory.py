@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""词典内存基准：比较三种内存表示在 config.json 全部词典和一个合成的 20 万词条词典上的内存占用
+
+legacy: 原始实现 {汉字: [假名, 中文含义, 罗马音]}（不含答案键和振り仮名分段）
+dicts:  三个独立字典 {汉字: 元组}（紧凑存储之前的 Dictionary）
+packed: 紧凑列式存储（当前的 Dictionary）
+
+每项在独立子进程中测量：tracemalloc 统计的常驻字节数，以及进程 RSS 增量。
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+REPRESENTATIONS = ('legacy', 'dicts', 'packed')
+SYNTHETIC = 'synthetic'
+
+
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def load_entries(path, size):
+    """逐条生成 (汉字, 假名, 中文含义, 罗马音, 答案键, 振り仮名分段)"""
+    from dict_store import compile_entries, file_digest, read_artifact
+
+    if path == SYNTHETIC:
+        base = list(load_entries('dictionaries/base.json', 0))
+        # 每个词条的字符串都不相同，避免被共享
+        for i in range(size):
+            k, r, m, ro, keys, segs = base[i % len(base)]
+            yield (f'{k}{i}', f'{r}{i}', f'{m}{i}', f'{ro}{i}', tuple(f'{key}{i}' for key in keys),
+                   segs + ((str(i), str(i)),))
+        return
+    packed = read_artifact(path, file_digest(path))
+    if packed is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from compile_entries(json.load(f))
+        return
+    words, keys, segments = _views(packed)
+    for k in packed.keys:
+        yield (k,) + words[k] + (keys[k], segments[k])
+
+
+def _views(packed):
+    from packed import AnswerKeysView, SegmentsView, WordsView
+    return WordsView(packed), AnswerKeysView(packed), SegmentsView(packed)
+
+
+def build(representation, entries):
+    """单次遍历构建，避免整个词条列表同时驻留在内存中"""
+    if representation == 'legacy':
+        return {e[0]: [e[1], e[2], e[3]] for e in entries}
+    if representation == 'dicts':
+        words, answer_keys, segments = {}, {}, {}
+        for e in entries:
+            words[e[0]] = (e[1], e[2], e[3])
+            answer_keys[e[0]] = e[4]
+            segments[e[0]] = e[5]
+        return tuple(types.MappingProxyType(d) for d in (words, answer_keys, segments))
+    from dict_store import Dictionary
+    return Dictionary('bench', 0, entries)
+
+
+def child(path, representation, size, mode):
+    """在子进程中测量一种表示，输出字节数"""
+    import dict_store  # noqa: F401  预先导入，避免模块本身计入
+    gc.collect()
+    if mode == 'tracemalloc':
+        tracemalloc.start()
+    before = rss()
+    kept = build(representation, load_entries(path, size))
+    gc.collect()
+    if mode == 'tracemalloc':
+        print(tracemalloc.get_traced_memory()[0])
+    else:
+        print(rss() - before)
+    return kept
+
+
+def measure(path, representation, size, mode):
+    out = subprocess.run([sys.executable, __file__, '--child', path, representation, str(size), mode],
+                         capture_output=True, text=True, check=True).stdout
+    return int(out.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='*', help='词典文件（默认为 config.json 中的全部词典）')
+    parser.add_argument('--synthetic', type=int, default=200000, help='合成词典的词条数（0 表示不测试）')
+    args = parser.parse_args()
+
+    if args.files:
+        targets = [(path, 0) for path in args.files]
+    else:
+        with open('config.json', 'r', encoding='utf-8') as f:
+            targets = [(d['path'], 0) for d in json.load(f)['dictionaries']]
+    if args.synthetic:
+        targets.append((SYNTHETIC, args.synthetic))
+
+    print(f"{'词典':<34}{'表示':<8}{'常驻(tracemalloc)':>20}{'RSS 增量':>14}")
+    for path, size in targets:
+        label = f'{SYNTHETIC} ({size})' if path == SYNTHETIC else path
+        for representation in REPRESENTATIONS:
+            traced = measure(path, representation, size, 'tracemalloc')
+            resident = measure(path, representation, size, 'rss')
+            print(f"{label:<34}{representation:<8}{traced / 2**20:>17.2f} MiB{resident / 2**20:>11.2f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""传输量基准：每个会话启动和每答对一题时服务器发给浏览器的字节数
+
+默认以多进程模式（--workers 2，WebSocket）启动当前代码的 app.py，每条指令是一条 WebSocket 消息，
+统计的是实际指令字节数；--http 改用单进程的 HTTP 轮询模式（包含空轮询响应，数值有抖动）。
+--url 可指向已运行的服务（例如旧版本）做前后对比。
+另外列出首页 HTML 和页面引用的静态资源大小（浏览器按版本缓存，每个版本只下载一次）。
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from webio_client import WebIOClient, WebSocketClient, start_app
+
+ASSET_LINK = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+
+
+def page_sizes(url):
+    """首页 HTML 大小和其中引用的本地静态资源 {路径: 大小}"""
+    with urllib.request.urlopen(f'{url}/?app=index') as resp:
+        page = resp.read()
+    assets = {}
+    for path in ASSET_LINK.findall(page.decode('utf-8')):
+        with urllib.request.urlopen(url + path) as resp:
+            assets[path] = len(resp.read())
+    return len(page), assets
+
+
+def run_session(client_class, url, answers):
+    """返回 (会话启动到第一题的字节数, 每答对一题的平均字节数)"""
+    client = client_class(url)
+    try:
+        _, msg = client.next_input()
+        setup = client.bytes_received
+        for _ in range(answers):
+            client.answer(msg)
+            _, msg = client.next_input()
+        return setup, (client.bytes_received - setup) / answers
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=50, help='每个会话答题数')
+    parser.add_argument('--sessions', type=int, default=5, help='会话数')
+    parser.add_argument('--http', action='store_true', help='使用 HTTP 轮询模式（默认 WebSocket）')
+    parser.add_argument('--url', help='已运行的服务地址（不指定时自动启动 app.py）')
+    parser.add_argument('--port', type=int, default=8098)
+    args = parser.parse_args()
+
+    proc = None
+    if args.url is None:
+        proc = start_app(args.port, *([] if args.http else ['--workers', '2']))
+        args.url = f'http://127.0.0.1:{args.port}'
+    client_class = WebIOClient if args.http else WebSocketClient
+    try:
+        page, assets = page_sizes(args.url)
+        results = [run_session(client_class, args.url, args.n) for _ in range(args.sessions)]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(f"协议: {'HTTP 轮询' if args.http else 'WebSocket'}, {args.sessions} 个会话 × {args.n} 题")
+    print(f"首页 HTML: {page} B")
+    for path, size in assets.items():
+        print(f"静态资源 {path}: {size} B（按版本缓存）")
+    print(f"会话启动到第一题: 中位数 {statistics.median(setup for setup, _ in results):.0f} B")
+    print(f"每答对一题: 中位数 {statistics.median(per for _, per in results):.0f} B")
+
+
+if __name__ == '__main__':
+    main()
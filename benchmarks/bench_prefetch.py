@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""下一题耗时微基准：答对后现场准备下一题 vs 从预取队列中取出"""
+
+import argparse
+import os
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from answer import _fallback_keys
+from dict_store import get_dictionary
+from prefetch import QuestionPipeline
+from ruby import create_ruby_html
+from scheduler import QuestionScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('files', nargs='*', default=['dictionaries/base.json'], help='词典文件')
+    parser.add_argument('-n', type=int, default=500, help='题目数')
+    args = parser.parse_args()
+
+    for path in args.files:
+        compiled = get_dictionary(path)
+        # 没有预计算振り仮名和答案键的词典（未编译或浏览器缓存的格式），准备一题需要现场转换
+        raw = types.SimpleNamespace(words=compiled.words, ruby_segments={}, answer_keys={})
+
+        print(f"{path} ({len(compiled.words)} 词):")
+        for label, dictionary in (('预编译', compiled), ('未编译', raw)):
+            # 现场准备（渲染缓存为空，相当于旧流程中答对后才开始准备下一题）
+            create_ruby_html.cache_clear()
+            _fallback_keys.cache_clear()
+            pipeline = QuestionPipeline(QuestionScheduler(tuple(dictionary.words)), dictionary, depth=0)
+            start = time.perf_counter()
+            for _ in range(args.n):
+                pipeline.next()
+            cold = (time.perf_counter() - start) / args.n
+
+            # 预取：学习者作答期间后台已准备好，答对后只需出队
+            create_ruby_html.cache_clear()
+            _fallback_keys.cache_clear()
+            pipeline = QuestionPipeline(QuestionScheduler(tuple(dictionary.words)), dictionary)
+            waits, hits = 0.0, 0
+            for _ in range(args.n):
+                pipeline.prefetch()
+                time.sleep(0.005)       # 模拟学习者作答
+                start = time.perf_counter()
+                _, prefetched = pipeline.next()
+                waits += time.perf_counter() - start
+                hits += prefetched
+
+            print(f"  {label} 现场准备:  {cold * 1e6:8.1f} µs/题")
+            print(f"  {label} 预取出队:  {waits / args.n * 1e6:8.1f} µs/题  (命中 {hits}/{args.n})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""在线统计与会话线程泄漏检查：打开并关闭大量真实的 PyWebIO 会话
+
+在本进程中用 PyWebIO 的 Tornado WebSocket 处理器运行 app.main（线程会话），
+由 WebSocket 客户端打开会话、答一题后断开连接，让 PyWebIO 走正常的会话关闭流程（defer_call）。
+全部会话关闭后检查：进程线程数回到基线、presence.count() 归零、
+活动会话数归零、ThreadTracker 未发现泄漏的会话线程。
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from webio_client import ROOT, WebSocketClient
+
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import tornado.ioloop
+import tornado.web
+from pywebio.platform.tornado import webio_handler
+
+import app
+from metrics import ACTIVE_SESSIONS
+from metrics import threads as session_threads
+from presence import presence
+
+
+def serve(port, ready):
+    """在后台线程中运行 Tornado 服务"""
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    application = tornado.web.Application([(r'/', webio_handler(app.main, cdn=False))])
+    application.listen(port, address='127.0.0.1')
+    ready.set()
+    tornado.ioloop.IOLoop.current().start()
+
+
+def run_session(url, user_agent):
+    """一个会话: 打开 -> 答一题 -> 断开"""
+    client = WebSocketClient(url, user_agent=user_agent)
+    try:
+        _, msg = client.next_input()
+        client.answer(msg)
+        client.next_input()
+    finally:
+        client.close()
+
+
+def run_sessions(url, n, users, concurrency):
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(run_session, url, f'bench-presence-{i % users}') for i in range(n)]:
+            future.result()
+
+
+def wait_for(check, timeout):
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return check()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=2000, help='会话数')
+    parser.add_argument('--users', type=int, default=200, help='不同用户数（同一用户会多开会话）')
+    parser.add_argument('--concurrency', type=int, default=16, help='同时打开的会话数')
+    parser.add_argument('--port', type=int, default=8097)
+    parser.add_argument('--timeout', type=float, default=30, help='等待会话线程退出的最长秒数')
+    args = parser.parse_args()
+
+    ready = threading.Event()
+    threading.Thread(target=serve, args=(args.port, ready), daemon=True).start()
+    ready.wait()
+    url = f'http://127.0.0.1:{args.port}'
+
+    # 预热：词典、pykakasi、学习进度写盘线程等一次性的后台线程在基线之前启动
+    run_sessions(url, args.concurrency, args.concurrency, args.concurrency)
+    wait_for(lambda: ACTIVE_SESSIONS.value() == 0, args.timeout)
+    time.sleep(1)
+    baseline = threading.active_count()
+
+    # 会话进行期间采样最大线程数（包括客户端线程）
+    peak, running = baseline, True
+
+    def sample():
+        nonlocal peak
+        while running:
+            peak = max(peak, threading.active_count())
+            time.sleep(0.01)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.perf_counter()
+    run_sessions(url, args.n, args.users, args.concurrency)
+    elapsed = time.perf_counter() - start
+    running = False
+    sampler.join()
+
+    settled = wait_for(lambda: threading.active_count() <= baseline and presence.count() == 0
+                       and ACTIVE_SESSIONS.value() == 0, args.timeout)
+    leaked = session_threads.leaked()
+    print(f"会话数: {args.n}（{args.users} 个用户，并发 {args.concurrency}），耗时: {elapsed:.2f}s")
+    print(f"线程数: 基线 {baseline}, 过程中最多 {peak}（含 {args.concurrency} 个客户端线程）, 结束 {threading.active_count()}")
+    print(f"在线人数: {presence.count()}, 活动会话: {ACTIVE_SESSIONS.value():.0f}, 泄漏的会话线程: {leaked}")
+    if not settled or leaked:
+        print("❌ 存在泄漏")
+        sys.exit(1)
+    print("✅ 会话关闭后线程数回到基线，在线人数归零")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""出题调度微基准：旧实现 random.choice(list(keys)) vs 均匀/加权调度器"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduler import QuestionScheduler
+
+
+def per_op(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='词典大小')
+    parser.add_argument('-n', type=int, default=2000, help='每项操作次数')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        words = {f'単語{i}': ('', '', '') for i in range(size)}
+        rng = random.Random(0)
+
+        # 单词数组和下标每个词典只构建一次（所有会话共享）
+        start = time.perf_counter()
+        uniform = QuestionScheduler(tuple(words), weighted=False, rng=rng)
+        build_shared = time.perf_counter() - start
+        # 加权调度器每个会话构建一次
+        start = time.perf_counter()
+        weighted = QuestionScheduler(uniform.keys, uniform.index, rng=rng)
+        build_session = time.perf_counter() - start
+
+        legacy = per_op(lambda: random.choice(list(words.keys())), args.n)
+        draw_uniform = per_op(uniform.next, args.n)
+        draw_weighted = per_op(weighted.next, args.n)
+        record = per_op(lambda: weighted.record(weighted.keys[rng.randrange(size)], rng.random() < 0.7), args.n)
+
+        print(f"词典大小 {size}:")
+        print(f"  构建单词索引(共享):  {build_shared * 1e3:8.2f} ms")
+        print(f"  构建加权调度(会话):  {build_session * 1e3:8.2f} ms")
+        print(f"  旧实现抽题:          {legacy * 1e6:8.2f} µs/次")
+        print(f"  均匀抽题:            {draw_uniform * 1e6:8.2f} µs/次")
+        print(f"  加权抽题:            {draw_weighted * 1e6:8.2f} µs/次")
+        print(f"  加权更新:            {record * 1e6:8.2f} µs/次")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""搜索基准：在合成的大词库（默认 10 万词条）上测量索引构建耗时、索引内存和各类查询的延迟
+
+合成词库由 config.json 中全部词典的词条复制而成，每个副本的单词、读音、罗马音和含义都加上编号，
+查询取自原始词条：罗马音前缀、假名前缀、单词前缀、单个汉字、中文含义片段。
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from dict_store import Dictionary, get_dictionary
+from search import KANJI, SearchIndex
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def source_entries():
+    with open('config.json', 'r', encoding='utf-8') as f:
+        paths = [d['path'] for d in json.load(f)['dictionaries']]
+    entries = []
+    for path in paths:
+        dictionary = get_dictionary(path)
+        for word in dictionary.words:
+            entries.append((word,) + dictionary.words[word] + (dictionary.answer_keys[word],
+                                                                  dictionary.ruby_segments[word]))
+    return entries
+
+
+def synthetic_dictionaries(entries, size, count=4):
+    """把 size 个合成词条分到 count 个词典中"""
+    per_dictionary = -(-size // count)
+    dictionaries = []
+    for d in range(count):
+        chunk = []
+        for i in range(d * per_dictionary, min(size, (d + 1) * per_dictionary)):
+            k, r, m, ro, keys, segs = entries[i % len(entries)]
+            copy = i // len(entries)
+            chunk.append((f'{k}{copy}', f'{r}{copy}', f'{m}{copy}', f'{ro}{copy}', keys, segs))
+        dictionaries.append(Dictionary(f'synthetic-{d}.json', 0, chunk, digest=str(d)))
+    return dictionaries
+
+
+def make_queries(entries, n, rng):
+    queries = {'romaji': [], 'kana': [], 'word': [], 'kanji': [], 'meaning': []}
+    while min(len(q) for q in queries.values()) < n:
+        word, reading, meaning, romaji = rng.choice(entries)[:4]
+        compact = romaji.replace(' ', '')
+        if len(compact) >= 3:
+            queries['romaji'].append(compact[:rng.randint(2, min(5, len(compact)))])
+        kana = reading.replace(' ', '')
+        if len(kana) >= 2:
+            queries['kana'].append(kana[:rng.randint(1, min(3, len(kana)))])
+        queries['word'].append(word[:rng.randint(1, min(3, len(word)))])
+        chars = KANJI.findall(word)
+        if chars:
+            queries['kanji'].append(rng.choice(chars))
+        text = ''.join(meaning.split()[-1:])
+        if len(text) >= 2:
+            start = rng.randrange(len(text) - 1)
+            queries['meaning'].append(text[start:start + rng.randint(2, 3)])
+    return {kind: items[:n] for kind, items in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=100000, help='合成词库的词条数')
+    parser.add_argument('-n', type=int, default=1000, help='每类查询的次数')
+    parser.add_argument('--limit', type=int, default=20, help='每次查询返回的条数')
+    args = parser.parse_args()
+
+    entries = source_entries()
+    dictionaries = synthetic_dictionaries(entries, args.size)
+    start = time.perf_counter()
+    index = SearchIndex(dictionaries)
+    build = time.perf_counter() - start
+    # 内存单独再构建一次测量（tracemalloc 会显著拖慢构建）
+    gc.collect()
+    tracemalloc.start()
+    measured = SearchIndex(dictionaries)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+    print(f"词条数: {len(index)}, 索引构建: {build:.2f} s, 索引内存: {memory / 2**20:.1f} MiB")
+
+    queries = make_queries(entries, args.n, random.Random(0))
+    # 预热（首次查询会初始化 pykakasi 等）
+    for items in queries.values():
+        index.search(items[0], args.limit)
+    print(f"{'查询类型':<10}{'p50':>10}{'p99':>10}{'最大':>10}   平均结果数")
+    for kind, items in queries.items():
+        latencies, found = [], 0
+        for query in items:
+            start = time.perf_counter()
+            hits, _ = index.search(query, args.limit)
+            latencies.append(time.perf_counter() - start)
+            found += len(hits)
+        print(f"{kind:<12}{percentile(latencies, 50) * 1e6:8.0f}µs{percentile(latencies, 99) * 1e6:8.0f}µs"
+              f"{max(latencies) * 1e6:8.0f}µs   {found / len(items):.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""启动基准：导入耗时，以及冷启动到可以服务的时间
+
+导入: 在新进程中执行 python -X importtime -c 'import app'，重复 -n 次取中位数，
+      并列出自身耗时最多的模块。
+冷启动: 以各种模式启动 app.py，测量从启动进程起
+      端口可连接、首个 HTTP 响应（/metrics）、第一个会话出题、第一次答题检查完成 的时间，
+      以及此时服务进程的 RSS。
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import process_stats, server_pids
+from webio_client import ROOT, WebIOClient, WebSocketClient
+
+MODES = {
+    'thread': [],
+    'async': ['--async'],
+    'workers=2': ['--workers', '2'],
+}
+
+
+def import_times(runs):
+    """[(app 的总导入耗时 µs, {模块: 自身耗时 µs})]"""
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT,
+                              capture_output=True, text=True, check=True)
+        own, total = {}, None
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            own[name.strip()] = int(self_us)
+            if name.strip() == 'app':
+                total = int(cumulative_us)
+        results.append((total, own))
+    return results
+
+
+def wait_until(check, proc, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('app.py exited with %s' % proc.returncode)
+        try:
+            if check():
+                return
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError
+
+
+def port_open(port):
+    with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+        return True
+
+
+def http_ok(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as resp:
+        return resp.status == 200
+
+
+def cold_start(port, args, client_class, timeout=60):
+    """启动一次 app.py，返回各阶段距启动的秒数和 RSS"""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'app.py', str(port), *args], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        timings = {}
+        wait_until(lambda: port_open(port), proc, timeout)
+        timings['端口'] = time.perf_counter() - start
+        wait_until(lambda: http_ok(port), proc, timeout)
+        timings['HTTP'] = time.perf_counter() - start
+        client = client_class(f'http://127.0.0.1:{port}')
+        _, msg = client.next_input()
+        timings['首题'] = time.perf_counter() - start
+        client.answer(msg)
+        client.next_input()
+        timings['首次答题'] = time.perf_counter() - start
+        client.close()
+        _, rss, _ = process_stats(server_pids(proc.pid))
+        return timings, rss
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', type=int, default=5, help='每项重复次数（取中位数）')
+    parser.add_argument('--port', type=int, default=8097)
+    parser.add_argument('--modes', nargs='*', default=list(MODES), choices=list(MODES), help='冷启动测量的模式')
+    parser.add_argument('--top', type=int, default=10, help='列出自身导入耗时最多的模块数')
+    args = parser.parse_args()
+
+    results = import_times(args.n)
+    print(f"import app: 中位数 {statistics.median(total for total, _ in results) / 1e3:.0f} ms")
+    modules = {name: statistics.median(own.get(name, 0) for _, own in results) for name in results[0][1]}
+    for name, us in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<40}{us / 1e3:8.1f} ms")
+
+    print(f"\n{'模式':<12}{'端口':>10}{'HTTP':>10}{'首题':>10}{'首次答题':>10}{'RSS':>12}")
+    for mode in args.modes:
+        client_class = WebSocketClient if '--workers' in MODES[mode] else WebIOClient
+        runs = [cold_start(args.port, MODES[mode], client_class) for _ in range(args.n)]
+        row = [statistics.median(timings[key] for timings, _ in runs) for key in runs[0][0]]
+        rss = statistics.median(rss for _, rss in runs)
+        print(f"{mode:<12}" + ''.join(f"{value:8.2f} s" for value in row) + f"{rss / 2**20:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""流式加载基准：合成大词典（无预编译产物）从开始加载到可以出题、到全部转换完成的耗时"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import dict_store
+from dict_store import get_dictionary
+
+
+def synthetic_dictionary(path, size, fmt):
+    """用真实词典的词条拼出 size 个不重复的词条"""
+    with open('dictionaries/base.json', 'r', encoding='utf-8') as f:
+        base = list(json.load(f).items())
+    rng = random.Random(0)
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'jsonl':
+            for i in range(size):
+                kanji, meaning = rng.choice(base)
+                f.write(json.dumps([f'{kanji}{i}', meaning], ensure_ascii=False) + '\n')
+        else:
+            json.dump({f'{rng.choice(base)[0]}{i}': rng.choice(base)[1] for i in range(size)},
+                      f, ensure_ascii=False, indent=1)
+
+
+def measure(path, stream):
+    dict_store.STREAM_LOADING = stream
+    start = time.perf_counter()
+    dictionary = get_dictionary(path)
+    first = time.perf_counter() - start
+    first_words = len(dictionary)
+    while not dictionary.complete:
+        time.sleep(0.05)
+        dictionary = get_dictionary(path)
+    return first, first_words, time.perf_counter() - start, len(dictionary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000], help='词典大小')
+    parser.add_argument('--format', choices=['json', 'jsonl'], default='json')
+    parser.add_argument('--blocking', action='store_true', help='同时测试非流式加载（大词典很慢）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'synthetic_{size}.{args.format}')
+            synthetic_dictionary(path, size, args.format)
+            modes = [('流式', True)] + ([('非流式', False)] if args.blocking else [])
+            for label, stream in modes:
+                # 每次换一个文件修改时间，避免命中进程缓存
+                os.utime(path, ns=(time.time_ns(), time.time_ns()))
+                first, first_words, total, words = measure(path, stream)
+                print(f"{size:>7} 词 {label}: 可出题 {first * 1e3:9.1f} ms ({first_words} 词)   "
+                      f"全部完成 {total:7.2f} s ({words} 词)")
+
+
+if __name__ == '__main__':
+    main()
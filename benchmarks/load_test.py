@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""负载测试：模拟 N 个同时在线的学习者连续答题
+
+报告首题时间和答题延迟（提交答案到下一题出现）的 p50/p99，以及服务进程的线程数和 RSS。
+默认在子进程中启动 app.py；--url/--pid 可测试已运行的服务。
+会话使用 PyWebIO 的 HTTP 轮询协议；--workers 大于 1 时以多进程模式启动，改用 WebSocket。
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from webio_client import WebIOClient, WebSocketClient, start_app
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def server_pids(pid):
+    """真正处理请求的进程：Flask 调试模式下是重载器的子进程，多进程模式下是全部工作进程"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = f.read().split()
+    except OSError:
+        return [pid]
+    return [int(child) for child in children] or [pid]
+
+
+def _read_fields(path):
+    fields = {}
+    with open(path) as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            fields[key] = value.strip()
+    return fields
+
+
+def process_stats(pids):
+    """各进程的 (线程数, RSS 字节, PSS 字节) 之和，读取 /proc，仅支持 Linux
+
+    多进程模式下共享的页（内存映射的词典、fork 前加载的对象）在每个进程的 RSS 中都会重复计入，
+    PSS 按共享进程数分摊，更接近实际占用。
+    """
+    threads = rss = pss = 0
+    for pid in pids:
+        status = _read_fields(f'/proc/{pid}/status')
+        threads += int(status['Threads'])
+        rss += int(status['VmRSS'].split()[0]) * 1024
+        pss += int(_read_fields(f'/proc/{pid}/smaps_rollup')['Pss'].split()[0]) * 1024
+    return threads, rss, pss
+
+
+class Sampler(threading.Thread):
+    """定期采样服务进程的线程数和内存"""
+
+    def __init__(self, pids, interval=0.2):
+        super().__init__(daemon=True)
+        self.pids = pids
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.samples.append(process_stats(self.pids))
+            except OSError:
+                return
+            self.stopped.wait(self.interval)
+
+
+def learner(url, answers, rtt, results, errors, client_class=WebIOClient):
+    """一个学习者：打开页面，连续答对 answers 道题"""
+    try:
+        client = client_class(url, rtt=rtt)
+        start = time.perf_counter()
+        _, msg = client.next_input()
+        results['first'].append(time.perf_counter() - start)
+        for _ in range(answers):
+            start = time.perf_counter()
+            client.answer(msg)
+            _, msg = client.next_input()
+            results['answer'].append(time.perf_counter() - start)
+        client.close()
+    except Exception as e:
+        errors.append(repr(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--sessions', type=int, default=20, help='同时在线的会话数')
+    parser.add_argument('--answers', type=int, default=20, help='每个会话答题数')
+    parser.add_argument('--rtt', type=float, default=0, help='模拟往返延迟（毫秒）')
+    parser.add_argument('--url', help='已运行的服务地址（不指定时自动启动 app.py）')
+    parser.add_argument('--pid', type=int, help='已运行服务的进程号（用于采样线程数和 RSS）')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--async', dest='use_async', action='store_true', help='使用协程会话启动 app.py')
+    parser.add_argument('--workers', type=int, default=1, help='以多进程模式启动 app.py 的工作进程数（使用 WebSocket）')
+    args = parser.parse_args()
+
+    proc = None
+    pids = None
+    if args.url is None:
+        proc = start_app(args.port, *(['--async'] if args.use_async else []), '--workers', str(args.workers))
+        args.url = f'http://127.0.0.1:{args.port}'
+        pids = server_pids(proc.pid)
+    elif args.pid:
+        pids = server_pids(args.pid)
+    client_class = WebSocketClient if args.workers != 1 else WebIOClient
+    try:
+        sampler = Sampler(pids) if pids else None
+        baseline = process_stats(pids) if pids else None
+        if sampler:
+            sampler.start()
+
+        results = {'first': [], 'answer': []}
+        errors = []
+        learners = [threading.Thread(target=learner,
+                                     args=(args.url, args.answers, args.rtt / 1000, results, errors, client_class))
+                    for _ in range(args.sessions)]
+        start = time.perf_counter()
+        for t in learners:
+            t.start()
+        for t in learners:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        if sampler:
+            sampler.stopped.set()
+            sampler.join()
+            final = process_stats(pids)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print(f"会话数: {args.sessions}, 每会话答题: {args.answers}, 模拟往返: {args.rtt:.0f} ms, 总耗时: {elapsed:.1f} s")
+    print(f"完成答题: {len(results['answer'])}, 吞吐: {len(results['answer']) / elapsed:.1f} 题/秒, 错误: {len(errors)}")
+    for label, key in (('首题时间', 'first'), ('答题延迟', 'answer')):
+        values = results[key]
+        print(f"{label}: p50 {percentile(values, 50) * 1e3:8.1f} ms   p99 {percentile(values, 99) * 1e3:8.1f} ms")
+    if sampler and sampler.samples:
+        peak_threads = max(t for t, _, _ in sampler.samples)
+        print(f"线程数: 开始 {baseline[0]}, 峰值 {peak_threads}, 结束 {final[0]}")
+        for i, label in ((1, 'RSS'), (2, 'PSS')):
+            peak = max(sample[i] for sample in sampler.samples)
+            print(f"{label}: 开始 {baseline[i] / 2**20:.1f} MiB, 峰值 {peak / 2**20:.1f} MiB, "
+                  f"结束 {final[i] / 2**20:.1f} MiB")
+    for error in errors[:5]:
+        print(f"  错误: {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""无浏览器的 PyWebIO 客户端（供基准测试模拟学习者使用）
+
+WebIOClient 按 PyWebIO 的 HTTP 协议收发消息：GET 拉取指令，POST 回传事件；
+WebSocketClient 用于多进程部署模式（--workers），每条指令/事件是一条 WebSocket 消息。
+eval_js 的返回值按脚本内容模拟，输入框直接提交占位符（即正确读音）。
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class WebIOClient:
+    """一个模拟会话"""
+
+    def __init__(self, base, query='', rtt=0.0, poll_interval=0.005, user_agent=None):
+        self.base = base.rstrip('/')
+        self.url = f'{self.base}/?app=index'
+        self.query = query
+        self.rtt = rtt                      # 模拟浏览器与服务器之间的往返延迟（秒）
+        self.poll_interval = poll_interval
+        self.user_agent = user_agent or f'bench-agent-{uuid.uuid4().hex[:8]}'
+        self.session_id = 'NEW-' + uuid.uuid4().hex
+        self.ack = -1
+        self.seq = 0
+        self.pending = []
+        self.round_trips = 0                # eval_js 往返次数
+        self.bytes_received = 0
+
+    def _request(self, method, body=None):
+        url = f'{self.url}&ack={self.ack}' + (f'&seq={self.seq}' if method == 'POST' else '')
+        req = urllib.request.Request(url, data=body, method=method, headers={
+            'webio-session-id': self.session_id, 'content-type': 'application/json'})
+        with urllib.request.urlopen(req) as resp:
+            raw = resp.read()
+        self.bytes_received += len(raw)
+        data = json.loads(raw)
+        if self.session_id.startswith('NEW-'):
+            self.session_id = self.session_id[4:]
+        skip = self.ack - data['seq'] + 1
+        batches = data['commands'][max(skip, 0):]
+        if batches:
+            self.ack = data['seq'] + len(data['commands']) - 1
+        for batch in batches:
+            self.pending.extend(batch)
+
+    def receive(self, timeout):
+        """拉取待处理的指令"""
+        self._request('GET')
+        if not self.pending:
+            time.sleep(self.poll_interval)
+
+    def send(self, events):
+        if self.rtt:
+            time.sleep(self.rtt)
+        self._request('POST', json.dumps(events).encode('utf-8'))
+        self.seq += len(events)
+
+    def close(self):
+        pass
+
+    def url_params(self):
+        params = {'dict': None, 'study': None, 'hide_reading': None, 'hide_romaji': None,
+                  'hide_placeholder': None, 'show_katakana_reading': None, 'base_url': self.base + '/'}
+        for item in filter(None, self.query.split('&')):
+            key, _, value = item.partition('=')
+            params[key] = value or '1'
+        return params
+
+    def eval_result(self, code):
+        """模拟浏览器执行 eval_js 的结果（同时兼容旧版本的逐项读取）"""
+        if 'kotoba.bootstrap()' in code or 'user_agent: navigator.userAgent' in code:
+            return {'params': self.url_params(), 'user_agent': self.user_agent,
+                    'counts': {'correct': 0, 'wrong': 0}}
+        if 'URLSearchParams' in code:
+            return self.url_params()
+        if 'userAgent' in code:
+            return self.user_agent
+        if 'localStorage' in code:
+            return {'correct': 0, 'wrong': 0}
+        return None
+
+    def next_input(self, timeout=30):
+        """处理指令直到出现输入框，返回 (标签, 输入框指令)"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if not self.pending:
+                self.receive(deadline - time.perf_counter())
+                continue
+            msg = self.pending.pop(0)
+            command, spec = msg.get('command'), msg.get('spec') or {}
+            if command == 'run_script' and spec.get('eval'):
+                self.round_trips += 1
+                self.send([{'event': 'js_yield', 'task_id': msg['task_id'], 'data': self.eval_result(spec['code'])}])
+            elif command == 'input_group':
+                return spec['inputs'][0].get('label'), msg
+        raise TimeoutError('no question within %.0fs' % timeout)
+
+    def answer(self, msg, value=None):
+        """提交答案（默认提交占位符，即正确读音）"""
+        field = msg['spec']['inputs'][0]
+        value = field.get('placeholder') or 'x' if value is None else value
+        self.send([{'event': 'from_submit', 'task_id': msg['task_id'], 'data': {field['name']: value}}])
+
+
+class WebSocketClient(WebIOClient):
+    """WebSocket 协议的模拟会话，使用线程私有的事件循环同步收发"""
+
+    def __init__(self, base, query='', rtt=0.0, user_agent=None):
+        super().__init__(base, query, rtt, user_agent=user_agent)
+        url = 'ws' + self.base[len('http'):] + '/?app=index&session=NEW'
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        request = HTTPRequest(url, headers={'User-Agent': self.user_agent})
+        self.connection = self._run(lambda: websocket_connect(request))
+
+    def _run(self, start, timeout=None):
+        """在事件循环中执行 start() 返回的协程/Future 直到完成"""
+        async def wrapper():
+            return await asyncio.wait_for(start(), timeout)
+        return self.loop.run_until_complete(wrapper())
+
+    def receive(self, timeout):
+        message = self._run(self.connection.read_message, max(timeout, 0))
+        if message is None:
+            raise ConnectionError('websocket closed')
+        self.bytes_received += len(message.encode('utf-8') if isinstance(message, str) else message)
+        self.pending.append(json.loads(message))
+
+    def send(self, events):
+        if self.rtt:
+            time.sleep(self.rtt)
+        for event in events:
+            self._run(lambda: self.connection.write_message(json.dumps(event)))
+
+    def close(self):
+        self.connection.close()
+        self.loop.close()
+
+
+def start_app(port, *args, wait=30):
+    """在子进程中启动 app.py，等待端口可用"""
+    proc = subprocess.Popen([sys.executable, 'app.py', str(port), *args], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/?app=index', timeout=1).read()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError('app.py exited with %s' % proc.returncode)
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError('app.py did not start within %ss' % wait)
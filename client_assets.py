@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""浏览器端静态资源（static/ 下的脚本、样式和图标）
+
+启动时读入内存，按内容生成版本号并预先 gzip 压缩。页面以 /static/<文件名>?v=<版本> 引用，
+内容变化时 URL 随之变化，因此浏览器可以长期缓存，每个版本只下载一次。
+"""
+
+import gzip
+import hashlib
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+MIMETYPES = {
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.svg': 'image/svg+xml',
+}
+
+
+class Asset:
+    """一个静态资源文件的内容、版本号和各编码版本"""
+
+    __slots__ = ('name', 'version', 'mimetype', 'bodies')
+
+    def __init__(self, name, body, mimetype):
+        self.name = name
+        self.version = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.mimetype = mimetype
+        self.bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9)}
+
+    @property
+    def url(self):
+        return f'/static/{self.name}?v={self.version}'
+
+
+def load_assets(directory=STATIC_DIR):
+    """读取目录中所有已知类型的文件：{文件名: Asset}"""
+    assets = {}
+    for name in sorted(os.listdir(directory)):
+        mimetype = MIMETYPES.get(os.path.splitext(name)[1])
+        if mimetype is None:
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            assets[name] = Asset(name, f.read(), mimetype)
+    return assets
+
+
+ASSETS = load_assets()
+
+
+def asset_url(name):
+    """带版本号的资源 URL"""
+    return ASSETS[name].url
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+# 词典 JSON 格式版本，格式变化时递增使浏览器和代理中的旧缓存失效
+PAYLOAD_FORMAT = 1
+
+
+def cache_version(dictionary):
+    """缓存版本：词典内容哈希 + 格式版本"""
+    if dictionary.digest is None:
+        return None
+    return f'{dictionary.digest}-{PAYLOAD_FORMAT}'
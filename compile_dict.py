@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import glob
+import os
+import time
+
+from dict_store import (_artifact_lock, convert_items, iter_source_items, read_artifact, source_digest,
+                        write_artifact)
+from packed import PackedEntries
+
+
+def compile_dictionary(path, force=False):
+    """把一个词典 JSON 编译为预计算产物，内容未变化时跳过"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = source_digest(raw)
+
+    # 与运行中的服务共用跨进程构建锁：服务端的工作进程等待编译完成后直接映射产物
+    with _artifact_lock(path):
+        if not force and read_artifact(path, digest) is not None:
+            print(f"- {path}: 未变化，跳过")
+            return False
+
+        start = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            # 重复的单词只保留最后一次出现的内容（与 json.load 一致）
+            entries = PackedEntries.from_entries(convert_items(iter_source_items(path, f)))
+        target = write_artifact(path, digest, entries)
+    elapsed = time.perf_counter() - start
+    print(f"- {path}: {len(entries)} 个单词 -> {target} ({os.path.getsize(target)} 字节, {elapsed:.2f}s)")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='预编译词典（读音、罗马音、答案键、振り仮名分段）')
+    parser.add_argument('files', nargs='*', help='要编译的词典文件 (默认: dictionaries/*.json 和 *.jsonl)')
+    parser.add_argument('--force', action='store_true', help='忽略内容哈希，强制重新编译')
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(os.path.join('dictionaries', '*.json'))
+                                 + glob.glob(os.path.join('dictionaries', '*.jsonl')))
+    compiled = sum(compile_dictionary(path, args.force) for path in files)
+    print(f"编译完成: {compiled}/{len(files)} 个词典已更新")
+
+
+if __name__ == '__main__':
+    main()
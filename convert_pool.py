@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""pykakasi 转换进程池（可选，通过 app.py --convert-workers 启用）
+
+pykakasi 转换是纯 Python 的 CPU 密集操作，在服务进程中执行时占住 GIL，
+一个大词典的冷构建会拖慢所有会话的答案检查。启用后转换交给独立的工作进程，
+每个工作进程持有自己的 Kakasi 实例：
+
+- convert_items: 冷构建词典时按块提交，保持原顺序，同时在途的块数有上限（流式加载仍可逐块发布）
+- convert: 单个文本（答案检查缓存未命中等），使用单独的进程池，不排在词典构建后面；
+  工作进程都忙时到达的请求合并为一批提交
+"""
+
+import collections
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+
+from metrics import CONVERSION_BATCH_SECONDS
+
+# 冷构建时每块的词条数
+CHUNK_SIZE = 256
+# 单个文本请求合并成一批的上限
+BATCH_SIZE = 64
+
+
+# 以下函数在工作进程中执行。工作进程中不启用进程池，dict_store 使用本进程自己的 Kakasi；
+# 在函数内导入 dict_store，避免与 dict_store 对本模块的导入形成循环
+
+def _worker_ready():
+    import dict_store
+    dict_store.get_kakasi()
+    return os.getpid()
+
+
+def _worker_convert_items(items):
+    """转换一块 (汉字, 中文含义)"""
+    import dict_store
+    return list(dict_store.convert_items_local(items))
+
+
+def _worker_convert_texts(texts):
+    """转换一批文本，只返回用到的字段以减少进程间传输"""
+    import dict_store
+    return [[{'orig': item['orig'], 'hira': item['hira'], 'hepburn': item['hepburn']}
+             for item in dict_store.get_kakasi().convert(text)] for text in texts]
+
+
+class ConversionService:
+    """pykakasi 转换进程池
+
+    词典构建和单个文本使用两个独立的进程池，答案检查不会排在大词典构建的块后面。
+    """
+
+    def __init__(self, workers=0, text_workers=1):
+        self.workers = workers              # 词典构建的进程数
+        self.text_workers = text_workers    # 单个文本转换的进程数
+        self._executors = {}                # {'entries' / 'texts': ProcessPoolExecutor}
+        self._pid = None
+        self._lock = threading.Lock()
+        self._queue = collections.deque()   # 等待提交的 (文本, Future)
+        self._ready = threading.Condition()
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    def configure(self, workers, text_workers=1):
+        """设置进程数（workers 为 0 表示不启用，在服务进程内直接转换）"""
+        self.workers = workers
+        self.text_workers = text_workers
+
+    def _pool(self, kind):
+        """当前进程的进程池；fork 出的子进程（多进程部署）中或进程池损坏后重新创建"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # 继承自父进程的进程池和等待队列在子进程中不可用
+                self._executors = {}
+                self._pid = os.getpid()
+                with self._ready:
+                    self._queue.clear()
+            executor = self._executors.get(kind)
+            if executor is None:
+                size = self.workers if kind == 'entries' else self.text_workers
+                # spawn: 服务进程中已有多个线程，fork 不安全
+                executor = self._executors[kind] = concurrent.futures.ProcessPoolExecutor(
+                    size, mp_context=multiprocessing.get_context('spawn'))
+                if kind == 'texts':
+                    threading.Thread(target=self._dispatch, args=(executor, threading.Semaphore(size)),
+                                     name='conversion-dispatcher', daemon=True).start()
+            return executor
+
+    def _discard(self, kind, executor):
+        """工作进程异常退出后进程池不可再用，下次请求时重新创建"""
+        with self._lock:
+            if self._executors.get(kind) is executor:
+                del self._executors[kind]
+        executor.shutdown(wait=False)
+        with self._ready:
+            # 唤醒旧的分发线程使其退出
+            self._ready.notify_all()
+
+    def start(self):
+        """预先启动全部工作进程（各自完成 pykakasi 的初始化），避免首次转换等待进程启动"""
+        futures = []
+        for kind, size in (('entries', self.workers), ('texts', self.text_workers)):
+            executor = self._pool(kind)
+            futures += [executor.submit(_worker_ready) for _ in range(size)]
+        for future in futures:
+            future.result()
+
+    def convert(self, text):
+        """转换单个文本，结果与 Kakasi.convert 相同（只含 orig / hira / hepburn）"""
+        future = concurrent.futures.Future()
+        self._pool('texts')
+        with self._ready:
+            self._queue.append((text, future))
+            self._ready.notify_all()
+        return future.result()
+
+    def _dispatch(self, executor, idle):
+        """每有一个空闲的工作进程，就把队列中积累的请求作为一批提交"""
+        while True:
+            idle.acquire()
+            with self._ready:
+                while not self._queue and self._executors.get('texts') is executor:
+                    self._ready.wait()
+                if self._executors.get('texts') is not executor:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(BATCH_SIZE, len(self._queue)))]
+            start = time.perf_counter()
+            try:
+                submitted = executor.submit(_worker_convert_texts, [text for text, _ in batch])
+            except Exception as e:
+                idle.release()
+                self._discard('texts', executor)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            submitted.add_done_callback(
+                lambda done, batch=batch, start=start: self._resolve(executor, idle, done, batch, start))
+
+    def _resolve(self, executor, idle, done, batch, start):
+        idle.release()
+        CONVERSION_BATCH_SECONDS.observe(time.perf_counter() - start, kind='texts')
+        try:
+            results = done.result()
+        except Exception as e:
+            if isinstance(e, concurrent.futures.BrokenExecutor):
+                self._discard('texts', executor)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def convert_items(self, items):
+        """按块转换 (汉字, 中文含义) 序列，按原顺序生成 (汉字, 假名, 中文含义, 罗马音, 答案键, 振り仮名分段)"""
+        executor = self._pool('entries')
+        items = iter(items)
+        pending = collections.deque()   # (Future, 提交时间)
+
+        def collect():
+            future, start = pending.popleft()
+            try:
+                chunk = future.result()
+            except concurrent.futures.BrokenExecutor:
+                self._discard('entries', executor)
+                raise
+            CONVERSION_BATCH_SECONDS.observe(time.perf_counter() - start, kind='entries')
+            return chunk
+
+        # 每个工作进程最多排队两块：既不让工作进程空闲，也不一次读入整个源文件
+        for chunk in iter(lambda: list(itertools.islice(items, CHUNK_SIZE)), []):
+            pending.append((executor.submit(_worker_convert_items, chunk), time.perf_counter()))
+            if len(pending) >= self.workers * 2:
+                yield from collect()
+        while pending:
+            yield from collect()
+
+
+# 进程级转换服务（默认不启用）
+conversion = ConversionService()
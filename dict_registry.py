@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""词典注册表：可热重载的配置
+
+后台线程定期检查 config.json 和配置中的词典文件：
+
+- 配置变化: 重新读取后整体替换当前目录（Catalog），新会话立即看到新的词典列表，
+  已删除的词典从缓存中移除（仍持有它的会话继续使用）
+- 词典文件变化: 在后台完整构建新版本后原子替换（dict_store.reload_dictionary），
+  构建期间所有会话继续使用旧版本，答题中的会话在下一题换用新版本
+
+Catalog 建成后只读，替换只是一次属性赋值，读取方不需要加锁。
+"""
+
+import json
+import os
+import threading
+import time
+
+from dict_store import discard_dictionary, has_artifact, peek_dictionary, reload_dictionary, warm_up_kakasi
+from logs import get_logger
+from metrics import DICTIONARY_RELOADS
+from ruby import warm_ruby_cache
+from search import refresh_index
+
+logger = get_logger(__name__)
+
+CONFIG_PATH = 'config.json'
+# 检查文件变化的间隔（秒）
+WATCH_INTERVAL = 2.0
+
+# 配置文件不存在时使用的默认配置
+DEFAULT_CONFIG = {
+    "dictionaries": [
+        {
+            "path": "dictionaries/base.json",
+            "name": "基础词库"
+        }
+    ],
+    "default_dictionary": "dictionaries/base.json"
+}
+
+
+def load_config(path=CONFIG_PATH):
+    """读取配置文件，不存在时使用默认配置"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning("配置文件不存在，使用默认配置")
+        return DEFAULT_CONFIG
+
+
+def _stamp(path):
+    """文件的 (修改时间, 大小)，不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class Catalog:
+    """某一版本配置中的词典列表（只读），按文件名和显示名建立索引"""
+
+    __slots__ = ('config', 'paths', 'default', 'files', 'names', '_lookup')
+
+    def __init__(self, config):
+        self.config = config
+        entries = [(d["path"], d["name"]) for d in config["dictionaries"]]
+        self.paths = [path for path, _ in entries]
+        self.default = config["default_dictionary"]
+        # 词典接口可访问的文件: {文件名: 路径}
+        self.files = {os.path.basename(path): path for path, _ in entries}
+        # 词典显示名: {文件名: 名称}
+        self.names = {os.path.basename(path): name for path, name in entries}
+        # URL 中的 dict 参数可以是显示名或文件名，按配置顺序先出现的优先
+        self._lookup = {}
+        for path, name in entries:
+            self._lookup.setdefault(name, path)
+            self._lookup.setdefault(os.path.basename(path), path)
+
+    def resolve(self, value):
+        """显示名或文件名 → 词典路径，找不到时为默认词典"""
+        return self._lookup.get(value, self.default) if value else self.default
+
+    def label(self, path):
+        """词典的显示名（不在配置中时为文件名）"""
+        filename = os.path.basename(path)
+        return self.names.get(filename, filename)
+
+
+class DictionaryRegistry:
+    """当前生效的词典配置（current），以及监视文件变化的后台线程"""
+
+    def __init__(self, config_path=CONFIG_PATH, interval=WATCH_INTERVAL):
+        self.config_path = config_path
+        self.interval = interval
+        self._config_stamp = _stamp(config_path)
+        self.current = Catalog(load_config(config_path))
+        self._stamps = {path: _stamp(path) for path in self.current.paths}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """启动监视线程（每个进程一个，fork 出的工作进程中需要再次调用）"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._watch, name='dict-registry', daemon=True).start()
+
+    def _watch(self):
+        # 有词典缺少预编译产物时，首次访问需要转换：提前在后台初始化 Kakasi
+        if not all(has_artifact(path) for path in self.current.paths):
+            warm_up_kakasi()
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error('检查词典变化失败: %s', e)
+
+    def poll(self):
+        """检查一次配置和词典文件，重新加载有变化的部分"""
+        changed = self._reload_config()
+        catalog = self.current
+        for path in catalog.paths:
+            stamp = _stamp(path)
+            if stamp == self._stamps.get(path):
+                continue
+            self._stamps[path] = stamp
+            if stamp is None or peek_dictionary(path) is None:
+                # 已删除的文件保留旧版本；尚未被访问过的词典在首次访问时加载
+                continue
+            start = time.perf_counter()
+            dictionary = reload_dictionary(path)
+            if dictionary is None:
+                continue
+            changed = True
+            DICTIONARY_RELOADS.inc(kind='dictionary')
+            logger.info('词典 %s 已重新加载，包含 %d 个单词 (%.2fs)', path, len(dictionary),
+                        time.perf_counter() - start)
+            warm_ruby_cache(dictionary)
+        if changed:
+            refresh_index(catalog.paths)
+
+    def _reload_config(self):
+        """配置文件变化时整体替换 Catalog；文件被删除或内容无效时保留当前配置"""
+        stamp = _stamp(self.config_path)
+        if stamp == self._config_stamp:
+            return False
+        self._config_stamp = stamp
+        if stamp is None:
+            logger.warning('配置文件 %s 已删除，继续使用当前配置', self.config_path)
+            return False
+        try:
+            catalog = Catalog(load_config(self.config_path))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning('配置文件 %s 无效，继续使用当前配置: %s', self.config_path, e)
+            return False
+        previous, self.current = self.current, catalog
+        removed = [path for path in previous.paths if path not in catalog.paths]
+        added = [path for path in catalog.paths if path not in previous.paths]
+        for path in removed:
+            discard_dictionary(path)
+            self._stamps.pop(path, None)
+        for path in added:
+            self._stamps[path] = _stamp(path)
+        DICTIONARY_RELOADS.inc(kind='config')
+        logger.info('配置已重新加载: %d 个词典（新增 %d，删除 %d）', len(catalog.paths), len(added), len(removed))
+        return True
+
+
+# 进程级词典注册表（导入时读取配置，监视线程由服务启动时开启）
+dictionary_registry = DictionaryRegistry()
@@ -0,0 +1,594 @@
+# -*- coding: utf-8 -*-
+
+import array
+import contextlib
+import fcntl
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
+import threading
+import time
+
+from convert_pool import conversion
+from logs import get_logger
+from metrics import DICTIONARY_LOAD_SECONDS, KAKASI_CONVERSION_SECONDS
+from packed import AnswerKeysView, PackedEntries, SegmentsView, WordsView
+
+logger = get_logger(__name__)
+
+# 预编译产物目录（由 compile_dict.py 生成）
+COMPILED_DIR = os.path.join('dictionaries', 'compiled')
+ARTIFACT_MAGIC = b'KDICT'
+ARTIFACT_VERSION = 3
+ARTIFACT_HEADER = ARTIFACT_MAGIC + bytes([ARTIFACT_VERSION])
+
+# 流式加载：先同步转换的词条数，其余在后台线程中继续转换
+STREAM_FIRST_CHUNK = 200
+# 没有可用的预编译产物时是否使用流式加载
+STREAM_LOADING = True
+
+# 词典文件不存在时使用的基本词库
+FALLBACK_WORDS = {
+    '私': '我',
+    '猫': '猫',
+}
+
+
+def normalize_path(dictionary_file):
+    """如果传入的是相对路径，确保它在dictionaries目录下"""
+    if not dictionary_file.startswith('dictionaries/'):
+        dictionary_file = os.path.join('dictionaries', dictionary_file)
+    return dictionary_file
+
+
+# 本进程的 Kakasi 实例，首次转换时才创建（加载 pykakasi 词典约需 0.5 秒、100 MiB 内存），
+# 使用预编译产物且启用转换进程池时服务进程中从不创建
+_kakasi = None
+_kakasi_lock = threading.Lock()
+_warming = False
+
+
+def get_kakasi():
+    """本进程的 Kakasi 实例（首次调用时初始化）"""
+    global _kakasi
+    if _kakasi is None:
+        with _kakasi_lock:
+            if _kakasi is None:
+                start = time.perf_counter()
+                import pykakasi
+                _kakasi = pykakasi.Kakasi()
+                logger.info('pykakasi 初始化完成 (%.2fs)', time.perf_counter() - start)
+    return _kakasi
+
+
+def warm_up_kakasi():
+    """在后台线程中初始化 Kakasi，之后的首次转换不必等待（启用转换进程池时本进程不需要）"""
+    global _warming
+    if _kakasi is not None or _warming or conversion.enabled:
+        return
+    _warming = True
+    threading.Thread(target=get_kakasi, name='kakasi-warm-up', daemon=True).start()
+
+
+def kakasi_convert(text):
+    """pykakasi 转换（统计耗时）；启用转换进程池时交给工作进程"""
+    if conversion.enabled:
+        return conversion.convert(text)
+    kakasi = get_kakasi()
+    with KAKASI_CONVERSION_SECONDS.time():
+        return kakasi.convert(text)
+
+
+def to_romaji(text):
+    """转换为无分隔的小写罗马音（与答案比较时使用的形式）"""
+    return ''.join(item['hepburn'] for item in kakasi_convert(text)).lower()
+
+
+def make_answer_keys(kanji_romaji, reading, romaji):
+    """生成答案键（去重后保持顺序）"""
+    return tuple(dict.fromkeys((kanji_romaji, to_romaji(reading), romaji.replace(' ', '').lower())))
+
+
+def strip_annotation(meaning):
+    """去掉含义中括号里的注音，只保留括号后的实际含义（ingest.py 导入时做同样的处理）"""
+    if '(' in meaning and ')' in meaning:
+        meaning = meaning[meaning.find(')')+1:].strip()
+    return meaning
+
+
+def convert_entry(kanji, meaning):
+    """把一条原始词条转换为 ((假名, 中文含义, 罗马音), 答案键, 振り仮名分段)"""
+    # 使用 pykakasi 获取读音
+    result = kakasi_convert(kanji)
+
+    # 用空格连接所有部分
+    reading = ' '.join(item['hira'] for item in result)      # 例如: かくてい しんこく の きげん を おしえ てください
+    romaji = ' '.join(item['hepburn'] for item in result)    # 例如: kakutei shinkoku no kigen wo oshie tekudasai
+
+    # 如果有括号中的注音,提取括号后的实际含义
+    meaning = strip_annotation(meaning)
+
+    # 答案键: 汉字、假名、罗马音各自的罗马音形式
+    kanji_romaji = ''.join(item['hepburn'] for item in result).lower()
+    answer_keys = make_answer_keys(kanji_romaji, reading, romaji)
+
+    # 振り仮名分段: (原文, 平假名)
+    segments = tuple((item['orig'], item['hira']) for item in result)
+
+    return (reading, meaning, romaji), answer_keys, segments
+
+
+def convert_items(items):
+    """逐条转换 (汉字, 中文含义)，生成 (汉字, 假名, 中文含义, 罗马音, 答案键, 振り仮名分段)；
+    启用转换进程池时按块交给工作进程"""
+    if conversion.enabled:
+        return conversion.convert_items(items)
+    return convert_items_local(items)
+
+
+def convert_items_local(items):
+    """在本进程中逐条转换"""
+    for kanji, meaning in items:
+        (reading, meaning, romaji), answer_keys, segments = convert_entry(kanji, meaning)
+        yield (kanji, reading, meaning, romaji, answer_keys, segments)
+
+
+def compile_entries(data):
+    """转换整个词典，返回 [(汉字, 假名, 中文含义, 罗马音, 答案键, 振り仮名分段), ...]"""
+    return list(convert_items(data.items()))
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# 缓冲区末尾可能是被截断的数字（例如 "12345." 之后还有 "5e3"）
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]+\Z')
+
+
+class _Incomplete(Exception):
+    """缓冲区中的数据不足以解析下一项"""
+
+
+def iter_json_items(f, read_size=1 << 16):
+    """逐项解析顶层 JSON 对象 {"键": 值, ...}，每次只读入 read_size 个字符"""
+    buf, pos, eof = '', 0, False
+
+    def read_more():
+        nonlocal buf, pos, eof
+        chunk = f.read(read_size)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    def skip_whitespace(i):
+        i = _WHITESPACE.match(buf, i).end()
+        if i >= len(buf):
+            raise _Incomplete
+        return i
+
+    while True:
+        try:
+            pos = skip_whitespace(pos)
+            break
+        except _Incomplete:
+            if eof:
+                raise ValueError('词典文件为空')
+            read_more()
+    if buf[pos] != '{':
+        raise ValueError('词典必须是 JSON 对象')
+    pos += 1
+
+    first = True
+    while True:
+        start = pos
+        try:
+            i = skip_whitespace(pos)
+            if buf[i] == '}':
+                pos = i + 1
+                break
+            if not first:
+                if buf[i] != ',':
+                    raise ValueError(f'位置 {i} 处应为 ","')
+                i = skip_whitespace(i + 1)
+            key, i = _decoder.raw_decode(buf, i)
+            i = skip_whitespace(i)
+            if buf[i] != ':':
+                raise ValueError(f'位置 {i} 处应为 ":"')
+            value, i = _decoder.raw_decode(buf, skip_whitespace(i + 1))
+            # 值后面必须能看到分隔符，否则数字等值可能被截断
+            j = skip_whitespace(i)
+            if buf[j] not in ',}':
+                if _NUMBER_TAIL.match(buf, i):
+                    raise _Incomplete
+                raise ValueError(f'位置 {j} 处应为 "," 或 "}}"')
+        except (_Incomplete, json.JSONDecodeError) as e:
+            if eof:
+                raise ValueError('词典文件不完整') from e
+            pos = start
+            read_more()
+            continue
+        pos = i
+        first = False
+        yield key, value
+
+    # 与 json.load 一致，顶层对象之后只允许空白
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos < len(buf):
+            raise ValueError('词典 JSON 对象之后有多余的内容')
+        if eof:
+            return
+        read_more()
+
+
+def iter_jsonl_items(f):
+    """逐行解析 JSON Lines 词典，每行为 {"汉字": "含义"} 或 ["汉字", "含义"]"""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        if isinstance(item, dict):
+            yield from item.items()
+        else:
+            kanji, meaning = item
+            yield kanji, meaning
+
+
+def iter_source_items(path, f):
+    """按扩展名选择解析方式，逐条生成 (汉字, 中文含义)
+
+    重复的单词原样生成，构建词典时按 json.load 的规则合并（见 PackedEntries.from_entries）。
+    """
+    if path.endswith('.jsonl'):
+        return iter_jsonl_items(f)
+    return iter_json_items(f)
+
+
+def file_digest(path):
+    """分块计算词典源文件的内容哈希（与 source_digest 结果一致）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digest(raw):
+    """词典源文件的内容哈希"""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def artifact_path(path):
+    """词典对应的预编译产物路径：文件名（含扩展名）+ 规范化路径的哈希
+
+    同名的 .json / .jsonl 词典以及不同目录下的同名词典各自对应不同的产物。
+    """
+    key = os.path.normpath(os.path.relpath(path))
+    suffix = hashlib.blake2b(key.encode('utf-8'), digest_size=4).hexdigest()
+    return os.path.join(COMPILED_DIR, f'{os.path.basename(path)}.{suffix}.kdict')
+
+
+def write_artifact(path, digest, entries):
+    """写入预编译产物: 魔数 + 版本 + 元数据长度 + pickle 元数据（内容哈希、单词表）+ 对齐填充 + 偏移量表 + 字段缓冲区
+
+    偏移量表和字段缓冲区按原样写入，读取时直接内存映射，多个工作进程共享同一份页缓存。
+    """
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    if not isinstance(entries, PackedEntries):
+        entries = PackedEntries.from_entries(entries)
+    meta = pickle.dumps({'source_hash': digest, 'keys': entries.keys}, protocol=pickle.HIGHEST_PROTOCOL)
+    head = ARTIFACT_HEADER + struct.pack('<Q', len(meta)) + meta
+    target = artifact_path(path)
+    tmp = target + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(head + bytes(-len(head) % 8))
+        f.write(array.array('Q', entries.offsets).tobytes())
+        f.write(entries.buffer)
+    # 原子替换，避免运行中的服务读到写了一半的文件；已映射旧文件的进程继续使用旧内容
+    os.replace(tmp, target)
+    return target
+
+
+def read_artifact(path, digest):
+    """以只读内存映射读取预编译产物（PackedEntries）；不存在、版本不符或内容哈希不符时返回 None"""
+    target = artifact_path(path)
+    try:
+        f = open(target, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        prefix = f.read(len(ARTIFACT_HEADER) + 8)
+        if len(prefix) < len(ARTIFACT_HEADER) + 8 or not prefix.startswith(ARTIFACT_HEADER):
+            return None
+        meta_size, = struct.unpack('<Q', prefix[len(ARTIFACT_HEADER):])
+        try:
+            meta = pickle.loads(f.read(meta_size))
+        except Exception as e:
+            logger.warning('预编译词典 %s 读取失败: %s', target, e)
+            return None
+        if meta.get('source_hash') != digest:
+            return None
+        # 映射在关闭文件后仍然有效
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    keys = meta['keys']
+    start = len(prefix) + meta_size
+    start += -start % 8
+    end = start + (len(keys) + 1) * 8
+    view = memoryview(mapped)
+    if end > len(view):
+        logger.warning('预编译词典 %s 已损坏', target)
+        return None
+    offsets = view[start:end].cast('Q')
+    buffer = view[end:]
+    if offsets[-1] != len(buffer):
+        logger.warning('预编译词典 %s 已损坏', target)
+        return None
+    return PackedEntries(keys, offsets, buffer)
+
+
+def has_artifact(path):
+    """词典是否有与源文件内容一致的预编译产物（加载时无需转换）"""
+    path = normalize_path(path)
+    try:
+        return read_artifact(path, file_digest(path)) is not None
+    except FileNotFoundError:
+        return True
+
+
+class Dictionary:
+    """已转换完成的只读词典，由所有会话共享
+
+    流式加载期间的词典只包含已转换的部分词条（complete 为 False），
+    没有内容哈希，不能被浏览器缓存。
+    """
+
+    __slots__ = ('path', 'mtime', 'digest', 'complete', 'packed', 'words', 'answer_keys', 'ruby_segments')
+
+    def __init__(self, path, mtime, entries, digest=None, complete=True):
+        self.path = path
+        self.mtime = mtime
+        self.digest = digest
+        self.complete = complete
+        # 紧凑存储：所有字段打包在一个缓冲区中，以下三个只读映射按需解码
+        self.packed = entries if isinstance(entries, PackedEntries) else PackedEntries.from_entries(entries)
+        # 存储格式: {汉字: (假名, 中文含义, 罗马音)}
+        self.words = WordsView(self.packed)
+        self.answer_keys = AnswerKeysView(self.packed)
+        self.ruby_segments = SegmentsView(self.packed)
+
+    def __len__(self):
+        return len(self.words)
+
+
+def save_artifact(dictionary):
+    """从源文件转换完成后写入预编译产物，下次启动直接映射而不再转换（写入失败只记录日志）
+
+    调用方不能持有同一词典的 _artifact_lock（flock 在同一进程内也会互相阻塞）。
+    """
+    path = dictionary.path
+    try:
+        with _artifact_lock(path):
+            if read_artifact(path, dictionary.digest) is None:
+                write_artifact(path, dictionary.digest, dictionary.packed)
+                logger.info('词典 %s 的预编译产物已写入', path)
+    except OSError as e:
+        logger.warning('词典 %s 的预编译产物写入失败: %s', path, e)
+
+
+def build_dictionary(path, mtime, stream=False, save=True):
+    """优先读取预编译产物；产物缺失或过期时才对每个词条做读音/罗马音转换
+
+    stream 为 True 时转换完第一批词条即返回部分词典，其余在后台线程中继续，
+    完成后通过 get_dictionary 的缓存发布完整词典。
+    save 为 True 时，从源文件转换完成（包括流式加载完成）后写入预编译产物。
+    """
+    start = time.perf_counter()
+    digest = file_digest(path)
+
+    entries = read_artifact(path, digest)
+    if entries is not None:
+        logger.info('词典 %s 从预编译文件加载完成，包含 %d 个单词', path, len(entries))
+        dictionary = Dictionary(path, mtime, entries, digest)
+        DICTIONARY_LOAD_SECONDS.observe(time.perf_counter() - start, source='artifact')
+        return dictionary
+
+    f = open(path, 'r', encoding='utf-8')
+    converted = convert_items(iter_source_items(path, f))
+    entries = []
+    if stream:
+        try:
+            entries = list(itertools.islice(converted, STREAM_FIRST_CHUNK))
+        except BaseException:
+            f.close()
+            raise
+        if len(entries) == STREAM_FIRST_CHUNK:
+            dictionary = Dictionary(path, mtime, entries, complete=False)
+            _start_stream(dictionary, f, converted, entries, digest, start, save)
+            return dictionary
+    with f:
+        entries.extend(converted)
+    dictionary = Dictionary(path, mtime, entries, digest)
+    logger.info('词典 %s 从文件加载完成，包含 %d 个单词', path, len(dictionary))
+    DICTIONARY_LOAD_SECONDS.observe(time.perf_counter() - start, source='source')
+    if save:
+        save_artifact(dictionary)
+    return dictionary
+
+
+# 进程级缓存: {路径: Dictionary}
+_store = {}
+_store_lock = threading.Lock()
+_build_locks = {}
+# 正在流式加载的词典: {路径: 加载标识}，文件变化后旧的加载线程不再发布结果
+_loaders = {}
+# 已在后台开始首次加载的词典
+_preloading = set()
+
+
+def _publish(path, token, dictionary):
+    """发布流式加载的中间/最终结果；加载已被取代时返回 False"""
+    with _store_lock:
+        if _loaders.get(path) is not token:
+            return False
+        _store[path] = dictionary
+        if dictionary.complete:
+            del _loaders[path]
+        return True
+
+
+def _start_stream(partial, f, converted, entries, digest, start, save):
+    """登记部分词典并在后台线程中继续转换，词条数每翻一倍发布一次快照
+
+    转换失败时撤下部分词典：恢复之前发布的完整版本（文件已变化，下次访问时重新构建），
+    没有完整版本时从缓存中移除，下次 get_dictionary 重新构建。
+    """
+    path, mtime = partial.path, partial.mtime
+    token = object()
+    with _store_lock:
+        previous = _store.get(path)
+        _loaders[path] = token
+        _store[path] = partial
+
+    def run():
+        try:
+            with f:
+                next_snapshot = len(entries) * 2
+                for entry in converted:
+                    entries.append(entry)
+                    if len(entries) >= next_snapshot:
+                        next_snapshot *= 2
+                        if not _publish(path, token, Dictionary(path, mtime, entries, complete=False)):
+                            return
+        except Exception as e:
+            logger.error('词典 %s 流式加载失败: %s', path, e)
+            with _store_lock:
+                if _loaders.get(path) is token:
+                    del _loaders[path]
+                    if previous is not None and previous.complete:
+                        _store[path] = previous
+                    else:
+                        _store.pop(path, None)
+            return
+        dictionary = Dictionary(path, mtime, entries, digest)
+        if _publish(path, token, dictionary):
+            logger.info('词典 %s 流式加载完成，包含 %d 个单词', path, len(dictionary))
+            DICTIONARY_LOAD_SECONDS.observe(time.perf_counter() - start, source='stream')
+            if save:
+                save_artifact(dictionary)
+
+    logger.info('词典 %s 已加载前 %d 个单词，其余在后台继续', path, len(entries))
+    threading.Thread(target=run, name=f'dict-loader-{os.path.basename(path)}', daemon=True).start()
+
+
+def _build_lock(path):
+    with _store_lock:
+        return _build_locks.setdefault(path, threading.Lock())
+
+
+def get_dictionary(dictionary_file='dictionaries/base.json'):
+    """获取共享词典；仅在首次访问或文件修改时间变化时重新构建"""
+    path = normalize_path(dictionary_file)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        logger.warning('文件 %s 不存在，返回基本词库', path)
+        return Dictionary(path, None, compile_entries(FALLBACK_WORDS))
+
+    cached = _store.get(path)
+    if cached is not None and cached.mtime == mtime:
+        return cached
+
+    # 同一个词典只允许一个线程构建，其余会话等待结果
+    with _build_lock(path):
+        cached = _store.get(path)
+        if cached is not None and cached.mtime == mtime:
+            return cached
+        dictionary = build_dictionary(path, mtime, stream=STREAM_LOADING)
+        if dictionary.complete:
+            # 流式加载的部分词典已由 _start_stream 登记；完整词典取代仍在进行的旧加载
+            with _store_lock:
+                _loaders.pop(path, None)
+                _store[path] = dictionary
+        return dictionary
+
+
+def peek_dictionary(dictionary_file):
+    """已发布的词典版本（不检查文件、不触发构建），尚未加载时返回 None"""
+    return _store.get(normalize_path(dictionary_file))
+
+
+def current_dictionary(dictionary_file):
+    """已发布的词典版本；尚未加载过时才加载（文件变化由 dict_registry 在后台重新构建，这里不等待）"""
+    return peek_dictionary(dictionary_file) or get_dictionary(dictionary_file)
+
+
+def preload_dictionary(dictionary_file):
+    """在后台线程中开始加载尚未加载的词典，不等待结果（同一词典只启动一次）"""
+    path = normalize_path(dictionary_file)
+    with _store_lock:
+        if path in _store or path in _preloading:
+            return
+        _preloading.add(path)
+
+    def run():
+        try:
+            get_dictionary(path)
+        except Exception as e:
+            logger.error('词典 %s 加载失败: %s', path, e)
+        finally:
+            with _store_lock:
+                _preloading.discard(path)
+
+    threading.Thread(target=run, name=f'dict-preload-{os.path.basename(path)}', daemon=True).start()
+
+
+def discard_dictionary(dictionary_file):
+    """从缓存中移除词典（已从配置中删除），仍持有它的会话不受影响"""
+    path = normalize_path(dictionary_file)
+    with _store_lock:
+        _loaders.pop(path, None)
+        _store.pop(path, None)
+
+
+@contextlib.contextmanager
+def _artifact_lock(path):
+    """跨进程的构建锁（多进程部署时同一个词典只由一个工作进程转换）"""
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    with open(artifact_path(path) + '.lock', 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def reload_dictionary(dictionary_file):
+    """完整构建词典的新版本后原子替换已发布的版本，构建期间会话继续使用旧版本
+
+    从源文件转换的结果写入预编译产物，其它工作进程等待锁后直接映射产物，不再重复转换。
+    文件不存在时保留旧版本并返回 None。
+    """
+    path = normalize_path(dictionary_file)
+    with _build_lock(path), _artifact_lock(path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            logger.warning('文件 %s 不存在，继续使用已加载的版本', path)
+            return None
+        cached = _store.get(path)
+        if cached is not None and cached.mtime == mtime and cached.complete:
+            return cached
+        # 已持有 _artifact_lock，由这里写入产物
+        dictionary = build_dictionary(path, mtime, save=False)
+        if read_artifact(path, dictionary.digest) is None:
+            write_artifact(path, dictionary.digest, dictionary.packed)
+        with _store_lock:
+            # 取代仍在进行的流式加载
+            _loaders.pop(path, None)
+            _store[path] = dictionary
+        return dictionary
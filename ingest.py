@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""词典导入流水线（取代 clear.py 和 generate_dict_config.py）
+
+1. 扫描（多进程并行）: 逐个词典解析源文件，规范化单词和含义，校验词条，去除文件内的重复单词
+2. 跨词典去重: 按 config.json 中的顺序，后面的词典中与前面词典重复的单词被去除
+3. 输出: 只重写内容有变化的词典文件（原子替换，运行中的服务会热重载），并生成 config.json
+4. 编译（--compile，多进程并行）: 为内容变化的词典重新生成预编译产物
+
+去重比较的是规范化后单词的 64 位哈希：工作进程只需返回哈希，跨词典去重在主进程中用哈希集合完成。
+每个词典输出后的内容哈希和单词哈希记录在清单文件中，源文件未变化时直接使用清单，不再解析。
+"""
+
+import argparse
+import base64
+import concurrent.futures
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import unicodedata
+
+from compile_dict import compile_dictionary
+from dict_store import COMPILED_DIR, file_digest, has_artifact, iter_source_items, source_digest, strip_annotation
+
+CONFIG_PATH = 'config.json'
+DICTIONARY_DIR = 'dictionaries'
+DEFAULT_DICTIONARY = os.path.join(DICTIONARY_DIR, 'base.json')
+# 清单: 每个词典上次输出的内容哈希和单词哈希
+MANIFEST_PATH = os.path.join(COMPILED_DIR, 'ingest.json')
+MANIFEST_VERSION = 1
+# 单词哈希的字节数（64 位，百万级词条的碰撞概率可以忽略）
+HASH_SIZE = 8
+
+# 从单词中去除的标点（NFKC 之后，全角的 ～ 等已变为半角）
+KEY_PUNCTUATION = str.maketrans('', '', '~()、，。！？；：【】《》（）[]「」『』〈〉…・')
+# 含义中统一为半角的字符：全角英数、全角空格、半角片假名（NFKC 会把浊点合并）
+WIDE_CHARACTERS = re.compile('[Ａ-Ｚａ-ｚ０-９　｡-ﾟ]+')
+# 含义中全角标点两侧的空白，以及夹在汉字之间的半角逗号、分号
+PUNCTUATION_SPACING = re.compile(r'\s*([，。、；：！？])\s*')
+HALF_WIDTH_PUNCTUATION = re.compile('(?<=[一-鿿]),(?=[一-鿿])|(?<=[一-鿿]);(?=[一-鿿])')
+JAPANESE = re.compile('[ぁ-ゖァ-ヺー㐀-䶿一-鿿々〆]')
+
+# 问题类型
+INVALID = 'invalid'         # 无效词条（被去除）
+DUPLICATE = 'duplicate'     # 文件内重复（被去除）
+SHARED = 'shared'           # 与前面的词典重复（被去除）
+WARNING = 'warning'         # 保留，但需要人工检查
+
+
+def key_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=HASH_SIZE).digest()
+
+
+def normalize_key(key):
+    """单词: NFKC（全角英数、半角片假名等统一）、去除标点、合并空白"""
+    key = unicodedata.normalize('NFKC', key)
+    key = key.translate(KEY_PUNCTUATION)
+    return ' '.join(key.split())
+
+
+def normalize_meaning(meaning):
+    """含义: 全角英数和半角片假名统一、统一中文标点、合并空白、去除括号注音（与运行时 convert_entry 的处理一致）
+
+    返回 (含义, 是否保留了注音)：去除一次后仍含成对括号的含义在运行时会被再次截断，
+    这类含义保持原样（显示效果与导入前相同），作为警告报告。
+    """
+    meaning = WIDE_CHARACTERS.sub(lambda m: unicodedata.normalize('NFKC', m.group()), meaning)
+    meaning = HALF_WIDTH_PUNCTUATION.sub(lambda m: '，' if m.group() == ',' else '；', meaning)
+    meaning = PUNCTUATION_SPACING.sub(r'\1', ' '.join(meaning.split()))
+    stripped = strip_annotation(meaning)
+    if strip_annotation(stripped) != stripped:
+        return meaning, True
+    return stripped, False
+
+
+def source_items(path, raw):
+    """源文件的全部 (单词, 含义)，保留重复的单词；整个文件已读入内存，JSON 直接用 C 解析器一次解析"""
+    if path.endswith('.jsonl'):
+        return iter_source_items(path, io.StringIO(raw.decode('utf-8')))
+    items = json.loads(raw, object_pairs_hook=tuple)
+    # 对象解析为 (键, 值) 元组，数组仍是列表
+    if not isinstance(items, tuple):
+        raise ValueError('词典必须是 JSON 对象')
+    return items
+
+
+def scan_dictionary(path, drop_duplicate_meanings=False):
+    """在工作进程中解析并清理一个词典
+
+    返回 {'path', 'digest' 源文件哈希, 'total' 原始词条数, 'entries' [(单词, 含义)],
+          'hashes' 保留词条的单词哈希（拼接的字节串）, 'issues' [(类型, 单词, 说明)], 'seconds'}
+    """
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        raw = f.read()
+    entries, hashes, issues = [], [], []
+    seen_keys, seen_meanings = {}, {}
+    total = 0
+    for raw_key, raw_meaning in source_items(path, raw):
+        total += 1
+        if not isinstance(raw_meaning, str):
+            issues.append((INVALID, raw_key, '含义不是字符串'))
+            continue
+        key = normalize_key(raw_key)
+        meaning, annotated = normalize_meaning(raw_meaning)
+        if not key:
+            issues.append((INVALID, raw_key, '单词为空'))
+            continue
+        if not meaning:
+            issues.append((INVALID, key, '含义为空'))
+            continue
+        if not JAPANESE.search(key):
+            issues.append((WARNING, key, '单词中没有假名或汉字'))
+        if annotated:
+            issues.append((WARNING, key, '含义中有多处括号，运行时只去除到第一个右括号'))
+        digest = key_hash(key)
+        if digest in seen_keys:
+            issues.append((DUPLICATE, key, f'与 {seen_keys[digest]} 重复'))
+            continue
+        if drop_duplicate_meanings:
+            meaning_digest = key_hash(meaning)
+            if meaning_digest in seen_meanings:
+                issues.append((DUPLICATE, key, f'与 {seen_meanings[meaning_digest]} 的含义相同'))
+                continue
+            seen_meanings[meaning_digest] = key
+        seen_keys[digest] = key
+        hashes.append(digest)
+        entries.append((key, meaning))
+    return {'path': path, 'digest': source_digest(raw), 'total': total, 'entries': entries,
+            'hashes': b''.join(hashes), 'issues': issues, 'seconds': time.perf_counter() - start}
+
+
+def serialize(path, entries):
+    """与现有词典文件相同的格式（JSON 缩进 4；JSON Lines 每行一个对象）"""
+    if path.endswith('.jsonl'):
+        text = ''.join(json.dumps({key: meaning}, ensure_ascii=False) + '\n' for key, meaning in entries)
+    else:
+        text = json.dumps(dict(entries), ensure_ascii=False, indent=4)
+    return text.encode('utf-8')
+
+
+def write_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def split_hashes(data):
+    return [data[i:i + HASH_SIZE] for i in range(0, len(data), HASH_SIZE)]
+
+
+def load_manifest(options):
+    """上次导入的清单；版本或去重选项不同时作废"""
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('options') != options:
+        return {}
+    return manifest.get('dictionaries', {})
+
+
+def save_manifest(options, dictionaries):
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    data = {'version': MANIFEST_VERSION, 'options': options, 'dictionaries': dictionaries}
+    write_atomic(MANIFEST_PATH, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+
+def read_config():
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def ordered_paths(files, config):
+    """待导入的词典：配置中的词典按配置顺序在前（跨词典去重时优先保留），其余按文件名排序"""
+    files = files or (glob.glob(os.path.join(DICTIONARY_DIR, '*.json'))
+                      + glob.glob(os.path.join(DICTIONARY_DIR, '*.jsonl')))
+    files = {os.path.normpath(path) for path in files}
+    configured = [os.path.normpath(d['path']) for d in config.get('dictionaries', [])
+                  if isinstance(d, dict) and 'path' in d]
+    return [path for path in configured if path in files] + sorted(files.difference(configured))
+
+
+def build_config(config, paths):
+    """{"path", "name"} 形式的配置：保留已有的显示名和顺序，新词典以文件名作为显示名
+
+    本次没有导入、但仍存在的已配置词典保留在配置中；文件已删除的词典从配置中去除。
+    """
+    names = {os.path.normpath(d['path']): d.get('name') for d in config.get('dictionaries', [])
+             if isinstance(d, dict) and 'path' in d}
+    paths = [path for path in names if path in paths or os.path.exists(path)] + \
+        [path for path in paths if path not in names]
+    dictionaries = [{'path': path, 'name': names.get(path) or os.path.splitext(os.path.basename(path))[0]}
+                    for path in paths]
+    default = os.path.normpath(config.get('default_dictionary') or DEFAULT_DICTIONARY)
+    if default not in paths:
+        default = DEFAULT_DICTIONARY if DEFAULT_DICTIONARY in paths else (paths[0] if paths else None)
+    result = dict(config)
+    result['dictionaries'] = dictionaries
+    result['default_dictionary'] = default
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='词典导入：并行清理、校验、去重，增量输出词典文件和 config.json')
+    parser.add_argument('files', nargs='*', help='要导入的词典文件 (默认: dictionaries/*.json 和 *.jsonl)')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='工作进程数 (默认: CPU 核数)')
+    parser.add_argument('--keep-shared', action='store_true', help='不去除与前面词典重复的单词')
+    parser.add_argument('--drop-duplicate-meanings', action='store_true',
+                        help='同一词典中含义相同的词条只保留第一个（clear.py 的行为）')
+    parser.add_argument('--compile', action='store_true', help='为内容变化的词典重新生成预编译产物')
+    parser.add_argument('--dry-run', action='store_true', help='只报告，不写入任何文件')
+    parser.add_argument('-v', '--verbose', action='store_true', help='列出全部问题（默认每个词典最多 5 条）')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    options = {'keep_shared': args.keep_shared, 'drop_duplicate_meanings': args.drop_duplicate_meanings}
+    config = read_config()
+    paths = ordered_paths(args.files, config)
+    manifest = load_manifest(options)
+    timings = {}
+
+    # 1. 扫描：源文件与上次输出一致的词典直接使用清单中的单词哈希
+    start = time.perf_counter()
+    digests = {path: file_digest(path) for path in paths}
+    cached = {path for path in paths if manifest.get(path, {}).get('digest') == digests[path]}
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max(1, args.jobs)) as pool:
+        def scan(targets):
+            futures = [pool.submit(scan_dictionary, path, args.drop_duplicate_meanings) for path in targets]
+            for path, future in zip(targets, futures):
+                try:
+                    result = future.result()
+                except (ValueError, UnicodeDecodeError) as e:
+                    # 整个文件无法解析时不输出任何内容，避免只更新了一部分词典
+                    raise SystemExit(f'{path}: 解析失败: {e}')
+                results[path] = result
+
+        scan([path for path in paths if path not in cached])
+
+        # 2. 跨词典去重（按顺序，先出现的保留）；使用清单的词典与前面的词典重复时需要重新扫描
+        while True:
+            seen, rescan = {}, []
+            for path in paths:
+                if path in results:
+                    hashes = split_hashes(results[path]['hashes'])
+                else:
+                    hashes = split_hashes(base64.b64decode(manifest[path]['hashes']))
+                    if not args.keep_shared and any(digest in seen for digest in hashes):
+                        rescan.append(path)
+                for digest in hashes:
+                    seen.setdefault(digest, path)
+            if not rescan:
+                break
+            cached.difference_update(rescan)
+            scan(rescan)
+        timings['扫描'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        owners = {}
+        for path in paths:
+            result = results.get(path)
+            if result is None:
+                for digest in split_hashes(base64.b64decode(manifest[path]['hashes'])):
+                    owners.setdefault(digest, path)
+                continue
+            kept, hashes = [], []
+            for entry, digest in zip(result['entries'], split_hashes(result['hashes'])):
+                owner = owners.setdefault(digest, path)
+                if owner != path and not args.keep_shared:
+                    result['issues'].append((SHARED, entry[0], f'已在 {owner} 中'))
+                    continue
+                kept.append(entry)
+                hashes.append(digest)
+            result['entries'], result['hashes'] = kept, b''.join(hashes)
+        timings['去重'] = time.perf_counter() - start
+
+        # 3. 只重写内容有变化的词典
+        start = time.perf_counter()
+        changed = []
+        for path in paths:
+            result = results.get(path)
+            if result is None:
+                continue
+            data = serialize(path, result['entries'])
+            result['output'] = source_digest(data)
+            if result['output'] != result['digest']:
+                changed.append(path)
+                if not args.dry_run:
+                    write_atomic(path, data)
+        timings['输出'] = time.perf_counter() - start
+
+        new_config = build_config(config, paths)
+        config_changed = new_config != config
+        if config_changed and not args.dry_run:
+            write_atomic(CONFIG_PATH, (json.dumps(new_config, ensure_ascii=False, indent=4)).encode('utf-8'))
+
+        # 4. 编译内容变化（或产物缺失、过期）的词典
+        if args.compile and not args.dry_run:
+            start = time.perf_counter()
+            targets = [path for path in paths if path in changed or not has_artifact(path)]
+            list(pool.map(compile_dictionary, targets))
+            timings['编译'] = time.perf_counter() - start
+
+    if not args.dry_run:
+        entries = dict(manifest)
+        for path, result in results.items():
+            entries[path] = {'digest': result['output'],
+                             'hashes': base64.b64encode(result['hashes']).decode('ascii'),
+                             'count': len(result['hashes']) // HASH_SIZE}
+        save_manifest(options, {path: entries[path] for path in paths if path in entries})
+
+    # 报告
+    total_in = total_out = 0
+    for path in paths:
+        result = results.get(path)
+        if result is None:
+            count = manifest[path]['count']
+            total_in += count
+            total_out += count
+            print(f"- {path}: {count} 个词条，未变化（使用清单）")
+            continue
+        counts = {kind: sum(1 for issue in result['issues'] if issue[0] == kind)
+                  for kind in (INVALID, DUPLICATE, SHARED, WARNING)}
+        kept = len(result['entries'])
+        total_in += result['total']
+        total_out += kept
+        state = '已更新' if path in changed else '无需修改'
+        if args.dry_run and path in changed:
+            state = '需要更新'
+        print(f"- {path}: {result['total']} → {kept} 个词条（无效 {counts[INVALID]}，文件内重复 {counts[DUPLICATE]}，"
+              f"跨词典重复 {counts[SHARED]}，警告 {counts[WARNING]}），{state}，扫描 {result['seconds']:.2f}s")
+        issues = result['issues'] if args.verbose else result['issues'][:5]
+        for kind, key, message in issues:
+            print(f"    [{kind}] {key}: {message}")
+        if len(issues) < len(result['issues']):
+            print(f"    …… 另有 {len(result['issues']) - len(issues)} 条（-v 显示全部）")
+
+    elapsed = time.perf_counter() - started
+    config_state = ('需要更新' if args.dry_run else '已更新') if config_changed else '无需修改'
+    print(f"config.json: {len(new_config['dictionaries'])} 个词典，{config_state}")
+    print(f"合计: {total_in} → {total_out} 个词条，{len(changed)}/{len(paths)} 个文件{'需要' if args.dry_run else '已'}更新，"
+          f"{args.jobs} 个工作进程")
+    print('耗时: ' + '，'.join(f'{name} {seconds:.2f}s' for name, seconds in timings.items())
+          + f'，总计 {elapsed:.2f}s（{total_in / elapsed:.0f} 词条/秒）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""分级、限流的日志（替代热路径上的 print）"""
+
+import logging
+import os
+import threading
+import time
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+class RateLimitFilter(logging.Filter):
+    """同一条日志（按记录器和消息模板区分）每 interval 秒最多输出 burst 次，
+    其余丢弃，下一个周期输出时附带被省略的条数"""
+
+    def __init__(self, burst=10, interval=60.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # {(记录器, 模板): [周期开始时间, 已输出数, 已省略数]}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window is not None else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f'{record.msg} (前 {self.interval:.0f} 秒内省略 {suppressed} 条)'
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+_rate_limit = RateLimitFilter()
+
+
+def get_logger(name):
+    """带限流的记录器"""
+    logger = logging.getLogger(name)
+    if _rate_limit not in logger.filters:
+        logger.addFilter(_rate_limit)
+    return logger
+
+
+def setup_logging(level=None):
+    """配置日志输出；级别默认读取环境变量 KOTOBA_LOG_LEVEL（默认 INFO）"""
+    level = level or os.environ.get('KOTOBA_LOG_LEVEL', 'INFO')
+    logging.basicConfig(level=level.upper(), format=LOG_FORMAT)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""进程内指标（Prometheus 文本格式），由 /metrics 接口输出"""
+
+import bisect
+import contextlib
+import threading
+import time
+
+from presence import presence
+
+# 默认分桶（秒），覆盖微秒级的答案检查到秒级的词典构建
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def samples(self):
+        """[(后缀, 标签文本, 值)]"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines += [f'{self.name}{suffix}{labels} {_format_value(value)}' for suffix, labels, value in self.samples()]
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """只增计数器"""
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [('', _format_labels(self.labels, key), value) for key, value in items]
+
+
+class Gauge(Metric):
+    """可增可减的当前值；指定 callback 时在输出时调用获取"""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, callback=None):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self.callback() if self.callback is not None else self._value
+
+    def samples(self):
+        return [('', '', self.value())]
+
+
+class Histogram(Metric):
+    """分桶统计耗时分布"""
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}   # {标签值: [各分桶计数, 总和, 次数]}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """统计 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        result = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                result.append(('_bucket', _format_labels(self.labels, key, [('le', repr(bound))]), cumulative))
+            result.append(('_bucket', _format_labels(self.labels, key, [('le', '+Inf')]), count))
+            result.append(('_sum', _format_labels(self.labels, key), total))
+            result.append(('_count', _format_labels(self.labels, key), count))
+        return result
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+class ThreadTracker:
+    """会话线程泄漏检测：线程会话关闭超过 grace 秒后线程仍存活，计为泄漏"""
+
+    def __init__(self, grace=5.0):
+        self.grace = grace
+        self._closed = {}   # {线程: 会话关闭时间}
+        self._lock = threading.Lock()
+
+    def session_closed(self, thread):
+        with self._lock:
+            # 每次登记时清理已结束的线程，未被抓取指标时跟踪表也不会随会话数增长
+            self._prune()
+            self._closed[thread] = time.monotonic()
+
+    def leaked(self):
+        now = time.monotonic()
+        with self._lock:
+            self._prune()
+            return sum(1 for closed_at in self._closed.values() if now - closed_at > self.grace)
+
+    def _prune(self):
+        # 已结束的线程不再跟踪（调用方持有 _lock）
+        for thread in [t for t in self._closed if not t.is_alive()]:
+            del self._closed[thread]
+
+
+registry = Registry()
+threads = ThreadTracker()
+
+DICTIONARY_LOAD_SECONDS = registry.register(Histogram(
+    'kotoba_dictionary_load_seconds', '词典构建耗时（source: artifact 预编译产物 / source 源文件转换 / stream 流式转换至完成）', ['source']))
+KAKASI_CONVERSION_SECONDS = registry.register(Histogram(
+    'kotoba_kakasi_conversion_seconds', 'pykakasi 单次转换耗时'))
+CONVERSION_BATCH_SECONDS = registry.register(Histogram(
+    'kotoba_conversion_batch_seconds', '转换进程池单批耗时（kind: entries 词典冷构建的一块 / texts 合并的单个文本请求）', ['kind']))
+ANSWER_CHECK_SECONDS = registry.register(Histogram(
+    'kotoba_answer_check_seconds', '答案检查耗时'))
+EVAL_JS_SECONDS = registry.register(Histogram(
+    'kotoba_eval_js_seconds', 'eval_js 浏览器往返耗时（_count 即往返次数）', ['call']))
+QUESTION_LATENCY_SECONDS = registry.register(Histogram(
+    'kotoba_question_latency_seconds', '出题耗时（kind: first 会话开始到首题 / prefetched、cold 答对到下一题）', ['kind']))
+SEARCH_SECONDS = registry.register(Histogram(
+    'kotoba_search_seconds', '搜索耗时（kind: query 单次查询 / build 索引构建）', ['kind']))
+DICTIONARY_RELOADS = registry.register(Counter(
+    'kotoba_dictionary_reloads_total', '热重载次数（kind: config 配置文件 / dictionary 词典文件）', ['kind']))
+SESSIONS_TOTAL = registry.register(Counter(
+    'kotoba_sessions_total', '已开始的会话数'))
+ACTIVE_SESSIONS = registry.register(Gauge(
+    'kotoba_active_sessions', '当前会话数'))
+ONLINE_USERS = registry.register(Gauge(
+    'kotoba_online_users', '当前在线用户数（同一用户的多个会话只计一次）', callback=presence.count))
+THREADS = registry.register(Gauge(
+    'kotoba_threads', '进程线程数', callback=threading.active_count))
+LEAKED_THREADS = registry.register(Gauge(
+    'kotoba_leaked_threads', '会话关闭后仍存活的会话线程数', callback=threads.leaked))
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""词典的紧凑列式存储
+
+每个词条的字段（假名、中文含义、罗马音、答案键、振り仮名分段）以 UTF-8 编码后
+依次写入同一个 bytes 缓冲区，按偏移量表取出；单词本身只保存一份（键数组 + 下标字典）。
+words / answer_keys / ruby_segments 以只读映射视图的形式提供，与原来的字典用法兼容。
+"""
+
+import array
+import io
+import re
+from collections.abc import Mapping
+
+# 字段分隔符 / 字段内多值分隔符
+FIELD_SEP = '\x1e'
+ITEM_SEP = '\x1f'
+# 文本中出现的分隔符（以及转义符本身）写为转义符 + 序号，读取时还原
+ESCAPE = '\x1b'
+_ESCAPES = str.maketrans({ESCAPE: ESCAPE + '0', FIELD_SEP: ESCAPE + '1', ITEM_SEP: ESCAPE + '2'})
+_UNESCAPES = {'0': ESCAPE, '1': FIELD_SEP, '2': ITEM_SEP}
+_ESCAPED = re.compile(ESCAPE + '(.)', re.DOTALL)
+
+
+def _escape(text):
+    return text.translate(_ESCAPES)
+
+
+def _unescape(text):
+    if ESCAPE not in text:
+        return text
+    return _ESCAPED.sub(lambda m: _UNESCAPES[m.group(1)], text)
+
+
+def _join(items):
+    return ITEM_SEP.join(_escape(item) for item in items)
+
+
+def _split(field):
+    """拆分多值字段并还原转义"""
+    items = field.split(ITEM_SEP)
+    if ESCAPE in field:
+        items = [_unescape(item) for item in items]
+    return items
+
+
+def _encode(entry):
+    _, reading, meaning, romaji, answer_keys, segments = entry
+    flat = _join(part for segment in segments for part in segment)
+    return FIELD_SEP.join((_escape(reading), _escape(meaning), _escape(romaji), _join(answer_keys), flat)).encode('utf-8')
+
+
+class PackedEntries:
+    """所有词条字段的打包存储"""
+
+    __slots__ = ('keys', 'index', 'offsets', 'buffer')
+
+    def __init__(self, keys, offsets, buffer):
+        self.keys = keys            # (单词, ...)，保持原顺序
+        self.index = {key: i for i, key in enumerate(keys)}
+        self.offsets = offsets      # array('Q') 或内存映射上的 memoryview('Q')，第 i 个词条位于 buffer[offsets[i]:offsets[i + 1]]
+        self.buffer = buffer        # bytes 或内存映射上的 memoryview
+
+    @classmethod
+    def from_entries(cls, entries):
+        """由 (汉字, 假名, 中文含义, 罗马音, 答案键, 振り仮名分段) 序列构建（只遍历一次，可传入生成器）
+
+        重复的单词与 json.load 一致：保留第一次出现的位置和最后一次出现的内容。
+        """
+        encoded = {}
+        for entry in entries:
+            encoded[entry[0]] = _encode(entry)
+        offsets = array.array('Q', [0])
+        buffer = io.BytesIO()
+        for data in encoded.values():
+            offsets.append(offsets[-1] + buffer.write(data))
+        return cls(tuple(encoded), offsets, buffer.getvalue())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def fields(self, i):
+        """第 i 个词条的字段 [假名, 中文含义, 罗马音, 答案键, 振り仮名分段]
+
+        前三个字段已还原转义；后两个是多值字段，由 _split 拆分并还原。
+        """
+        text = str(self.buffer[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+        fields = text.split(FIELD_SEP)
+        if ESCAPE in text:
+            fields[:3] = map(_unescape, fields[:3])
+        return fields
+
+    def __reduce__(self):
+        # 序列化时不保存下标字典，读取时重建；内存映射的视图复制为普通对象
+        return (PackedEntries, (self.keys, array.array('Q', self.offsets), bytes(self.buffer)))
+
+
+class _View(Mapping):
+    """按单词查询某一列的只读映射"""
+
+    __slots__ = ('_packed',)
+
+    def __init__(self, packed):
+        self._packed = packed
+
+    def _value(self, fields):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        return self._value(self._packed.fields(self._packed.index[key]))
+
+    def __contains__(self, key):
+        return key in self._packed.index
+
+    def __iter__(self):
+        return iter(self._packed.keys)
+
+    def __len__(self):
+        return len(self._packed.keys)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} of {len(self)} words>'
+
+
+class WordsView(_View):
+    """{汉字: (假名, 中文含义, 罗马音)}"""
+
+    __slots__ = ()
+
+    def _value(self, fields):
+        return (fields[0], fields[1], fields[2])
+
+
+class AnswerKeysView(_View):
+    """{汉字: 答案键}"""
+
+    __slots__ = ()
+
+    def _value(self, fields):
+        return tuple(_split(fields[3]))
+
+
+class SegmentsView(_View):
+    """{汉字: ((原文, 平假名), ...)}"""
+
+    __slots__ = ()
+
+    def _value(self, fields):
+        if not fields[4]:
+            return ()
+        flat = _split(fields[4])
+        return tuple(zip(flat[0::2], flat[1::2]))
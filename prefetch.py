@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from answer import answer_keys_for
+from ruby import create_ruby_html
+
+# 预先准备的题目数
+PREFETCH_DEPTH = 3
+
+# 所有会话共用的少量后台线程（准备一道题只需微秒级，无需每个会话一个线程）
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='prefetch')
+
+
+class Question:
+    """一道准备好的题目：振り仮名 HTML、提示文字和答案键均已就绪"""
+
+    __slots__ = ('kanji', 'reading', 'meaning', 'romaji', 'ruby_html', 'answer_keys')
+
+    def __init__(self, kanji, reading, meaning, romaji, ruby_html, answer_keys):
+        self.kanji = kanji
+        self.reading = reading
+        self.meaning = meaning
+        self.romaji = romaji
+        self.ruby_html = ruby_html
+        self.answer_keys = answer_keys
+
+    @property
+    def answer(self):
+        """(平假名, 含义, 罗马音)，与词典中的格式一致"""
+        return (self.reading, self.meaning, self.romaji)
+
+
+def prepare_question(dictionary, kanji, show_katakana_reading=False):
+    """准备一道题目"""
+    answer = reading, meaning, romaji = dictionary.words[kanji]
+    ruby_html = create_ruby_html(kanji, show_katakana_reading, dictionary.ruby_segments.get(kanji))
+    return Question(kanji, reading, meaning, romaji, ruby_html, answer_keys_for(kanji, answer, dictionary.answer_keys))
+
+
+class QuestionPipeline:
+    """出题流水线
+
+    学习者作答期间，在后台线程中从调度器抽取并准备接下来的 depth 道题，
+    答对后下一题可以直接发送。预备队列为空时退回到现场准备。
+    """
+
+    def __init__(self, scheduler, dictionary, show_katakana_reading=False, depth=PREFETCH_DEPTH):
+        self.scheduler = scheduler
+        self.dictionary = dictionary
+        self.show_katakana_reading = show_katakana_reading
+        self.depth = depth
+        self._ready = collections.deque()
+        # 调度器不是线程安全的，抽题和记录结果都在锁内进行
+        self._lock = threading.Lock()
+        self._filling = False
+
+    def _prepare(self, kanji):
+        return prepare_question(self.dictionary, kanji, self.show_katakana_reading)
+
+    def _fill(self):
+        try:
+            while True:
+                with self._lock:
+                    if len(self._ready) >= self.depth:
+                        return
+                    kanji = self.scheduler.next()
+                question = self._prepare(kanji)
+                with self._lock:
+                    self._ready.append(question)
+        finally:
+            with self._lock:
+                self._filling = False
+
+    def prefetch(self):
+        """在后台补足预备题目（立即返回）"""
+        with self._lock:
+            if self._filling or len(self._ready) >= self.depth:
+                return
+            self._filling = True
+        _executor.submit(self._fill)
+
+    def next(self):
+        """取出下一道题，返回 (题目, 是否已预先准备)"""
+        with self._lock:
+            if self._ready:
+                return self._ready.popleft(), True
+            kanji = self.scheduler.next()
+        return self._prepare(kanji), False
+
+    def record(self, kanji, correct):
+        """记录作答结果（已在预备队列中的题目不受影响）"""
+        with self._lock:
+            self.scheduler.record(kanji, correct)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""多进程部署（pre-fork）
+
+主进程预先加载全部词典（预编译产物以只读内存映射打开）并绑定端口，然后 fork 出多个工作进程，
+各自运行 Tornado + WebSocket 的 PyWebIO 服务，共同 accept 同一个监听套接字：
+
+- 词典: 映射同一个产物文件，所有工作进程共享页缓存，不各自保存一份
+- 会话亲和: 每个会话固定在一条 WebSocket 连接上，由接受连接的工作进程处理到底
+  （HTTP 轮询的每个请求可能落到不同进程，因此多进程模式只使用 WebSocket）
+- 在线人数: 各工作进程把本进程的人数写入共享内存中的槽位，显示时求和
+
+工作进程异常退出时由主进程重新启动；主进程收到 SIGTERM/SIGINT 时通知全部工作进程退出。
+"""
+
+import concurrent.futures
+import gc
+import logging
+import mmap
+import os
+import signal
+import struct
+import sys
+import time
+
+import tornado.httpserver
+import tornado.ioloop
+import tornado.netutil
+import tornado.web
+import tornado.wsgi
+from flask import Flask
+from pywebio.platform.tornado import webio_handler
+from pywebio.utils import STATIC_PATH
+
+import dict_store
+from convert_pool import conversion
+from dict_store import build_dictionary, file_digest, get_dictionary, get_kakasi, read_artifact
+from logs import get_logger
+from presence import presence
+from ruby import warm_ruby_cache
+from search import get_index
+from web import add_api_routes
+
+logger = get_logger(__name__)
+
+# 工作进程频繁崩溃时放弃重启
+MAX_RESTARTS = 100
+
+
+class SharedSlots:
+    """fork 之前创建的匿名共享内存，每个工作进程一个 64 位整数槽位"""
+
+    __slots__ = ('size', '_map')
+
+    def __init__(self, size):
+        self.size = size
+        self._map = mmap.mmap(-1, size * 8)
+
+    def set(self, index, value):
+        struct.pack_into('q', self._map, index * 8, value)
+
+    def total(self):
+        return sum(struct.unpack_from(f'{self.size}q', self._map, 0))
+
+
+def preload_dictionaries(paths):
+    """在主进程中加载全部词典；缺少预编译产物的先编译，保证工作进程拿到的都是内存映射"""
+    paths = list(paths)
+    for path in paths:
+        path = dict_store.normalize_path(path)
+        if not os.path.exists(path):
+            continue
+        digest = file_digest(path)
+        if read_artifact(path, digest) is None:
+            logger.info('词典 %s 没有可用的预编译产物，正在编译', path)
+            build_dictionary(path, None)
+        warm_ruby_cache(get_dictionary(path))
+    # 搜索索引也在 fork 之前建好，由工作进程共享
+    get_index(paths)
+
+
+def _run_worker(index, target, dictionaries, sockets, slots, trust_proxy):
+    """工作进程: 在继承的监听套接字上运行 Tornado 服务"""
+    presence.attach(slots, index)
+    # 监视线程不会随 fork 继承，每个工作进程各自检查；词典变化时只有一个进程转换，其余映射其产物
+    dictionaries.start()
+    # 请求日志只输出警告以上，与单进程模式一致
+    logging.getLogger('tornado.access').setLevel(logging.WARNING)
+
+    api = Flask(__name__)
+    add_api_routes(api, dictionaries)
+    # 词典接口和静态资源在线程池中执行，不阻塞 WebSocket 的事件循环
+    container = tornado.wsgi.WSGIContainer(
+        api, executor=concurrent.futures.ThreadPoolExecutor(4, thread_name_prefix='wsgi'))
+    application = tornado.web.Application([
+        (r'/', webio_handler(target, cdn=True)),
+        (r'/(?:dict/.*|metrics|search|static/.*)', tornado.web.FallbackHandler, {'fallback': container}),
+        (r'/(.*)', tornado.web.StaticFileHandler, {'path': STATIC_PATH, 'default_filename': 'index.html'}),
+    ], websocket_ping_interval=30)
+    # X-Forwarded-For 可由客户端伪造，只有部署在反向代理之后时才采用（用户 IP 是学习进度标识的一部分）
+    server = tornado.httpserver.HTTPServer(application, xheaders=trust_proxy)
+    server.add_sockets(sockets)
+    logger.info('工作进程 %d (pid %d) 已启动', index, os.getpid())
+    ioloop = tornado.ioloop.IOLoop.current()
+    # 与单进程模式一致，SIGTERM 时正常退出以执行 atexit（写入剩余学习进度）。
+    # 信号可能由其它线程接收，由事件循环处理才能唤醒阻塞在 select 中的主线程
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        ioloop.asyncio_loop.add_signal_handler(signum, ioloop.stop)
+    ioloop.start()
+
+
+def start_prefork_server(target, dictionaries, port=8080, host='0.0.0.0', workers=None, trust_proxy=False):
+    """启动多进程服务；workers 默认为 CPU 核数，trust_proxy 为真时采用反向代理传入的客户端地址"""
+    workers = workers or os.cpu_count() or 1
+    # 先绑定端口：预加载期间到达的连接在监听队列中等待，工作进程启动后立即处理
+    sockets = tornado.netutil.bind_sockets(port, host or None)
+    preload_dictionaries(dictionaries.current.paths)
+    if not conversion.enabled:
+        # Kakasi 约占 100 MiB，在 fork 之前初始化由全部工作进程共享，而不是每个进程各自加载一份
+        get_kakasi()
+    slots = SharedSlots(workers)
+    # 此后主进程中的对象不再被回收器扫描，减少工作进程中因 GC 触发的写时复制
+    gc.freeze()
+
+    children = {}  # {pid: 槽位序号}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(index, target, dictionaries, sockets, slots, trust_proxy)
+            sys.exit(0)
+        children[pid] = index
+
+    for index in range(workers):
+        spawn(index)
+    logger.info('已启动 %d 个工作进程，监听端口 %d', workers, port)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    restarts = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = children.pop(pid, None)
+        if index is None:
+            continue
+        # 退出的进程不再计入在线人数
+        slots.set(index, 0)
+        if stopping:
+            continue
+        restarts += 1
+        if restarts > MAX_RESTARTS:
+            logger.error('工作进程重启次数过多，停止服务')
+            stop(None, None)
+            continue
+        logger.warning('工作进程 %d (pid %d) 已退出 (状态 %d)，正在重启', index, pid, status)
+        time.sleep(0.1)
+        spawn(index)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+
+class PresenceTracker:
+    """在线用户统计：会话开始时登记、会话关闭时注销，不需要任何保活线程
+
+    同一用户（IP + 浏览器）可能同时打开多个会话，按用户计数，
+    最后一个会话关闭时才算离线。
+
+    多进程部署时通过 attach 把本进程的人数写入共享内存中的槽位，
+    count 返回所有工作进程之和。
+    """
+
+    def __init__(self):
+        self._sessions = {}  # {用户标识: 会话数}
+        self._lock = threading.Lock()
+        self._shared = None  # (共享槽位, 本进程的槽位序号)
+
+    def attach(self, slots, index):
+        """与其它工作进程共享在线人数（slots 需提供 set(序号, 值) 和 total()）"""
+        with self._lock:
+            self._shared = (slots, index)
+            self._publish()
+
+    def _publish(self):
+        if self._shared is not None:
+            slots, index = self._shared
+            slots.set(index, len(self._sessions))
+
+    def register(self, user_id):
+        """登记一个会话，返回当前在线人数"""
+        with self._lock:
+            self._sessions[user_id] = self._sessions.get(user_id, 0) + 1
+            self._publish()
+        return self.count()
+
+    def unregister(self, user_id):
+        """注销一个会话"""
+        with self._lock:
+            remaining = self._sessions.get(user_id, 0) - 1
+            if remaining > 0:
+                self._sessions[user_id] = remaining
+            else:
+                self._sessions.pop(user_id, None)
+            self._publish()
+
+    def count(self):
+        """当前在线人数"""
+        if self._shared is not None:
+            return self._shared[0].total()
+        return len(self._sessions)
+
+
+# 进程级在线用户统计
+presence = PresenceTracker()
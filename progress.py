@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import threading
+import time
+
+from logs import get_logger
+
+logger = get_logger(__name__)
+
+DAY = 86400
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS reviews (
+    user_id TEXT NOT NULL,
+    dictionary TEXT NOT NULL,
+    word TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reviews_user ON reviews (user_id, dictionary, word);
+CREATE TABLE IF NOT EXISTS cards (
+    user_id TEXT NOT NULL,
+    dictionary TEXT NOT NULL,
+    word TEXT NOT NULL,
+    repetitions INTEGER NOT NULL,
+    interval REAL NOT NULL,
+    ease REAL NOT NULL,
+    lapses INTEGER NOT NULL,
+    due REAL NOT NULL,
+    PRIMARY KEY (user_id, dictionary, word)
+);
+CREATE TABLE IF NOT EXISTS totals (
+    user_id TEXT PRIMARY KEY,
+    correct INTEGER NOT NULL,
+    wrong INTEGER NOT NULL
+);
+'''
+
+# 计数以增量写入：多个工作进程中同一用户的会话各自累加，不会互相覆盖
+ADD_TOTALS = '''
+INSERT INTO totals VALUES (?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET correct = correct + excluded.correct, wrong = wrong + excluded.wrong
+'''
+
+
+class Card:
+    """一个单词的复习状态（SM-2 简化版）"""
+
+    __slots__ = ('repetitions', 'interval', 'ease', 'lapses', 'due')
+
+    def __init__(self, repetitions=0, interval=0.0, ease=2.5, lapses=0, due=0.0):
+        self.repetitions = repetitions
+        self.interval = interval    # 天
+        self.ease = ease
+        self.lapses = lapses
+        self.due = due              # 下次复习时间（时间戳）
+
+    def review(self, correct, now):
+        """根据作答结果更新复习间隔"""
+        if correct:
+            self.repetitions += 1
+            if self.repetitions == 1:
+                self.interval = 1.0
+            elif self.repetitions == 2:
+                self.interval = 6.0
+            else:
+                self.interval = round(self.interval * self.ease, 1)
+            self.ease = min(3.0, self.ease + 0.1)
+        else:
+            # 答错: 重新开始，当天内再次复习
+            self.repetitions = 0
+            self.interval = 0.0
+            self.lapses += 1
+            self.ease = max(1.3, self.ease - 0.2)
+        self.due = now + self.interval * DAY
+
+    def row(self):
+        return (self.repetitions, self.interval, self.ease, self.lapses, self.due)
+
+
+class UserProgress:
+    """内存中的用户进度: 总计数 + 当前词典的复习卡片"""
+
+    __slots__ = ('correct', 'wrong', 'known', 'cards', 'sessions')
+
+    def __init__(self, correct=0, wrong=0, known=False):
+        self.correct = correct
+        self.wrong = wrong
+        self.known = known      # 数据库中是否已有该用户
+        self.cards = {}         # {(词典, 单词): Card}
+        self.sessions = 0
+
+
+class ProgressStore:
+    """服务端学习进度（SQLite WAL）
+
+    作答只修改内存状态并写入缓冲区，由后台线程按批次写盘，
+    答题路径不会等待磁盘。会话开始时的读取请在工作线程中调用。
+
+    多进程部署时每个工作进程各有一个实例：计数以增量写入，卡片在写入时
+    把本批作答重放到数据库中的最新状态上，因此不同进程的进度会合并而不是互相覆盖。
+    """
+
+    def __init__(self, path='progress.db', flush_interval=2.0, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._users = {}
+        self._lock = threading.Lock()
+        # 数据库锁：从取出缓冲区到写入完成期间一直持有，批次按取出的顺序提交
+        self._db_lock = threading.Lock()
+        self._reviews = []          # 待写入的作答记录（卡片状态在写入时由作答记录重放得出）
+        self._seeds = {}            # 待写入的新用户初始计数 {用户: (答对数, 答错数)}
+        self._totals = {}           # 待写入的计数增量 {用户: [答对数, 答错数]}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._conn = None
+        self._flusher = None
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._flusher = threading.Thread(target=self._flush_loop, name='progress-flusher', daemon=True)
+            self._flusher.start()
+        return self._conn
+
+    def load_user(self, user_id, dictionary):
+        """读取用户的总计数和指定词典的卡片（会阻塞，协程会话中应放到工作线程）"""
+        with self._lock:
+            user = self._users.get(user_id)
+            loaded = user is not None and any(d == dictionary for d, _ in user.cards)
+        if user is None or not loaded:
+            with self._db_lock:
+                # 先写入缓冲区，避免读到旧数据（持有数据库锁，正在写入的批次也已完成）
+                self._flush()
+                conn = self._connect()
+                totals = conn.execute('SELECT correct, wrong FROM totals WHERE user_id = ?', (user_id,)).fetchone()
+                rows = conn.execute(
+                    'SELECT word, repetitions, interval, ease, lapses, due FROM cards WHERE user_id = ? AND dictionary = ?',
+                    (user_id, dictionary)).fetchall()
+            with self._lock:
+                user = self._users.get(user_id)
+                if user is None:
+                    user = self._users[user_id] = UserProgress(*(totals or (0, 0)), known=totals is not None)
+                for word, *state in rows:
+                    user.cards.setdefault((dictionary, word), Card(*state))
+        with self._lock:
+            user.sessions += 1
+        return user
+
+    def release(self, user_id):
+        """会话结束；该用户没有其它会话时释放内存（未写盘的数据已在缓冲区中）"""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return
+            user.sessions -= 1
+            if user.sessions <= 0:
+                del self._users[user_id]
+
+    def seed_totals(self, user_id, correct, wrong):
+        """新用户沿用浏览器中已有的计数"""
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None or user.known:
+                return
+            user.correct, user.wrong, user.known = correct, wrong, True
+            self._seeds[user_id] = (correct, wrong)
+
+    def totals(self, user_id):
+        """(答对数, 答错数)"""
+        user = self._users.get(user_id)
+        return (user.correct, user.wrong) if user is not None else (0, 0)
+
+    def due_words(self, user_id, dictionary, now=None):
+        """已到复习时间的单词"""
+        now = time.time() if now is None else now
+        user = self._users.get(user_id)
+        if user is None:
+            return []
+        with self._lock:
+            return [word for (d, word), card in user.cards.items() if d == dictionary and card.due <= now]
+
+    def record(self, user_id, dictionary, word, correct):
+        """记录一次作答（只修改内存并写入缓冲区）"""
+        now = time.time()
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = UserProgress()
+            card = user.cards.get((dictionary, word))
+            if card is None:
+                card = user.cards[(dictionary, word)] = Card()
+            card.review(correct, now)
+            if correct:
+                user.correct += 1
+            else:
+                user.wrong += 1
+            user.known = True
+            self._reviews.append((user_id, dictionary, word, int(correct), now))
+            self._totals.setdefault(user_id, [0, 0])[0 if correct else 1] += 1
+            full = len(self._reviews) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """把缓冲区写入数据库（一个事务）"""
+        with self._db_lock:
+            return self._flush()
+
+    def _flush(self):
+        # 调用方持有 _db_lock
+        with self._lock:
+            reviews, self._reviews = self._reviews, []
+            seeds, self._seeds = self._seeds, {}
+            totals, self._totals = self._totals, {}
+        if not (reviews or seeds or totals):
+            return 0
+        try:
+            conn = self._connect()
+            with conn:
+                # 立即取得写锁：事务中读到的卡片状态在提交前不会被其它进程修改
+                conn.execute('BEGIN IMMEDIATE')
+                # 其它进程已经写入该用户时不再使用浏览器中的旧计数
+                conn.executemany('INSERT OR IGNORE INTO totals VALUES (?, ?, ?)',
+                                 [(user_id,) + counts for user_id, counts in seeds.items()])
+                conn.executemany(ADD_TOTALS, [(user_id,) + tuple(delta) for user_id, delta in totals.items()])
+                conn.executemany('INSERT INTO reviews VALUES (?, ?, ?, ?, ?)', reviews)
+                conn.executemany('INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                 self._replay(conn, reviews))
+        except sqlite3.Error:
+            # 写入失败时放回缓冲区（期间产生的新数据排在后面，增量相加），下次重试
+            with self._lock:
+                self._reviews = reviews + self._reviews
+                seeds.update(self._seeds)
+                self._seeds = seeds
+                for user_id, (correct, wrong) in self._totals.items():
+                    delta = totals.setdefault(user_id, [0, 0])
+                    delta[0] += correct
+                    delta[1] += wrong
+                self._totals = totals
+            raise
+        return len(reviews)
+
+    @staticmethod
+    def _replay(conn, reviews):
+        """把本批作答按顺序应用到数据库中各卡片的当前状态上，返回要写入的行"""
+        cards = {}
+        for user_id, dictionary, word, correct, answered_at in reviews:
+            key = (user_id, dictionary, word)
+            card = cards.get(key)
+            if card is None:
+                row = conn.execute(
+                    'SELECT repetitions, interval, ease, lapses, due FROM cards WHERE user_id = ? AND dictionary = ? AND word = ?',
+                    key).fetchone()
+                card = cards[key] = Card(*(row or ()))
+            card.review(correct, answered_at)
+        return [key + card.row() for key, card in cards.items()]
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error('学习进度写入失败: %s', e)
+
+    def close(self):
+        """写入剩余数据并关闭"""
+        self._closed = True
+        self._wakeup.set()
+        with self._db_lock:
+            self._flush()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import itertools
+import threading
+
+from dict_store import kakasi_convert
+
+# 渲染结果缓存上限（约覆盖最大词典的两种片假名设置）
+RUBY_CACHE_SIZE = 16384
+
+_warmed = set()
+_warm_lock = threading.Lock()
+
+
+def is_kanji(char):
+    """判断字符是否是汉字"""
+    # 汉字的 Unicode 范围
+    return 0x4E00 <= ord(char) <= 0x9FFF
+
+
+def is_katakana(char):
+    """判断字符是否是片假名"""
+    return 0x30A0 <= ord(char) <= 0x30FF
+
+
+@functools.lru_cache(maxsize=RUBY_CACHE_SIZE)
+def create_ruby_html(text, show_katakana_reading=False, segments=None):
+    """创建带有振り仮名的 HTML；segments 为预计算的 (原文, 平假名) 分段，缺省时现场转换"""
+    if segments is None:
+        # 使用 pykakasi 重新获取每个字符的信息
+        segments = tuple((item['orig'], item['hira']) for item in kakasi_convert(text))
+
+    html_parts = []
+    for orig, hira in segments:
+        # 如果是汉字，或者（启用了片假名显示且是片假名），则添加振り仮名
+        if any(is_kanji(char) for char in orig) or (show_katakana_reading and any(is_katakana(char) for char in orig)):
+            html_parts.append(f'<ruby>{orig}<rt>{hira}</rt></ruby>')
+        else:
+            # 如果不是汉字或片假名，直接添加原文
+            html_parts.append(orig)
+
+    # 返回完整的 HTML
+    return ''.join(html_parts)
+
+
+def warm_ruby_cache(dictionary, show_katakana_reading=False):
+    """在词典加载时预先渲染词条（每个词典版本只做一次；未加载完成的词典由预取按需渲染）
+
+    最多渲染 RUBY_CACHE_SIZE 条，超出的部分只会挤掉刚渲染的结果。
+    """
+    if dictionary.digest is None:
+        return
+    key = (dictionary.path, dictionary.digest, show_katakana_reading)
+    with _warm_lock:
+        if key in _warmed:
+            return
+        # 同一词典的旧版本已被取代，不再保留它的记录
+        _warmed.difference_update([k for k in _warmed if k[0] == dictionary.path and k[1] != dictionary.digest])
+        _warmed.add(key)
+    items = dictionary.ruby_segments.items()
+    for text, segments in itertools.islice(items, min(len(dictionary), RUBY_CACHE_SIZE)):
+        create_ruby_html(text, show_katakana_reading, segments)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+# 答错时权重翻倍，答对时减半，权重范围 [1, MAX_WEIGHT]
+MAX_WEIGHT = 32.0
+# 间隔复习到期的单词的初始权重
+DUE_WEIGHT = 4.0
+
+
+class FenwickTree:
+    """树状数组：O(log n) 更新单点权重、按累计权重查找下标"""
+
+    __slots__ = ('size', 'tree')
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        # O(n) 建树
+        tree = [0.0] + list(weights)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    @classmethod
+    def uniform(cls, size):
+        """所有权重为 1 时每个节点的值就是它覆盖的区间长度，无需逐个累加"""
+        tree = cls.__new__(cls)
+        tree.size = size
+        tree.tree = [0.0] + [float(i & -i) for i in range(1, size + 1)]
+        return tree
+
+    def add(self, index, delta):
+        """第 index 个元素（从 0 开始）的权重增加 delta"""
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        """全部权重之和"""
+        i, result = self.size, 0.0
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def find(self, target):
+        """返回累计权重首次超过 target 的下标（从 0 开始）"""
+        pos = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.size - 1)
+
+
+def key_index(dictionary):
+    """词典的单词数组和 {单词: 下标}（直接使用紧凑存储中的键数组和下标，所有会话共享）"""
+    return dictionary.packed.keys, dictionary.packed.index
+
+
+class QuestionScheduler:
+    """出题调度器
+
+    均匀模式: 从预先构建的单词数组中 O(1) 随机抽取。
+    加权模式: 每个单词一个权重（初始均为 1），答错的单词权重升高、更常出现，
+              抽取和更新均为 O(log n)。
+    """
+
+    def __init__(self, keys, index=None, weighted=True, rng=None):
+        self.keys = keys
+        self.index = index if index is not None else {key: i for i, key in enumerate(keys)}
+        self.weighted = weighted
+        self.rng = rng or random.Random()
+        if weighted:
+            self.weights = [1.0] * len(keys)
+            self.tree = FenwickTree.uniform(len(keys))
+
+    @classmethod
+    def for_dictionary(cls, dictionary, **kwargs):
+        keys, index = key_index(dictionary)
+        return cls(keys, index, **kwargs)
+
+    def next(self):
+        """抽取下一个单词"""
+        if not self.weighted:
+            return self.keys[self.rng.randrange(len(self.keys))]
+        return self.keys[self.tree.find(self.rng.random() * self.tree.total())]
+
+    def record(self, key, correct):
+        """记录一次作答结果（仅加权模式生效）"""
+        if not self.weighted:
+            return
+        i = self.index.get(key)
+        if i is None:
+            return
+        old = self.weights[i]
+        self.set_weight(key, max(1.0, old / 2) if correct else min(MAX_WEIGHT, old * 2))
+
+    def inherit(self, other):
+        """沿用另一个调度器（同一词典的旧版本）中已调整的权重，新版本中不存在的单词忽略"""
+        if not (self.weighted and other.weighted):
+            return
+        for key, weight in zip(other.keys, other.weights):
+            self.set_weight(key, weight)
+
+    def set_weight(self, key, weight):
+        """直接设置单词权重（仅加权模式生效）"""
+        i = self.index.get(key)
+        if not self.weighted or i is None:
+            return
+        old = self.weights[i]
+        if weight != old:
+            self.weights[i] = weight
+            self.tree.add(i, weight - old)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""跨词典搜索
+
+对所有配置词典建立三类索引，查询时按匹配方式依次合并结果：
+
+- 单词 / 假名读音 / 罗马音的前缀索引（有序键数组 + 二分查找前缀区间，相当于压缩的字典树）
+- 汉字倒排索引：汉字 → 含有该字的词条
+- 中文含义的 n-gram 倒排索引（单字和双字），多字查询取交集后再核对原文
+
+词条以整数编号表示，倒排表为递增的 array('I')，交集从最短的表开始逐个二分查找。
+"""
+
+import array
+import bisect
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from dict_store import kakasi_convert, normalize_path, peek_dictionary, preload_dictionary
+from logs import get_logger
+from metrics import SEARCH_SECONDS
+
+logger = get_logger(__name__)
+
+KANJI = re.compile('[㐀-䶿一-鿿豈-﫿]')
+KANA = re.compile('[ぁ-ゖァ-ヺー]')
+ROMAJI = re.compile("[a-z0-9' -]+")
+
+# 查询结果的匹配方式（按优先级排列）
+MATCH_WORD = 'word'
+MATCH_READING = 'reading'
+MATCH_ROMAJI = 'romaji'
+MATCH_KANJI = 'kanji'
+MATCH_MEANING = 'meaning'
+
+
+def normalize(text):
+    """NFKC（全角→半角）、小写、去除空白"""
+    return ''.join(unicodedata.normalize('NFKC', text).lower().split())
+
+
+def to_hiragana(text):
+    """片假名转为平假名（长音符等保持不变）"""
+    return ''.join(chr(ord(c) - 0x60) if 'ァ' <= c <= 'ヶ' else c for c in text)
+
+
+def ngrams(text):
+    """单字和相邻双字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _contains(ids, value):
+    i = bisect.bisect_left(ids, value)
+    return i < len(ids) and ids[i] == value
+
+
+def _intersect(postings):
+    """多个递增编号表的交集（递增列表）
+
+    从最短的表开始：另一个表长得多时逐个二分查找，否则用集合求交。
+    """
+    if not postings or any(ids is None for ids in postings):
+        return []
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for ids in postings[1:]:
+        if not result:
+            break
+        if len(ids) > 16 * len(result):
+            result = [value for value in result if _contains(ids, value)]
+        else:
+            result = sorted(set(result).intersection(ids))
+    return result
+
+
+class PrefixIndex:
+    """有序键数组上的前缀查找"""
+
+    __slots__ = ('keys', 'ids')
+
+    def __init__(self, pairs):
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = array.array('I', (i for _, i in pairs))
+
+    def prefix(self, prefix):
+        """键以 prefix 开头的词条编号（完全匹配的排在最前）"""
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        return self.ids[lo:hi]
+
+
+class SearchIndex:
+    """一组词典（同一内容版本）的搜索索引，建成后只读，由所有会话共享"""
+
+    def __init__(self, dictionaries):
+        self.key = tuple((d.path, d.digest) for d in dictionaries)
+        self.dictionaries = list(dictionaries)
+        self._owners = array.array('H')     # 词条编号 → 词典序号
+        self._positions = array.array('I')  # 词条编号 → 词典内的位置
+        words, readings, romaji = [], [], []
+        kanji, grams = {}, {}
+        for slot, dictionary in enumerate(self.dictionaries):
+            packed = dictionary.packed
+            for position, word in enumerate(packed.keys):
+                i = len(self._owners)
+                self._owners.append(slot)
+                self._positions.append(position)
+                reading, meaning, roman = packed.fields(position)[:3]
+                words.append((normalize(word), i))
+                readings.append((normalize(reading), i))
+                romaji.append((normalize(roman), i))
+                for char in dict.fromkeys(KANJI.findall(word)):
+                    kanji.setdefault(char, array.array('I')).append(i)
+                for gram in ngrams(normalize(meaning)):
+                    grams.setdefault(gram, array.array('I')).append(i)
+        self.words = PrefixIndex(words)
+        self.readings = PrefixIndex(readings)
+        self.romaji = PrefixIndex(romaji)
+        self.kanji = kanji
+        self.grams = grams
+
+    def __len__(self):
+        return len(self._owners)
+
+    def entry(self, i):
+        """(词典, 单词)"""
+        dictionary = self.dictionaries[self._owners[i]]
+        return dictionary, dictionary.packed.keys[self._positions[i]]
+
+    def fields(self, i):
+        """(假名, 中文含义, 罗马音)"""
+        dictionary, word = self.entry(i)
+        return dictionary.words[word]
+
+    def _meaning(self, query):
+        if len(query) <= 2:
+            return self.grams.get(query, ())
+        candidates = _intersect([self.grams.get(query[i:i + 2]) for i in range(len(query) - 1)])
+        # 双字都出现不代表连续出现，核对原文
+        return (i for i in candidates if query in normalize(self.fields(i)[1]))
+
+    def _sources(self, query):
+        """按优先级生成 (匹配方式, 词条编号序列)"""
+        yield MATCH_WORD, self.words.prefix(query)
+        chars = dict.fromkeys(KANJI.findall(query))
+        if KANA.search(query) and not chars:
+            yield MATCH_READING, self.readings.prefix(to_hiragana(query))
+        if ROMAJI.fullmatch(query):
+            yield MATCH_ROMAJI, self.romaji.prefix(query)
+        if chars:
+            yield MATCH_KANJI, _intersect([self.kanji.get(char) for char in chars])
+        yield MATCH_MEANING, self._meaning(query)
+        if chars and KANA.search(query):
+            # 最后按读音匹配汉字假名混写的查询（例如 食べる → たべる）
+            yield MATCH_READING, self.readings.prefix(''.join(item['hira'] for item in kakasi_convert(query)))
+
+    def search(self, query, limit=20, offset=0, dictionary=None):
+        """返回 ([(词典, 单词, 匹配方式)], 是否还有更多)；dictionary 为词典路径时只搜索该词典"""
+        start = time.perf_counter()
+        query = normalize(query)
+        slot = None
+        if dictionary is not None:
+            slots = [i for i, d in enumerate(self.dictionaries) if d.path == dictionary]
+            if not slots:
+                return [], False
+            slot = slots[0]
+        hits, seen, needed = [], set(), offset + limit + 1
+        if query:
+            for match, ids in self._sources(query):
+                for i in ids:
+                    if i in seen or (slot is not None and self._owners[i] != slot):
+                        continue
+                    seen.add(i)
+                    hits.append((i, match))
+                    if len(hits) >= needed:
+                        break
+                if len(hits) >= needed:
+                    break
+        results = [self.entry(i) + (match,) for i, match in hits[offset:offset + limit]]
+        SEARCH_SECONDS.observe(time.perf_counter() - start, kind='query')
+        return results, len(hits) > offset + limit
+
+
+def hit_json(dictionary, word, match):
+    """搜索结果的 JSON 形式"""
+    reading, meaning, romaji = dictionary.words[word]
+    return {'dict': os.path.basename(dictionary.path), 'word': word, 'reading': reading,
+            'meaning': meaning, 'romaji': romaji, 'match': match}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(paths):
+    """全部词典的共享搜索索引；词典内容变化（或流式加载完成）后，下次查询时重建
+
+    只使用已发布的词典版本，不在请求线程中加载词典：尚未加载的词典在后台开始加载，
+    与仍在流式加载的词典一样暂不计入；文件已变化但尚未重新加载的词典使用已发布的版本。
+    """
+    global _index
+    dictionaries = []
+    for path in paths:
+        dictionary = peek_dictionary(path)
+        if dictionary is None:
+            if os.path.exists(normalize_path(path)):
+                preload_dictionary(path)
+        elif dictionary.digest is not None:
+            dictionaries.append(dictionary)
+    key = tuple((d.path, d.digest) for d in dictionaries)
+    index = _index
+    if index is not None and index.key == key:
+        return index
+    with _index_lock:
+        if _index is not None and _index.key == key:
+            return _index
+        start = time.perf_counter()
+        _index = SearchIndex(dictionaries)
+        elapsed = time.perf_counter() - start
+        SEARCH_SECONDS.observe(elapsed, kind='build')
+        logger.info('搜索索引构建完成: %d 个词典, %d 个词条, %.2fs', len(dictionaries), len(_index), elapsed)
+        return _index
+
+
+def refresh_index(paths):
+    """词典或配置变化后在后台预先重建索引（从未搜索过时不建，避免无谓占用内存）"""
+    if _index is not None:
+        get_index(paths)
@@ -0,0 +1,116 @@
+// 言葉 浏览器端脚本
+// 页面通过 <script> 引入一次（URL 带内容版本号，浏览器长期缓存），服务端只调用这里的具名函数
+
+window.kotoba = window.kotoba || (function() {
+    // 本地设置的默认值
+    if (localStorage.getItem('helpMode') === null) {
+        localStorage.setItem('helpMode', 'true');
+    }
+    if (localStorage.getItem('hideRomaji') === null) {
+        localStorage.setItem('hideRomaji', 'false');
+    }
+    // 旧版本保存在 localStorage 中的计数（新用户沿用）
+    const counts = {correct: parseInt(localStorage.correct || 0), wrong: parseInt(localStorage.wrong || 0)};
+    // 清理旧版本保存在 localStorage 中的整本词典
+    Object.keys(localStorage)
+        .filter(k => k.startsWith('cached_dict_') || k.startsWith('cache_time_cached_dict_'))
+        .forEach(k => localStorage.removeItem(k));
+    // 删除旧版本的 IndexedDB 词典缓存（服务端渲染全部内容，浏览器不再保存词典）
+    if (window.indexedDB) {
+        indexedDB.deleteDatabase('kotoba');
+    }
+
+    // 页脚（页面模板中 <footer> 位于脚本之后，等文档解析完成再替换）
+    function renderFooter() {
+        const footer = document.querySelector('footer');
+        if (!footer) return;
+        footer.innerHTML = '© <a href="https://iamcheyan.com/">Cheyan</a> All Rights Reserved' +
+            '<div class="kotoba-github">' +
+            '<a href="https://github.com/iamcheyan/kotoba" target="_blank" title="GitHubでソースコードを見る">' +
+            '<svg xmlns="http://www.w3.org/2000/svg" width="24" height="24" viewBox="0 0 24 24"><path d="M12 0c-6.626 0-12 5.373-12 12 0 5.302 3.438 9.8 8.207 11.387.599.111.793-.261.793-.577v-2.234c-3.338.726-4.033-1.416-4.033-1.416-.546-1.387-1.333-1.756-1.333-1.756-1.089-.745.083-.729.083-.729 1.205.084 1.839 1.237 1.839 1.237 1.07 1.834 2.807 1.304 3.492.997.107-.775.418-1.305.762-1.604-2.665-.305-5.467-1.334-5.467-5.931 0-1.311.469-2.381 1.236-3.221-.124-.303-.535-1.524.117-3.176 0 0 1.008-.322 3.301 1.23.957-.266 1.983-.399 3.003-.404 1.02.005 2.047.138 3.006.404 2.291-1.552 3.297-1.23 3.297-1.23.653 1.653.242 2.874.118 3.176.77.84 1.235 1.911 1.235 3.221 0 4.609-2.807 5.624-5.479 5.921.43.372.823 1.102.823 2.222v3.293c0 .319.192.694.801.576 4.765-1.589 8.199-6.086 8.199-11.386 0-6.627-5.373-12-12-12z"/></svg>' +
+            '</a></div>';
+    }
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', renderFooter);
+    } else {
+        renderFooter();
+    }
+
+    return {
+        // 会话启动：一次往返返回服务端需要的全部客户端状态
+        bootstrap() {
+            const search = new URLSearchParams(window.location.search);
+            return {
+                params: {
+                    dict: search.get('dict'),
+                    study: search.get('study'),
+                    hide_reading: search.get('hide_reading'),
+                    hide_romaji: search.get('hide_romaji'),
+                    hide_placeholder: search.get('hide_placeholder'),
+                    show_katakana_reading: search.get('show_katakana_reading'),
+                    base_url: window.location.origin + window.location.pathname
+                },
+                user_agent: navigator.userAgent,
+                counts: counts
+            };
+        },
+        // 提交答案后回到页面顶部（处理 iOS 软键盘收起时的页面滚动问题）
+        fixScroll() {
+            const isIOS = /iPad|iPhone|iPod/.test(navigator.userAgent) && !window.MSStream;
+            if (!isIOS) {
+                window.scrollTo(0, 0);
+                return;
+            }
+            // 先固定页面，延迟恢复定位后再滚动到顶部
+            const scrollTop = document.documentElement.scrollTop || document.body.scrollTop;
+            document.body.style.position = 'fixed';
+            document.body.style.width = '100%';
+            document.body.style.top = -scrollTop + 'px';
+            setTimeout(() => {
+                document.body.style.position = '';
+                document.body.style.width = '';
+                document.body.style.top = '';
+                window.scrollTo(0, 0);
+            }, 300);
+        },
+        // 清空输入框
+        resetForm() {
+            const form = document.querySelector('form');
+            if (form) form.reset();
+        },
+        // 更新页头中的在线人数和统计信息
+        setCounters(online, stats) {
+            document.getElementById('kotoba-online').textContent = online;
+            document.getElementById('kotoba-stats').textContent = stats;
+        },
+        // 一次作答的全部反馈（服务端只发送这一条消息）：答对时提示并更新计数，答错时显示对比
+        answered(feedback) {
+            const alerts = document.getElementById('pywebio-scope-alerts');
+            if (alerts) alerts.textContent = '';
+            if (feedback.correct) {
+                Toastify({text: '👏 正解です！', duration: 2000, gravity: 'top', position: 'center',
+                          backgroundColor: '#65e49b'}).showToast();
+                this.setCounters(feedback.online, feedback.stats);
+            } else if (alerts) {
+                [[feedback.answer, 'red'], [feedback.expected, 'green']].forEach(([text, color]) => {
+                    const p = document.createElement('p');
+                    p.textContent = text;
+                    p.style.color = color;
+                    alerts.appendChild(p);
+                });
+            }
+            this.resetForm();
+            this.fixScroll();
+        },
+        // 在学习模式和练习模式之间切换（保留其它 URL 参数）
+        toggleStudy(study) {
+            const url = new URL(window.location.href);
+            if (study) {
+                url.searchParams.set('study', '1');
+            } else {
+                url.searchParams.delete('study');
+            }
+            window.location.href = url.toString();
+        }
+    };
+})();
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dict_store
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """在临时目录中运行（dictionaries/ 和预编译产物都在其中），并清空进程级词典缓存"""
+    (tmp_path / 'dictionaries').mkdir()
+    monkeypatch.chdir(tmp_path)
+    for name in ('_store', '_loaders', '_build_locks'):
+        monkeypatch.setattr(dict_store, name, {})
+    monkeypatch.setattr(dict_store, '_preloading', set())
+    return tmp_path
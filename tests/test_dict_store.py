@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import os
+import time
+
+import pytest
+
+import dict_store
+
+WORDS = {f'単語{i}': f'含义{i}' for i in range(40)}
+
+
+def write_source(workdir, words, name='test.json'):
+    path = os.path.join('dictionaries', name)
+    with open(workdir / path, 'w', encoding='utf-8') as f:
+        json.dump(words, f, ensure_ascii=False)
+    return path
+
+
+def wait_for(check, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def failing_converter(monkeypatch):
+    """转换到第 fail_at 条时抛出异常；调用返回的函数恢复正常转换"""
+    real = dict_store.convert_items
+    fail_at = 10
+
+    def convert(items):
+        for n, entry in enumerate(real(items)):
+            if n == fail_at:
+                raise RuntimeError('转换失败')
+            yield entry
+
+    monkeypatch.setattr(dict_store, 'STREAM_FIRST_CHUNK', 4)
+    monkeypatch.setattr(dict_store, 'convert_items', convert)
+    return lambda: monkeypatch.setattr(dict_store, 'convert_items', real)
+
+
+def test_stream_failure_discards_partial(workdir, failing_converter):
+    path = write_source(workdir, WORDS)
+    partial = dict_store.get_dictionary(path)
+    assert not partial.complete and len(partial) == 4
+
+    wait_for(lambda: path not in dict_store._loaders)
+    assert dict_store.peek_dictionary(path) is None
+
+    failing_converter()
+    dict_store.get_dictionary(path)
+    wait_for(lambda: getattr(dict_store.peek_dictionary(path), 'complete', False))
+    rebuilt = dict_store.peek_dictionary(path)
+    assert len(rebuilt) == len(WORDS)
+    assert rebuilt.words['単語39'][1] == '含义39'
+
+
+def test_stream_failure_restores_previous_version(workdir, failing_converter, monkeypatch):
+    path = write_source(workdir, {'猫': '猫'})
+    monkeypatch.setattr(dict_store, 'STREAM_LOADING', False)
+    previous = dict_store.get_dictionary(path)
+    monkeypatch.setattr(dict_store, 'STREAM_LOADING', True)
+
+    write_source(workdir, WORDS)
+    os.utime(path, ns=(previous.mtime + 10**9, previous.mtime + 10**9))
+    assert not dict_store.get_dictionary(path).complete
+    wait_for(lambda: path not in dict_store._loaders)
+    assert dict_store.peek_dictionary(path) is previous
+
+    # 文件修改时间与已发布版本不同，下次访问重新构建
+    failing_converter()
+    dict_store.get_dictionary(path)
+    wait_for(lambda: len(dict_store.peek_dictionary(path)) == len(WORDS)
+             and dict_store.peek_dictionary(path).complete)
+
+
+def test_artifact_path_keeps_extension_and_directory(workdir):
+    json_path = write_source(workdir, {'猫': '猫'})
+    jsonl_path = os.path.join('dictionaries', 'test.jsonl')
+    (workdir / jsonl_path).write_text('["犬", "狗"]\n', encoding='utf-8')
+    (workdir / 'other').mkdir()
+    other_path = os.path.join('other', 'test.json')
+    (workdir / other_path).write_text('{"鳥": "鸟"}', encoding='utf-8')
+
+    paths = (json_path, jsonl_path, other_path)
+    assert len({dict_store.artifact_path(path) for path in paths}) == len(paths)
+    assert dict_store.artifact_path('./' + json_path) == dict_store.artifact_path(json_path)
+
+    for path in paths:
+        dict_store.build_dictionary(path, None)
+    assert [list(dict_store.read_artifact(path, dict_store.file_digest(path)).keys) for path in paths] == \
+        [['猫'], ['犬'], ['鳥']]
+
+
+def test_artifact_round_trip(workdir):
+    from test_packed import ENTRIES, unpack
+
+    path = write_source(workdir, {})
+    dict_store.write_artifact(path, 'digest', ENTRIES)
+    packed = dict_store.read_artifact(path, 'digest')
+    assert unpack(packed) == ENTRIES
+    assert dict_store.read_artifact(path, 'other digest') is None
+
+
+def test_dictionary_duplicates_follow_json_load(workdir):
+    path = os.path.join('dictionaries', 'dup.json')
+    source = '{"猫": "第一", "犬": "狗", "猫": "第二"}'
+    (workdir / path).write_text(source, encoding='utf-8')
+    dictionary = dict_store.build_dictionary(path, None)
+    assert list(dictionary.words) == list(json.loads(source)) == ['猫', '犬']
+    assert dictionary.words['猫'][1] == '第二'
+    # 预编译产物中同样只有一条
+    assert list(dict_store.read_artifact(path, dictionary.digest).keys) == ['猫', '犬']
+
+
+def parse(text, read_size):
+    return list(dict_store.iter_json_items(io.StringIO(text), read_size))
+
+
+JSON_SOURCES = [
+    '{}',
+    ' \n{ }\n ',
+    '{"a": 1}',
+    '{"a": -1e-5, "b": 0, "c": true}',
+    '{"猫": "猫", "長い単語": "含义 \\"引号\\" \\u732b", "n": 12345.5e3, "x": [1, {"y": null}]}',
+    '{\n  "k1" : "v1" ,\n  "k2":"v2"\n}\n',
+]
+
+
+@pytest.mark.parametrize('text', JSON_SOURCES)
+@pytest.mark.parametrize('read_size', [1, 2, 3, 7, 1 << 16])
+def test_iter_json_items_across_chunk_boundaries(text, read_size):
+    assert parse(text, read_size) == list(json.loads(text).items())
+
+
+@pytest.mark.parametrize('text', ['{"a": 1}xyz', '{"a": 1} {}', '{"a": 1}\n]', '{}x'])
+@pytest.mark.parametrize('read_size', [1, 3, 1 << 16])
+def test_iter_json_items_rejects_trailing_data(text, read_size):
+    with pytest.raises(ValueError):
+        parse(text, read_size)
+
+
+@pytest.mark.parametrize('text', ['', '  ', '[1, 2]', '{"a": 1', '{"a" 1}', '{"a": 1 "b": 2}', '{"a": 12'])
+def test_iter_json_items_rejects_invalid_json(text):
+    with pytest.raises(ValueError):
+        parse(text, 2)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+import ingest
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'ingest')
+
+
+@pytest.fixture
+def fixture_dir(tmp_path, monkeypatch):
+    """fixtures/ingest 的副本（ingest 原地改写词典文件和 config.json）"""
+    root = tmp_path / 'ingest'
+    shutil.copytree(FIXTURE, root)
+    monkeypatch.chdir(root)
+    return root
+
+
+def run_ingest(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, 'argv', ['ingest.py', '-j', '1', *args])
+    ingest.main()
+    return capsys.readouterr().out
+
+
+def read_dictionary(path):
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            return [next(iter(json.loads(line).items())) for line in f]
+    with open(path, encoding='utf-8') as f:
+        return list(json.load(f).items())
+
+
+def issues(result, kind):
+    return [key for issue_kind, key, _ in result['issues'] if issue_kind == kind]
+
+
+def test_scan_dictionary(fixture_dir):
+    result = ingest.scan_dictionary(os.path.join('dictionaries', 'base.json'))
+    assert result['total'] == 8
+    # 文件内重复的单词保留第一次出现的词条
+    assert result['entries'] == [('猫', '猫'), ('犬', '狗'), ('カタカナ', '片假名'), ('hello', '你好')]
+    assert issues(result, ingest.DUPLICATE) == ['猫']
+    assert issues(result, ingest.INVALID) == ['、', '鳥', '魚']
+    assert issues(result, ingest.WARNING) == ['hello']
+    assert ingest.split_hashes(result['hashes']) == [ingest.key_hash(key) for key, _ in result['entries']]
+
+
+def test_scan_jsonl(fixture_dir):
+    result = ingest.scan_dictionary(os.path.join('dictionaries', 'zeta.jsonl'))
+    assert result['entries'] == [('本', '书'), ('水', '水'), ('空', '天空')]
+    assert result['issues'] == []
+
+
+def test_drop_duplicate_meanings(fixture_dir):
+    result = ingest.scan_dictionary(os.path.join('dictionaries', 'extra.json'), drop_duplicate_meanings=True)
+    assert [key for key, _ in result['entries']] == ['犬', '本', '猫']
+    (fixture_dir / 'dictionaries' / 'same.json').write_text('{"本": "书", "書籍": "书"}', encoding='utf-8')
+    result = ingest.scan_dictionary(os.path.join('dictionaries', 'same.json'), drop_duplicate_meanings=True)
+    assert result['entries'] == [('本', '书')]
+    assert issues(result, ingest.DUPLICATE) == ['書籍']
+
+
+def test_ingest_dedups_across_dictionaries_in_order(fixture_dir, monkeypatch, capsys):
+    run_ingest(monkeypatch, capsys)
+
+    # 按配置顺序（未配置的词典按文件名排在后面），先出现的词典保留重复的单词
+    assert read_dictionary('dictionaries/base.json') == [('猫', '猫'), ('犬', '狗'), ('カタカナ', '片假名'),
+                                                         ('hello', '你好')]
+    assert read_dictionary('dictionaries/extra.json') == [('本', '书')]
+    assert read_dictionary('dictionaries/zeta.jsonl') == [('水', '水'), ('空', '天空')]
+
+    with open('config.json', encoding='utf-8') as f:
+        config = json.load(f)
+    assert config['dictionaries'] == [
+        {'path': 'dictionaries/base.json', 'name': '基本'},
+        {'path': 'dictionaries/extra.json', 'name': '追加'},
+        {'path': 'dictionaries/zeta.jsonl', 'name': 'zeta'},
+    ]
+    assert config['default_dictionary'] == 'dictionaries/base.json'
+
+
+def test_dry_run_writes_nothing(fixture_dir, monkeypatch, capsys):
+    before = {path: path.read_bytes() for path in fixture_dir.rglob('*') if path.is_file()}
+    out = run_ingest(monkeypatch, capsys, '--dry-run')
+    assert '需要更新' in out
+    assert {path: path.read_bytes() for path in fixture_dir.rglob('*') if path.is_file()} == before
+
+
+def test_incremental_manifest(fixture_dir, monkeypatch, capsys):
+    run_ingest(monkeypatch, capsys)
+    with open(ingest.MANIFEST_PATH, encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['dictionaries']['dictionaries/zeta.jsonl']['count'] == 2
+    stamps = {path: os.stat(path).st_mtime_ns for path in manifest['dictionaries']}
+
+    # 源文件未变化：全部使用清单，不再解析，也不改写任何文件
+    out = run_ingest(monkeypatch, capsys)
+    assert out.count('未变化（使用清单）') == 3
+    assert {path: os.stat(path).st_mtime_ns for path in stamps} == stamps
+
+    # 前面的词典新增了后面词典中的单词：后面使用清单的词典需要重新扫描并去除该单词
+    with open('dictionaries/extra.json', 'w', encoding='utf-8') as f:
+        json.dump({'本': '书', '水': '水（追加）'}, f, ensure_ascii=False, indent=4)
+    out = run_ingest(monkeypatch, capsys)
+    assert out.count('未变化（使用清单）') == 1
+    assert read_dictionary('dictionaries/extra.json') == [('本', '书'), ('水', '水（追加）')]
+    assert read_dictionary('dictionaries/zeta.jsonl') == [('空', '天空')]
+    assert os.stat('dictionaries/base.json').st_mtime_ns == stamps['dictionaries/base.json']
+
+    # 去重选项不同时清单作废
+    out = run_ingest(monkeypatch, capsys, '--keep-shared')
+    assert '使用清单' not in out
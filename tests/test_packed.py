@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+
+from packed import AnswerKeysView, PackedEntries, SegmentsView, WordsView
+
+ENTRIES = [
+    ('猫', 'ねこ', '猫', 'neko', ('neko',), (('猫', 'ねこ'),)),
+    ('東京', 'とうきょう', '东京', 'toukyou', ('toukyou', 'tokyo'), (('東', 'とう'), ('京', 'きょう'))),
+    ('です', 'です', '是', 'desu', ('desu',), ()),
+    # 字段中出现分隔符和转义符本身
+    ('記号', 'き\x1eごう', '含\x1f义\x1b1', 'ki\x1bgou', ('ki\x1e', '\x1f'), (('記\x1f', '\x1e'), ('号', 'ごう\x1b'))),
+]
+
+
+def unpack(packed):
+    words, keys, segments = WordsView(packed), AnswerKeysView(packed), SegmentsView(packed)
+    return [(word, *words[word], keys[word], segments[word]) for word in packed.keys]
+
+
+def test_round_trip():
+    packed = PackedEntries.from_entries(iter(ENTRIES))
+    assert list(packed.keys) == [entry[0] for entry in ENTRIES]
+    assert unpack(packed) == ENTRIES
+    assert packed.fields(3)[:3] == ['き\x1eごう', '含\x1f义\x1b1', 'ki\x1bgou']
+
+
+def test_pickle_round_trip():
+    packed = pickle.loads(pickle.dumps(PackedEntries.from_entries(ENTRIES)))
+    assert unpack(packed) == ENTRIES
+
+
+def test_duplicates_keep_first_position_and_last_value():
+    later = ('猫', 'びょう', '猫（后）', 'byou', ('byou',), (('猫', 'びょう'),))
+    packed = PackedEntries.from_entries(ENTRIES + [later])
+    assert list(packed.keys) == [entry[0] for entry in ENTRIES]
+    assert unpack(packed)[0] == later
+    assert unpack(packed)[1:] == ENTRIES[1:]
+
+
+def test_views():
+    packed = PackedEntries.from_entries(ENTRIES)
+    words = WordsView(packed)
+    assert len(words) == len(ENTRIES)
+    assert '猫' in words and '犬' not in words
+    assert list(words) == [entry[0] for entry in ENTRIES]
+    assert words.get('犬') is None
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import sqlite3
+
+import pytest
+
+from progress import ProgressStore
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """共用一个数据库文件的两个实例（相当于两个工作进程），只在显式 flush 时写盘"""
+    path = str(tmp_path / 'progress.db')
+    opened = []
+
+    def open_store():
+        store = ProgressStore(path, flush_interval=3600, batch_size=10 ** 6)
+        opened.append(store)
+        return store
+
+    yield path, open_store
+    for store in opened:
+        store.close()
+
+
+def card_row(path, word):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT repetitions, interval, ease, lapses, due FROM cards '
+                            'WHERE user_id = ? AND dictionary = ? AND word = ?', ('u', 'd', word)).fetchone()
+
+
+def test_two_stores_merge_progress(stores):
+    path, open_store = stores
+    a, b = open_store(), open_store()
+
+    # 两个进程中的新用户各自沿用浏览器中的旧计数，只有先写入的生效
+    assert not a.load_user('u', 'd').known
+    a.seed_totals('u', 10, 5)
+    assert not b.load_user('u', 'd').known
+    b.seed_totals('u', 100, 50)
+
+    a.record('u', 'd', 'w1', False)
+    a.record('u', 'd', 'w2', True)
+    a.flush()
+    b.record('u', 'd', 'w1', True)
+    b.record('u', 'd', 'w1', True)
+    b.flush()
+    a.record('u', 'd', 'w1', False)
+    a.flush()
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT correct, wrong FROM totals WHERE user_id = 'u'").fetchone() == (13, 7)
+        reviews = conn.execute("SELECT word, correct, answered_at FROM reviews ORDER BY rowid").fetchall()
+    assert [(word, correct) for word, correct, _ in reviews] == \
+        [('w1', 0), ('w2', 1), ('w1', 1), ('w1', 1), ('w1', 0)]
+
+    # w1 的卡片按写入顺序重放了两个进程的全部作答: 错 -> 对 -> 对 -> 错
+    repetitions, interval, ease, lapses, due = card_row(path, 'w1')
+    assert (repetitions, interval, lapses) == (0, 0.0, 2)
+    assert ease == pytest.approx(2.3)
+    assert due == reviews[-1][2]
+    repetitions, interval, ease, lapses, _ = card_row(path, 'w2')
+    assert (repetitions, interval, lapses) == (1, 1.0, 0)
+    assert ease == pytest.approx(2.6)
+
+    # 之后开始的会话读到合并后的进度，旧计数不再生效
+    c = open_store()
+    user = c.load_user('u', 'd')
+    assert user.known and (user.correct, user.wrong) == (13, 7)
+    c.seed_totals('u', 1000, 1000)
+    assert c.totals('u') == (13, 7)
+    assert user.cards[('d', 'w1')].row() == card_row(path, 'w1')
+
+
+def test_load_user_sees_unflushed_records(stores):
+    _, open_store = stores
+    a = open_store()
+    a.load_user('u', 'd')
+    a.record('u', 'd', 'w1', True)
+    a.release('u')
+    # 同一实例再次读取前先写入缓冲区
+    user = a.load_user('u', 'd')
+    assert (user.correct, user.wrong) == (1, 0)
+    assert user.cards[('d', 'w1')].repetitions == 1
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import itertools
+import math
+import random
+
+import pytest
+
+from scheduler import MAX_WEIGHT, FenwickTree, QuestionScheduler
+
+
+def brute_find(weights, target):
+    """累计权重首次超过 target 的下标（逐个累加）"""
+    for i, total in enumerate(itertools.accumulate(weights)):
+        if total > target:
+            return i
+    return len(weights) - 1
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 8, 9, 100])
+def test_fenwick_prefix_search(size):
+    rng = random.Random(size)
+    weights = [float(rng.randint(1, 5)) for _ in range(size)]
+    tree = FenwickTree(weights)
+    assert tree.total() == sum(weights)
+    # 每个区间的边界两侧和区间内部
+    for total in itertools.accumulate(weights):
+        for target in (total - 0.5, total):
+            assert tree.find(target) == brute_find(weights, target)
+    assert tree.find(0) == 0
+    assert tree.find(tree.total()) == size - 1
+
+
+def test_fenwick_uniform_and_add():
+    size = 13
+    tree, reference = FenwickTree.uniform(size), FenwickTree([1.0] * size)
+    assert tree.tree == reference.tree
+    weights = [1.0] * size
+    for index, delta in ((0, 3.0), (12, 7.0), (5, 0.5), (0, -2.0)):
+        tree.add(index, delta)
+        weights[index] += delta
+    assert tree.total() == pytest.approx(sum(weights))
+    for target in (0.5, 1.9, 2.1, 8.4, 8.6, sum(weights) - 0.1):
+        assert tree.find(target) == brute_find(weights, target)
+
+
+def test_weights_double_halve_and_clamp():
+    scheduler = QuestionScheduler(['a', 'b'])
+    weights = []
+    for _ in range(7):
+        scheduler.record('a', False)
+        weights.append(scheduler.weights[0])
+    assert weights == [2.0, 4.0, 8.0, 16.0, 32.0, 32.0, 32.0]
+    assert MAX_WEIGHT == 32.0
+    for _ in range(7):
+        scheduler.record('a', True)
+    # 减半但不低于 1
+    assert scheduler.weights[0] == 1.0
+    scheduler.record('b', True)
+    assert scheduler.weights[1] == 1.0
+    assert scheduler.tree.total() == 2.0
+    # 不在词典中的单词忽略
+    scheduler.record('c', False)
+    assert scheduler.tree.total() == 2.0
+
+
+def test_unweighted_ignores_records():
+    scheduler = QuestionScheduler(['a', 'b'], weighted=False, rng=random.Random(1))
+    scheduler.record('a', False)
+    scheduler.set_weight('a', 8.0)
+    assert {scheduler.next() for _ in range(100)} == {'a', 'b'}
+
+
+def test_inherit():
+    old = QuestionScheduler(['a', 'b', 'gone'])
+    old.record('a', False)
+    old.set_weight('gone', 16.0)
+    new = QuestionScheduler(['b', 'a', 'new'])
+    new.inherit(old)
+    assert new.weights == [1.0, 2.0, 1.0]
+    assert new.tree.total() == 4.0
+
+
+def test_sampling_is_proportional_to_weight():
+    keys = [f'w{i}' for i in range(10)]
+    scheduler = QuestionScheduler(keys, rng=random.Random(20240601))
+    weights = [1, 1, 2, 4, 8, 16, 32, 1, 3, 5]
+    for key, weight in zip(keys, weights):
+        scheduler.set_weight(key, float(weight))
+    draws = 60000
+    counts = collections.Counter(scheduler.next() for _ in range(draws))
+    total = sum(weights)
+    for key, weight in zip(keys, weights):
+        p = weight / total
+        # 4 个标准差以内
+        assert abs(counts[key] - draws * p) < 4 * math.sqrt(draws * p * (1 - p)), key
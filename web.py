@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import gzip
+import json
+import logging
+import os
+import threading
+
+import werkzeug.serving
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask import Response, abort, request
+from pywebio.platform.adaptor.http import run_event_loop
+from pywebio.platform.flask import wsgi_app
+from pywebio.session import Session
+from pywebio.utils import iscoroutinefunction
+
+from client_assets import ASSETS
+from client_cache import cache_version
+from dict_store import peek_dictionary, preload_dictionary
+from metrics import registry
+from search import get_index, hit_json
+
+# brotli 为可选依赖，未安装时只提供 gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 搜索接口单次返回的最大条数
+MAX_SEARCH_LIMIT = 100
+
+# 词典尚未加载完成时，建议浏览器几秒后重试
+RETRY_AFTER = 3
+
+# 词典内容由 ETag 校验，浏览器和反向代理可缓存一小时后再验证
+CACHE_CONTROL = 'public, max-age=3600'
+# 带版本号的静态资源内容不会变化，可缓存一年
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+@functools.lru_cache(maxsize=16)
+def encoded_payload(dictionary):
+    """预先生成词典 JSON 的原始/gzip/brotli 三种编码，每个词典版本只生成一次"""
+    raw = json.dumps({
+        'version': cache_version(dictionary),
+        'words': dict(dictionary.words),
+    }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    bodies = {'identity': raw, 'gzip': gzip.compress(raw, compresslevel=9)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(raw)
+    return bodies
+
+
+def choose_encoding(bodies):
+    """根据 Accept-Encoding 选择最合适的已压缩版本"""
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in bodies and accepted[encoding]:
+            return encoding
+    return 'identity'
+
+
+def cached_response(body, etag, mimetype, encoding='identity', cache_control=CACHE_CONTROL):
+    """带强 ETag 和 Cache-Control 的响应，命中 If-None-Match 时返回 304"""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def create_app(target, dictionaries):
+    """创建 Flask 应用：PyWebIO 会话 + 可被 HTTP 缓存的词典接口
+
+    dictionaries: 词典注册表（dict_registry），只有当前配置中的词典可以被访问
+    """
+    return add_api_routes(wsgi_app(target), dictionaries)
+
+
+def add_api_routes(app, dictionaries):
+    """在 Flask 应用上挂载词典接口、静态资源和 /metrics（多进程部署时挂载到不含 PyWebIO 会话的应用上）"""
+
+    def lookup(filename):
+        """配置中的词典；不在配置中或文件不存在时 404，仍在加载时 503（不在请求线程中构建）"""
+        path = dictionaries.current.files.get(filename)
+        if path is None or not os.path.exists(path):
+            abort(404)
+        dictionary = peek_dictionary(path)
+        if dictionary is None:
+            preload_dictionary(path)
+        if dictionary is None or dictionary.digest is None:
+            # 加载中不是“不存在”：503 + Retry-After，并禁止中间缓存保存这个响应
+            abort(Response('dictionary is loading', status=503, mimetype='text/plain',
+                           headers={'Retry-After': str(RETRY_AFTER), 'Cache-Control': 'no-store'}))
+        return dictionary
+
+    @app.route('/dict/<filename>')
+    def dictionary_payload(filename):
+        """完整词典 JSON（预压缩）"""
+        dictionary = lookup(filename)
+        bodies = encoded_payload(dictionary)
+        encoding = choose_encoding(bodies)
+        # 不同编码的内容不同，强 ETag 需要区分编码
+        etag = f'{cache_version(dictionary)}-{encoding}'
+        return cached_response(bodies[encoding], etag, 'application/json', encoding)
+
+    @app.route('/static/<name>')
+    def static_asset(name):
+        """页面引用的脚本、样式和图标（预压缩）；版本号与当前内容一致时可长期缓存"""
+        asset = ASSETS.get(name)
+        if asset is None:
+            abort(404)
+        encoding = choose_encoding(asset.bodies)
+        cache_control = ASSET_CACHE_CONTROL if request.args.get('v') == asset.version else CACHE_CONTROL
+        return cached_response(asset.bodies[encoding], f'{asset.version}-{encoding}', asset.mimetype, encoding,
+                               cache_control)
+
+    @app.route('/search')
+    def search():
+        """跨全部词典搜索：q 为查询（漢字・かな・ローマ字・中文），可选 dict 限定词典，limit / offset 分页"""
+        query = request.args.get('q', '')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_SEARCH_LIMIT)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        dictionary = request.args.get('dict')
+        catalog = dictionaries.current
+        if dictionary is not None:
+            dictionary = catalog.files.get(dictionary)
+            if dictionary is None:
+                abort(404)
+        hits, more = get_index(catalog.paths).search(query, limit, offset, dictionary)
+        body = json.dumps({'query': query, 'results': [hit_json(*hit) for hit in hits], 'more': more},
+                          ensure_ascii=False, separators=(',', ':'))
+        return Response(body, mimetype='application/json')
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus 文本格式的运行指标"""
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    return app
+
+
+def start_server(target, dictionaries, port=8080, host='0.0.0.0', debug=False, trust_proxy=False, **flask_options):
+    """启动服务（与 pywebio.platform.flask.start_server 行为一致，额外挂载词典接口，并监视词典变化）
+
+    trust_proxy: 部署在反向代理之后时为真，采用 X-Forwarded-For 中的客户端地址（否则可被客户端伪造）
+    """
+    app = create_app(target, dictionaries)
+    if trust_proxy:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+    dictionaries.start()
+
+    Session.debug = debug
+    # 请求日志只输出警告以上，避免轮询请求刷屏
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    # 协程会话需要事件循环线程
+    if iscoroutinefunction(target) and not werkzeug.serving.is_running_from_reloader():
+        threading.Thread(target=run_event_loop, daemon=True).start()
+
+    app.run(host=host, port=port, debug=debug, threaded=True, use_evalex=False, **flask_options)